@@ -0,0 +1,65 @@
+REBUILD_SUFFIX = "_rebuild"
+
+# Padrões do ChromaDB 0.4: uma coleção criada sem metadados usa exatamente
+# estes valores, então índices antigos continuam válidos com a config padrão.
+HNSW_DEFAULTS = {"hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10}
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+
+def hnsw_metadata(space: str, m: int, construction_ef: int, search_ef: int) -> dict:
+    if space not in HNSW_SPACES:
+        raise ValueError(f"Métrica HNSW inválida: {space} (use {', '.join(HNSW_SPACES)})")
+    return {"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef}
+
+
+def index_params(collection) -> dict:
+    metadata = collection.metadata or {}
+    return {key: metadata.get(key, default) for key, default in HNSW_DEFAULTS.items()}
+
+
+def needs_rebuild(collection, metadata: dict) -> bool:
+    return index_params(collection) != metadata
+
+
+def open_collection(client, name: str, metadata: dict):
+    # Uma coleção existente mantém os parâmetros com que foi criada; a
+    # troca é feita por ``copy_collection``/``swap_collection``.
+    try:
+        return client.get_collection(name)
+    except ValueError:
+        pass
+    try:
+        # Queda entre apagar a original e renomear a cópia: a cópia já
+        # está completa e assume o nome.
+        rebuilt = client.get_collection(name + REBUILD_SUFFIX)
+        rebuilt.modify(name=name)
+        return rebuilt
+    except ValueError:
+        return client.create_collection(name, metadata=metadata)
+
+
+def copy_collection(client, collection, metadata: dict, page_size: int = 5000):
+    # Os parâmetros do HNSW ficam fixos no segmento quando a coleção é
+    # criada: mudar exige uma coleção nova. Os vetores são copiados como
+    # estão, sem passar pelo modelo de novo.
+    name = collection.name + REBUILD_SUFFIX
+    try:
+        client.delete_collection(name)
+    except ValueError:
+        pass
+    extra = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+    fresh = client.create_collection(name, metadata=dict(extra, **metadata))
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return fresh
+        fresh.add(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"])
+        offset += len(page["ids"])
+
+
+def swap_collection(client, fresh, name: str):
+    # A original só sai depois que a cópia está completa e já em uso.
+    client.delete_collection(name)
+    fresh.modify(name=name)
+    return fresh
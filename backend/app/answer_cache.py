@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.quantization import QuantizedMatrix, check_dtype
+
+
+def _row_keys(result):
+    keys = set()
+    for metadata in result.get("metadata") or []:
+        source = metadata.get("source")
+        if source in ("estoque", "vendas") and metadata.get("id") is not None:
+            keys.add((source, int(metadata["id"])))
+    return keys
+
+
+def cache_entities(products=(), clients=()):
+    # Produtos e clientes citados entram na chave da busca semântica.
+    return tuple(sorted({("produto", name) for name in products} | {("cliente", name) for name in clients}))
+
+
+class AnswerCache:
+    def __init__(self, max_items: int = 5000, ttl_seconds: float = 300.0, similarity_threshold: float = 0.95, vector_dtype: str = "float32", rescore_factor: int = 4):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.vector_dtype = check_dtype(vector_dtype)
+        self.rescore_factor = rescore_factor
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_row = {}
+        # Vetores das perguntas ficam em uma matriz pré-alocada, uma linha
+        # por entrada, para que inserir e remover não copie a matriz toda.
+        self._vectors = None
+        self._slot_keys = [None] * max_items
+        self._free_slots = list(range(max_items - 1, -1, -1))
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for row in entry["rows"]:
+            questions = self._by_row.get(row)
+            if questions:
+                questions.discard(key)
+                if not questions:
+                    del self._by_row[row]
+        slot = entry["slot"]
+        if slot is not None:
+            self._vectors.clear(slot)
+            self._slot_keys[slot] = None
+            self._free_slots.append(slot)
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires"] <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, vector, intent, entities, now):
+        if self._vectors is None or len(self._entries) == 0:
+            return None
+
+        for slot, score in self._vectors.top(vector, 5):
+            if score < self.similarity_threshold:
+                break
+            key = self._slot_keys[slot]
+            entry = self._live(key, now) if key is not None else None
+            # Perguntas parecidas com intenções diferentes ("preço" x
+            # "quantidade") ou sobre outro produto/cliente ("preço da alface"
+            # x "preço do tomate") não podem compartilhar a mesma resposta.
+            if entry is not None and entry["intent"] == intent and entry["entities"] == entities:
+                return entry
+        return None
+
+    @staticmethod
+    def _unit(vector):
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, key: str, intent: dict, embed=None, entities=()):
+        # ``embed`` só é chamado quando a busca exata falha, então perguntas
+        # repetidas literalmente nem chegam a passar pelo modelo.
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+            if entry is not None:
+                self._stats["exact_hits"] += 1
+                return entry["result"], None
+
+        vector = embed() if embed else None
+        now = time.monotonic()
+        with self._lock:
+            unit = self._unit(vector)
+            if unit is not None:
+                entry = self._nearest(unit, intent, tuple(entities), now)
+                if entry is not None:
+                    self._stats["semantic_hits"] += 1
+                    return entry["result"], vector
+
+            self._stats["misses"] += 1
+            return None, vector
+
+    def put(self, key: str, intent: dict, result: dict, vector=None, entities=()):
+        rows = _row_keys(result)
+        unit = self._unit(vector)
+        with self._lock:
+            self._remove(key)
+            while len(self._entries) >= self.max_items:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+            slot = None
+            if unit is not None:
+                if self._vectors is None:
+                    self._vectors = QuantizedMatrix(
+                        self.max_items, unit.shape[0], self.vector_dtype, self.rescore_factor
+                    )
+                slot = self._free_slots.pop()
+                self._vectors.set(slot, unit)
+                self._slot_keys[slot] = key
+
+            self._entries[key] = {
+                "result": result,
+                "intent": intent,
+                "entities": tuple(entities),
+                "slot": slot,
+                "rows": rows,
+                "expires": time.monotonic() + self.ttl_seconds
+            }
+            for row in rows:
+                self._by_row.setdefault(row, set()).add(key)
+
+    def invalidate_rows(self, rows):
+        with self._lock:
+            for row in rows:
+                for key in list(self._by_row.get(row, ())):
+                    self._remove(key)
+                    self._stats["invalidations"] += 1
+
+    def invalidate_intent(self, name: str):
+        # Respostas com totais agregados (ex.: vendas) não citam todas as
+        # linhas que somaram, então caem pela intenção e não pela linha.
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry["intent"].get(name)]:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def invalidate_unscoped(self):
+        # Respostas que não citam um produto ("quais produtos...", "quantos
+        # itens...") caem quando o estoque ganha linhas novas.
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if not any(kind == "produto" for kind, _ in entry["entities"])]:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["exact_hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+            hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+            return dict(
+                self._stats,
+                size=len(self._entries),
+                hit_rate=round(hits / lookups, 4) if lookups else 0.0
+            )
@@ -6,6 +6,74 @@ class Settings(BaseSettings):
     MYSQL_USER: str = "user"
     MYSQL_PASSWORD: str = "password"
     MYSQL_DATABASE: str = "ragdb"
+    DATABASE_URL: str = ""
+    DB_POOL_SIZE: int = 0
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: int = 10
     CHROMA_PATH: str = "./chroma_db"
+    SYNC_CHECKPOINT_FILE: str = "sync_checkpoint.json"
+    SALES_SEARCH_MONTHS: int = 12
+    SYNC_ESTOQUE_VIEWS: str = "resumo"
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_PATH: str = "./models/all-MiniLM-L6-v2-onnx"
+    EMBEDDING_ONNX_QUANTIZED: bool = True
+    EMBEDDING_THREADS: int = 0
+    EMBEDDING_MAX_LENGTH: int = 256
+    VECTOR_STORAGE_DTYPE: str = "float32"
+    VECTOR_RESCORE_FACTOR: int = 4
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_FILE: str = "embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = 10000
+    EMBEDDING_CACHE_DISK_ITEMS: int = 1000000
+    INGEST_BATCH_SIZE: int = 256
+    INGEST_WORKERS: int = 0
+    INGEST_WRITE_BATCH_SIZE: int = 1000
+    SYNC_STREAM_BATCH_SIZE: int = 1000
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
+    UPLOAD_DIR: str = ""
+    INFERENCE_WORKERS: int = 32
+    INFERENCE_QUEUE_SIZE: int = 64
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ITEMS: int = 5000
+    ANSWER_CACHE_TTL_SECONDS: float = 300.0
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+    HISTORY_BATCH_SIZE: int = 200
+    HISTORY_FLUSH_INTERVAL: float = 1.0
+    HISTORY_MAX_BACKLOG: int = 10000
+    HISTORY_RETRY_MAX_SECONDS: float = 30.0
+    HISTORY_PAGE_SIZE: int = 50
+    HISTORY_MAX_PAGE_SIZE: int = 500
+    HISTORY_EXPORT_BATCH_SIZE: int = 1000
+    LOG_LEVEL: str = "INFO"
+    STARTUP_WAIT_TIMEOUT: float = 10.0
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_RRF_K: int = 60
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    QUERY_BATCHING_ENABLED: bool = True
+    QUERY_BATCH_WINDOW_MS: float = 5.0
+    QUERY_BATCH_MAX_SIZE: int = 32
+    QUERY_BATCH_MAX_QUESTIONS: int = 100
+    SYNC_LOCK_TIMEOUT: float = 600.0
+    INDEX_RELOAD_CHECK_SECONDS: float = 1.0
+    SNAPSHOT_DIR: str = "./snapshots"
+    SNAPSHOT_KEEP: int = 3
+    SNAPSHOT_RESTORE_ON_START: bool = True
+    QUERY_DEFAULT_K: int = 5
+    HNSW_SPACE: str = "l2"
+    HNSW_M: int = 16
+    HNSW_CONSTRUCTION_EF: int = 100
+    HNSW_SEARCH_EF: int = 10
+    HNSW_REBUILD_ON_START: bool = True
+    BACKGROUND_WORKERS: int = 1
+    BACKGROUND_CPU_SHARE: float = 0.5
+    BACKGROUND_MAX_DEFER_SECONDS: float = 2.0
+    BACKGROUND_NICE: int = 10
+    SYNC_INTERVAL_SECONDS: float = 0.0
 
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,83 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Identifica uma subida do servidor. Com o preload do gunicorn o master
+# gera o id ao importar o app e todos os workers herdam; com processos
+# independentes (uvicorn --workers) defina a variável antes de subir.
+BOOT_ID_ENV = "PIXAFLOW_BOOT_ID"
+
+
+def boot_id() -> str:
+    return os.environ.setdefault(BOOT_ID_ENV, uuid.uuid4().hex)
+
+
+class WriterBusy(Exception):
+    pass
+
+
+class SyncCoordinator:
+    # Vários workers abrem o mesmo CHROMA_PATH: um lock de arquivo garante
+    # um único escritor por vez (sync, ingestão) e um arquivo de geração
+    # avisa os leitores de que precisam reabrir o índice.
+    def __init__(self, directory: str, boot: str = None):
+        self.directory = directory
+        self.lock_path = os.path.join(directory, "sync.lock")
+        self.generation_path = os.path.join(directory, "sync.generation")
+        self.boot = boot or boot_id()
+        # flock é por descritor: threads do mesmo processo se excluem aqui.
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def writer(self, timeout: float = None):
+        # ``timeout=None`` espera o quanto for preciso; ``0`` não espera.
+        if not self._thread_lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise WriterBusy("Outro escritor está usando o índice")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.lock_path, "a+") as f:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if deadline is None else fcntl.LOCK_NB))
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise WriterBusy("Outro escritor está usando o índice")
+                        time.sleep(0.05)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def state(self) -> dict:
+        try:
+            with open(self.generation_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"generation": 0, "synced_boot": None}
+
+    def generation(self) -> int:
+        return self.state()["generation"]
+
+    def synced_this_boot(self) -> bool:
+        return self.state().get("synced_boot") == self.boot
+
+    def publish(self, synced: bool = False) -> int:
+        # Chamado pelo escritor, ainda com o lock, depois de cada escrita;
+        # ``synced`` marca que o sync desta subida já rodou.
+        state = self.state()
+        state.update(generation=state["generation"] + 1, pid=os.getpid())
+        if synced:
+            state["synced_boot"] = self.boot
+        tmp = f"{self.generation_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.generation_path)
+        return state["generation"]
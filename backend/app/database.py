@@ -1,17 +1,118 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.config import settings
+from app.logger import get_logger
+from app.metrics import registry
 
-DATABASE_URL = f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}"
+logger = get_logger("database")
 
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = settings.DATABASE_URL or f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}"
+
+POOL_CHECKOUT_SECONDS = registry.histogram(
+    "pixaflow_db_pool_checkout_seconds",
+    "Espera para obter uma conexão do pool do SQLAlchemy",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+POOL_TIMEOUTS = registry.counter(
+    "pixaflow_db_pool_timeouts_total",
+    "Checkouts que estouraram DB_POOL_TIMEOUT com o pool esgotado"
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    # O SQLAlchemy só emite eventos depois do checkout; medir dentro de
+    # ``_do_get`` inclui o tempo de espera por uma conexão livre.
+    def _do_get(self):
+        with POOL_CHECKOUT_SECONDS.time():
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                POOL_TIMEOUTS.inc()
+                raise
+
+
+def pool_size() -> int:
+    # Uma conexão por thread que usa o banco ao mesmo tempo: inferência,
+    # trabalho de fundo (sync, ingestão) e o writer do histórico. O overflow
+    # cobre as rotas síncronas do threadpool. DB_POOL_SIZE=0 calcula.
+    threads = settings.INFERENCE_WORKERS + settings.BACKGROUND_WORKERS + 1
+    if settings.DB_POOL_SIZE <= 0:
+        return threads
+    if settings.DB_POOL_SIZE + max(settings.DB_MAX_OVERFLOW, 0) < threads:
+        logger.warning(
+            f"⚠️  DB_POOL_SIZE={settings.DB_POOL_SIZE} + DB_MAX_OVERFLOW={settings.DB_MAX_OVERFLOW} "
+            f"é menor que as {threads} threads que usam o banco; consultas vão esperar por conexão"
+        )
+    return settings.DB_POOL_SIZE
+
+
+def engine_options(url: str) -> dict:
+    backend = make_url(url).get_backend_name()
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if backend == "sqlite":
+        # SQLite em memória usa um pool por thread; não há servidor para
+        # derrubar conexões ociosas.
+        return options
+
+    options.update(
+        pool_size=pool_size(),
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        # Abaixo do wait_timeout do MySQL, para evitar "server has gone away".
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if backend == "mysql":
+        options["connect_args"] = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+    return options
+
+
+def _create_engine(url: str):
+    options = engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = InstrumentedQueuePool
+    return create_engine(url, **options)
+
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+def pool_status():
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(settings.DB_MAX_OVERFLOW, 0)
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 4) if capacity else 0.0,
+    }
+
+
+registry.gauge(
+    "pixaflow_db_pool_connections",
+    "Conexões do pool do SQLAlchemy",
+    lambda: {(state,): value for state, value in pool_status().items() if state != "saturation"},
+    labelnames=("state",)
+)
+registry.gauge(
+    "pixaflow_db_pool_saturation",
+    "Fração da capacidade do pool (size + overflow) em uso",
+    lambda: pool_status().get("saturation")
+)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
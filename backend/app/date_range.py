@@ -0,0 +1,109 @@
+import re
+from datetime import datetime, timedelta
+from app.intent_router import strip_accents
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+_DATE = r"(\d{1,2})/(\d{1,2})/(\d{4})"
+_BETWEEN_RE = re.compile(rf"entre\s+{_DATE}\s+e\s+{_DATE}")
+_SINCE_RE = re.compile(rf"(?:desde|a partir de)\s+{_DATE}")
+_DAY_RE = re.compile(rf"\b{_DATE}\b")
+_LAST_DAYS_RE = re.compile(r"ultim[oa]s?\s+(\d+)\s+(dia|semana|mes|meses|ano)s?")
+_MONTH_RE = re.compile(r"\b(" + "|".join(MONTHS) + r")(?:\s+(?:de\s+)?(\d{4}))?\b")
+_YEAR_RE = re.compile(r"\b(?:em|de|no ano de|ano)\s+(\d{4})\b")
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year, month, 1)
+
+
+def _next_month(start: datetime) -> datetime:
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def _day(match, offset: int = 0):
+    day, month, year = (int(v) for v in match.groups()[offset:offset + 3])
+    return datetime(year, month, day)
+
+
+def parse_date_range(question: str, now: datetime = None):
+    # Intervalo [início, fim) citado na pergunta, ou None. Cobre as formas
+    # mais comuns em português: datas dd/mm/aaaa, meses, anos e expressões
+    # relativas como "ontem", "este mês" ou "últimos 7 dias".
+    now = now or datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    text = strip_accents(question.lower())
+
+    try:
+        match = _BETWEEN_RE.search(text)
+        if match:
+            return _day(match), _day(match, 3) + timedelta(days=1)
+        match = _SINCE_RE.search(text)
+        if match:
+            return _day(match), today + timedelta(days=1)
+        match = _DAY_RE.search(text)
+        if match:
+            start = _day(match)
+            return start, start + timedelta(days=1)
+    except ValueError:
+        return None
+
+    if "anteontem" in text:
+        return today - timedelta(days=2), today - timedelta(days=1)
+    if "ontem" in text:
+        return today - timedelta(days=1), today
+    if "hoje" in text:
+        return today, today + timedelta(days=1)
+
+    match = _LAST_DAYS_RE.search(text)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        days = {"dia": 1, "semana": 7, "mes": 30, "meses": 30, "ano": 365}[unit] * amount
+        return today - timedelta(days=days - 1), today + timedelta(days=1)
+
+    if "semana passada" in text:
+        start = today - timedelta(days=today.weekday() + 7)
+        return start, start + timedelta(days=7)
+    if "esta semana" in text or "essa semana" in text:
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=7)
+
+    this_month = _month_start(today.year, today.month)
+    if "mes passado" in text:
+        start = _month_start(this_month.year - 1, 12) if this_month.month == 1 else _month_start(this_month.year, this_month.month - 1)
+        return start, this_month
+    if "este mes" in text or "esse mes" in text:
+        return this_month, _next_month(this_month)
+
+    match = _MONTH_RE.search(text)
+    if match:
+        month = MONTHS[match.group(1)]
+        if match.group(2):
+            year = int(match.group(2))
+        else:
+            # Sem ano, vale a ocorrência mais recente daquele mês.
+            year = today.year if month <= today.month else today.year - 1
+        start = _month_start(year, month)
+        return start, _next_month(start)
+
+    if "ano passado" in text:
+        return datetime(today.year - 1, 1, 1), datetime(today.year, 1, 1)
+    if "este ano" in text or "esse ano" in text:
+        return datetime(today.year, 1, 1), datetime(today.year + 1, 1, 1)
+    match = _YEAR_RE.search(text)
+    if match:
+        year = int(match.group(1))
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+    return None
+
+
+def format_date_range(date_range) -> str:
+    start, end = date_range
+    last = end - timedelta(days=1)
+    if start == last:
+        return start.strftime("%d/%m/%Y")
+    return f"{start.strftime('%d/%m/%Y')} a {last.strftime('%d/%m/%Y')}"
@@ -0,0 +1,215 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.ingestion import DEFAULT_METADATA, batched
+from app.logger import get_logger
+
+logger = get_logger("documents")
+
+READ_BLOCK_SIZE = 1024 * 1024
+# Tipos que o Chroma aceita como valor de metadata.
+METADATA_TYPES = (str, int, float, bool)
+_BREAKS = ("\n\n", "\n", ". ", " ")
+
+
+def _cut_point(text: str, size: int) -> int:
+    # Prefere cortar em parágrafo, linha, frase ou palavra, desde que o
+    # pedaço não fique menor que metade do tamanho pedido.
+    for separator in _BREAKS:
+        index = text.rfind(separator, size // 2, size)
+        if index != -1:
+            return index + len(separator)
+    return size
+
+
+def _overlap_start(text: str, cut: int, overlap: int) -> int:
+    # O trecho seguinte repete o final do anterior a partir do início de uma palavra.
+    if cut <= overlap:
+        return cut
+    space = text.find(" ", cut - overlap, cut)
+    return space + 1 if space != -1 else cut - overlap
+
+
+def stream_chunks(pieces, size: int = 1000, overlap: int = 200):
+    # ``pieces`` pode ser um arquivo lido em blocos: só ``size`` + um bloco
+    # ficam em memória, independente do tamanho do documento.
+    buffer = ""
+    carried = 0
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= size:
+            cut = _cut_point(buffer, size)
+            chunk = buffer[:cut].strip()
+            if chunk:
+                yield chunk
+            start = _overlap_start(buffer, cut, overlap)
+            carried = cut - start
+            buffer = buffer[start:]
+    if len(buffer) > carried and buffer.strip():
+        yield buffer.strip()
+
+
+def chunk_text(text: str, size: int = 1000, overlap: int = 200):
+    return list(stream_chunks([text], size, overlap))
+
+
+def chunk_id(text: str) -> str:
+    # Id derivado do conteúdo: reenviar o mesmo trecho cai no mesmo id.
+    return "doc_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def document_chunks(documents, size: int, overlap: int):
+    # ``documents`` gera (partes do texto, metadata); cada trecho sai como
+    # (id, texto, metadata) no formato do BulkIngestor.
+    for pieces, metadata in documents:
+        for index, chunk in enumerate(stream_chunks(pieces, size, overlap)):
+            yield chunk_id(chunk), chunk, dict(metadata or DEFAULT_METADATA, chunk=index)
+
+
+def skip_existing(collection, chunks, batch_size: int, report: dict):
+    seen = set()
+    for batch in batched(chunks, batch_size):
+        fresh = []
+        for doc_id, doc_text, metadata in batch:
+            if doc_id in seen:
+                report["duplicates"] += 1
+                continue
+            seen.add(doc_id)
+            fresh.append((doc_id, doc_text, metadata))
+        report["chunks"] += len(batch)
+        if not fresh:
+            continue
+        existing = set(collection.get(ids=[doc_id for doc_id, _, _ in fresh], include=[])["ids"])
+        report["duplicates"] += len(existing)
+        yield from (doc for doc in fresh if doc[0] not in existing)
+
+
+def read_blocks(path: str, block_size: int = READ_BLOCK_SIZE):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def ndjson_documents(path: str):
+    # Uma linha por documento: {"text": "...", "metadata": {...}}.
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Linha {number} não é JSON válido: {e}") from e
+            if isinstance(record, str):
+                record = {"text": record}
+            text = record.get("text") or record.get("content")
+            if not text:
+                raise ValueError(f"Linha {number} sem campo 'text'")
+            yield [text], _checked_metadata(record.get("metadata"), number)
+
+
+def _checked_metadata(metadata, number: int):
+    # O Chroma recusa valores aninhados só na hora de gravar o lote; checar
+    # por linha evita que o job falhe no meio com lotes anteriores já gravados
+    # sem dizer qual linha estava errada.
+    if metadata is None:
+        return None
+    if not isinstance(metadata, dict):
+        raise ValueError(f"Linha {number}: 'metadata' deve ser um objeto")
+    for key, value in metadata.items():
+        if not isinstance(value, METADATA_TYPES):
+            raise ValueError(
+                f"Linha {number}: metadata '{key}' deve ser texto, número ou booleano"
+            )
+    return metadata
+
+
+def file_documents(path: str, kind: str, filename: str = None):
+    if kind == "ndjson":
+        return ndjson_documents(path)
+    metadata = dict(DEFAULT_METADATA, arquivo=filename) if filename else None
+    return iter([(read_blocks(path), metadata)])
+
+
+class IngestJobs:
+    def __init__(self, max_jobs: int = 100, scheduler=None):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        # Com o agendador, os jobs entram na fila de fundo ("ingest"); sem
+        # ele, um job por vez: os lotes já usam todos os workers de embedding.
+        self.scheduler = scheduler
+        self._executor = None if scheduler else ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-job")
+
+    def submit(self, run, files, cleanup=True):
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "files": [name for _, _, name in files],
+            "documents": 0,
+            "chunks": 0,
+            "duplicates": 0,
+            "written": 0,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest]["status"] in ("queued", "running"):
+                    break
+                self._jobs.pop(oldest)
+        snapshot = dict(job)
+        if self.scheduler:
+            self.scheduler.submit("ingest", self._run, job, run, files, cleanup)
+        else:
+            self._executor.submit(self._run, job, run, files, cleanup)
+        return snapshot
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job, **values):
+        with self._lock:
+            job.update(values)
+
+    def _run(self, job, run, files, cleanup):
+        self.update(job, status="running", started_at=time.time())
+        try:
+            documents = itertools.chain.from_iterable(
+                file_documents(path, kind, name) for path, kind, name in files
+            )
+            run(documents, lambda report: self.update(job, **report))
+            self.update(job, status="done")
+        except Exception as e:
+            logger.error(f"❌ Erro no job de ingestão {job['id']}: {e}")
+            self.update(job, status="failed", error=str(e))
+        finally:
+            self.update(job, finished_at=time.time())
+            if cleanup:
+                for path, _, _ in files:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def shutdown(self):
+        # A fila do agendador é encerrada junto com o app.
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.quantization import check_dtype, decode, encode
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, model_name: str, max_memory_items: int = 10000, max_disk_items: int = 1000000, storage_dtype: str = "float32"):
+        self.path = path
+        self.model_name = model_name
+        # float16 e int8 guardam 2x e 4x mais vetores no mesmo espaço, em
+        # memória e em disco; o vetor volta para float32 na leitura.
+        self.storage_dtype = check_dtype(storage_dtype)
+        self._namespace = model_name if storage_dtype == "float32" else f"{model_name}\x00{storage_dtype}"
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts_since_prune = 0
+        self._stats = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, "
+            "vector BLOB NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self._namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _count(self, namespace, field, amount=1):
+        counters = self._stats.setdefault(namespace, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counters[field] += amount
+
+    def _remember(self, key, blob):
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str], namespace: str = "documents"):
+        keys = [self.key(t) for t in texts]
+        found = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = decode(blob, self.storage_dtype)
+                    self._count(namespace, "memory_hits")
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    list(missing)
+                ).fetchall()
+
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows]
+                    )
+                    self._conn.commit()
+
+                for key, blob in rows:
+                    vector = decode(blob, self.storage_dtype)
+                    self._remember(key, blob)
+                    for i in missing.pop(key):
+                        found[i] = vector
+                        self._count(namespace, "disk_hits")
+
+            for indexes in missing.values():
+                self._count(namespace, "misses", len(indexes))
+
+        return found
+
+    def put_many(self, texts: list[str], vectors):
+        now = time.time()
+        rows = []
+
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                blob = encode(vector, self.storage_dtype)
+                self._remember(key, blob)
+                rows.append((key, blob, now))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+            self._inserts_since_prune += len(rows)
+            if self._inserts_since_prune >= 1000:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        self._inserts_since_prune = 0
+        total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = total - self.max_disk_items
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            result = {"memory_items": len(self._memory)}
+            for namespace, counters in self._stats.items():
+                lookups = sum(counters.values())
+                hits = counters["memory_hits"] + counters["disk_hits"]
+                result[namespace] = dict(
+                    counters,
+                    hit_rate=round(hits / lookups, 4) if lookups else 0.0
+                )
+            return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, base: Embeddings, cache: EmbeddingCache):
+        self.base = base
+        self.cache = cache
+
+    def _embed(self, texts: list[str], namespace: str):
+        vectors = self.cache.get_many(texts, namespace=namespace)
+
+        pending = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                pending.setdefault(texts[i], []).append(i)
+
+        if pending:
+            unique_texts = list(pending)
+            computed = self.base.embed_documents(unique_texts)
+            self.cache.put_many(unique_texts, computed)
+            for text, vector in zip(unique_texts, computed):
+                for i in pending[text]:
+                    vectors[i] = vector
+
+        return [np.asarray(v, dtype=np.float32).tolist() for v in vectors]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self._embed(texts, "documents")
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self._embed(texts, "query")
+
+
+def embed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_queries(texts)
+    return embeddings.embed_documents(texts)
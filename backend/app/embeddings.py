@@ -0,0 +1,119 @@
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BACKENDS = ("torch", "onnx")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class EmbeddingBackend(Embeddings):
+    # ``encode`` devolve uma matriz float32 (n, dim); a interface do
+    # langchain, o cache e os processos de ingestão usam só ela.
+    def encode(self, texts: list[str]):
+        raise NotImplementedError
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.encode([text])[0].tolist()
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    def __init__(self, model_name: str, threads: int = 0, batch_size: int = 32):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    def encode(self, texts: list[str]):
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return vectors.astype(np.float32)
+
+
+def mean_pool(hidden, mask):
+    mask = mask[..., None].astype(np.float32)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def l2_normalize(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+class OnnxBackend(EmbeddingBackend):
+    # O mesmo modelo exportado por app/onnx_export.py, rodando no
+    # onnxruntime (que o chromadb já instala) em vez do PyTorch. Reproduz o
+    # pipeline do sentence-transformers: tokens, média e normalização L2.
+    def __init__(self, session, tokenizer, max_length: int = 256, batch_size: int = 32):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        padding = tokenizer.padding or {}
+        tokenizer.enable_truncation(max_length)
+        tokenizer.enable_padding(pad_id=padding.get("pad_id", 0), pad_token=padding.get("pad_token", "[PAD]"))
+        self._inputs = {i.name for i in session.get_inputs()}
+
+    @classmethod
+    def load(cls, path: str, quantized: bool = True, threads: int = 0, max_length: int = 256, batch_size: int = 32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(path, ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(
+                f"Modelo ONNX não encontrado em {model_file}. "
+                f"Gere com: python -m app.onnx_export --output {path}"
+            )
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        tokenizer = Tokenizer.from_file(os.path.join(path, TOKENIZER_FILE))
+        return cls(session, tokenizer, max_length, batch_size)
+
+    def _run(self, texts: list[str]):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.asarray([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+        }
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+        return l2_normalize(mean_pool(hidden, mask))
+
+    def encode(self, texts: list[str]):
+        # Textos de tamanho parecido no mesmo lote: menos padding processado.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            chunk = order[start:start + self.batch_size]
+            for i, vector in zip(chunk, self._run([texts[i] for i in chunk])):
+                vectors[i] = vector
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embeddings(backend: str, model_name: str, onnx_path: str = "", quantized: bool = True, threads: int = 0, max_length: int = 256):
+    if backend == "torch":
+        return SentenceTransformerBackend(model_name, threads)
+    if backend == "onnx":
+        return OnnxBackend.load(onnx_path, quantized, threads, max_length)
+    raise ValueError(f"Backend de embeddings inválido: {backend} (use {', '.join(BACKENDS)})")
+
+
+def embedding_model_key(backend: str, model_name: str, quantized: bool = True) -> str:
+    # Identifica os vetores no cache: int8 e float32 não dão vetores iguais.
+    if backend == "torch":
+        return model_name
+    return f"{model_name}@{backend}" + ("-int8" if quantized else "")
@@ -0,0 +1,69 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.metrics import WORKLOAD_WAIT_SECONDS
+
+
+class ExecutorSaturated(Exception):
+    pass
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers: int, max_queue: int, name: str = "inference", workload: str = "query"):
+        self.max_workers = max_workers
+        self.workload = workload
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._acquire():
+            raise ExecutorSaturated()
+        try:
+            future = self._pool.submit(self._call, time.perf_counter(), functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        # O slot só é liberado quando o trabalho termina de fato, mesmo que
+        # o cliente desconecte e a corrotina seja cancelada antes.
+        future.add_done_callback(self._release)
+        return future
+
+    def _call(self, submitted, fn):
+        WORKLOAD_WAIT_SECONDS.observe(time.perf_counter() - submitted, workload=self.workload)
+        return fn()
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.max_queue,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+inference_executor = InferenceExecutor(settings.INFERENCE_WORKERS, settings.INFERENCE_QUEUE_SIZE)
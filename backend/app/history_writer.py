@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import insert
+from app.config import settings
+from app.database import SessionLocal
+from app.logger import get_logger
+from app.metrics import registry, timed
+from app.models import Query
+
+logger = get_logger("history")
+
+
+class HistoryWriter:
+    def __init__(self, session_factory, batch_size: int = 200, flush_interval: float = 1.0, max_backlog: int = 10000, retry_max_seconds: float = 30.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.retry_max_seconds = retry_max_seconds
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = deque()
+        self._thread = None
+        self._stopping = False
+        self._stats = {"written": 0, "dropped": 0, "batches": 0, "failed_flushes": 0}
+
+    def record(self, question: str, answer: str):
+        return self.record_many([(question, answer)])
+
+    def record_many(self, entries):
+        # Nunca bloqueia a requisição: com o backlog cheio (banco fora do ar
+        # por muito tempo) as entradas são descartadas e contabilizadas. Um
+        # lote entra inteiro no buffer ou não entra.
+        now = datetime.utcnow()
+        rows = [{"query_text": question, "response": answer, "created_at": now} for question, answer in entries]
+        if not rows:
+            return True
+        with self._lock:
+            if self._stopping or len(self._pending) + len(rows) > self.max_backlog:
+                self._stats["dropped"] += len(rows)
+                return False
+            self._pending.extend(rows)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="history-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            if self._pending:
+                logger.warning(f"⚠️  {len(self._pending)} registro(s) de histórico descartados no desligamento")
+                self._stats["dropped"] += len(self._pending)
+                self._pending.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, backlog=len(self._pending))
+
+    def _flush(self, rows):
+        db = self.session_factory()
+        try:
+            with timed("history_write"):
+                # Um único INSERT multi-linha por lote.
+                db.execute(insert(Query), rows)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _loop(self):
+        backoff = 0.0
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + (backoff or self.flush_interval)
+                # Depois de uma falha espera o backoff inteiro, mesmo com o
+                # buffer cheio, para não martelar um banco fora do ar.
+                while not self._stopping and (backoff or len(self._pending) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                if not self._pending:
+                    if self._stopping:
+                        return
+                    continue
+                rows = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+                stopping = self._stopping
+
+            try:
+                self._flush(rows)
+            except Exception as e:
+                with self._lock:
+                    self._stats["failed_flushes"] += 1
+                # Os registros continuam no buffer até o banco voltar.
+                backoff = min(max(backoff * 2, self.flush_interval), self.retry_max_seconds)
+                logger.warning(f"⚠️  Erro ao gravar histórico ({len(rows)} registro(s) pendentes): {e}")
+                if stopping:
+                    return
+                continue
+
+            backoff = 0.0
+            with self._lock:
+                for _ in range(min(len(rows), len(self._pending))):
+                    self._pending.popleft()
+                self._stats["written"] += len(rows)
+                self._stats["batches"] += 1
+
+
+history_writer = HistoryWriter(
+    SessionLocal,
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    flush_interval=settings.HISTORY_FLUSH_INTERVAL,
+    max_backlog=settings.HISTORY_MAX_BACKLOG,
+    retry_max_seconds=settings.HISTORY_RETRY_MAX_SECONDS
+)
+
+registry.gauge(
+    "pixaflow_history_backlog",
+    "Registros de histórico aguardando gravação",
+    lambda: history_writer.stats()["backlog"]
+)
+registry.gauge(
+    "pixaflow_history_records",
+    "Registros de histórico gravados ou descartados desde o início do processo",
+    lambda: {(event,): history_writer.stats()[event] for event in ("written", "dropped")},
+    labelnames=("event",)
+)
+registry.gauge(
+    "pixaflow_history_failed_flushes",
+    "Lotes de histórico que falharam e serão tentados novamente",
+    lambda: history_writer.stats()["failed_flushes"]
+)
@@ -0,0 +1,160 @@
+import itertools
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.embeddings import create_embeddings
+from app.metrics import timed
+
+DEFAULT_METADATA = {"source": "documento"}
+
+_worker_model = None
+
+
+def _init_worker(spec: dict, threads: int, nice: int = 0):
+    # ``spec`` são os argumentos de create_embeddings: cada processo carrega
+    # o mesmo backend (torch ou ONNX) que o serviço usa para as perguntas.
+    # Com ``nice`` os processos de ingestão perdem a CPU para as consultas.
+    global _worker_model
+    if nice:
+        os.nice(nice)
+    _worker_model = create_embeddings(**spec, threads=threads)
+
+
+def _embed_in_worker(texts: list[str]):
+    return _worker_model.encode(texts)
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class BulkIngestor:
+    def __init__(self, collection, embeddings, worker_spec: dict, batch_size: int = 256, workers: int = 0,
+                 write_batch_size: int = 1000, pause=None, nice: int = 0):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.cache = getattr(embeddings, "cache", None)
+        self.worker_spec = worker_spec
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.write_batch_size = write_batch_size
+        # Chamado antes de cada lote: o agendador segura o trabalho de fundo
+        # enquanto houver consultas.
+        self.pause = pause or (lambda: None)
+        self.nice = nice
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.worker_spec, threads, self.nice)
+            )
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _write(self, batch, vectors, collection):
+        with timed("ingest_write"):
+            self._write_chunks(batch, vectors, collection)
+
+    def _write_chunks(self, batch, vectors, collection):
+        for start in range(0, len(batch), self.write_batch_size):
+            chunk = batch[start:start + self.write_batch_size]
+            collection.upsert(
+                ids=[doc_id for doc_id, _, _ in chunk],
+                documents=[doc_text for _, doc_text, _ in chunk],
+                metadatas=[metadata or DEFAULT_METADATA for _, _, metadata in chunk],
+                embeddings=[
+                    np.asarray(v, dtype=np.float32).tolist()
+                    for v in vectors[start:start + self.write_batch_size]
+                ]
+            )
+
+    def _embed_local(self, batch):
+        with timed("ingest_embedding"):
+            return self.embeddings.embed_documents([doc_text for _, doc_text, _ in batch])
+
+    def _submit(self, batch):
+        texts = [doc_text for _, doc_text, _ in batch]
+        cached = self.cache.get_many(texts) if self.cache else [None] * len(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+
+        future = None
+        if missing:
+            future = self._get_pool().submit(_embed_in_worker, [texts[i] for i in missing])
+        return batch, texts, cached, missing, future
+
+    def _collect(self, pending, collection):
+        batch, texts, vectors, missing, future = pending
+        if future is not None:
+            with timed("ingest_embedding_wait"):
+                computed = future.result()
+            if self.cache:
+                self.cache.put_many([texts[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        self._write(batch, vectors, collection)
+
+    def ingest(self, documents, on_batch=None, collection=None):
+        # Documentos chegam como (id, texto, metadata) de um iterável que pode
+        # ser um cursor do banco; no máximo ``workers * 2`` lotes ficam em
+        # memória ao mesmo tempo, então o consumo não cresce com o volume.
+        # ``collection`` troca o destino da escrita (ex.: partições de vendas).
+        collection = collection if collection is not None else self.collection
+        started = time.perf_counter()
+        report = {"documents": 0, "batches": 0}
+
+        batches = batched(documents, self.batch_size)
+        first = next(batches, None)
+        if first is None:
+            report["seconds"] = 0.0
+            report["docs_per_second"] = 0.0
+            return report
+
+        def done(batch):
+            report["documents"] += len(batch)
+            report["batches"] += 1
+            if on_batch:
+                on_batch(report)
+
+        second = next(batches, None)
+        remaining = itertools.chain([first], [second] if second else [], batches)
+
+        if second is None or self.workers <= 1:
+            for batch in remaining:
+                self.pause()
+                self._write(batch, self._embed_local(batch), collection)
+                done(batch)
+        else:
+            in_flight = deque()
+            for batch in remaining:
+                self.pause()
+                in_flight.append(self._submit(batch))
+                if len(in_flight) >= self.workers * 2:
+                    pending = in_flight.popleft()
+                    self._collect(pending, collection)
+                    done(pending[0])
+            while in_flight:
+                pending = in_flight.popleft()
+                self._collect(pending, collection)
+                done(pending[0])
+
+        elapsed = time.perf_counter() - started
+        report["seconds"] = round(elapsed, 3)
+        report["docs_per_second"] = round(report["documents"] / elapsed, 1) if elapsed else 0.0
+        return report
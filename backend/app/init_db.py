@@ -5,6 +5,10 @@ from sqlalchemy.orm import Session
 def init_database():
     print("🔄 Criando tabelas...")
     Base.metadata.create_all(bind=engine)
+    # create_all não adiciona índices novos a tabelas que já existem.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("✅ Tabelas criadas!")
     
     db = Session(bind=engine)
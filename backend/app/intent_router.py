@@ -0,0 +1,224 @@
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+import numpy as np
+from sqlalchemy import text
+from app.sync import estoque_documents, estoque_metadata, format_price
+
+QUANTITY_WORDS = ["quanto", "quantos", "quantidade"]
+PRICE_WORDS = ["preço", "valor", "custa"]
+SALES_WORDS = ["venda", "vendeu", "cliente"]
+LIST_WORDS = ["lista", "todos", "quais"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def strip_accents(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def singularize(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith(("oes", "aes")):
+        return word[:-3] + "ao"
+    if word.endswith("ns"):
+        return word[:-2] + "m"
+    if word.endswith(("res", "zes")) and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def tokenize(value: str) -> list[str]:
+    return [singularize(t) for t in _TOKEN_RE.findall(strip_accents(value.lower()))]
+
+
+def normalize(value: str) -> str:
+    return " ".join(tokenize(value))
+
+
+def detect_intent(question: str):
+    question_lower = question.lower()
+    return {
+        "quantity": any(w in question_lower for w in QUANTITY_WORDS),
+        "price": any(w in question_lower for w in PRICE_WORDS),
+        "sales": any(w in question_lower for w in SALES_WORDS),
+        "list": any(w in question_lower for w in LIST_WORDS)
+    }
+
+
+def product_answer(metadata: dict, intent: dict):
+    prod = metadata.get("produto")
+    qtd = metadata.get("quantidade")
+    preco = metadata.get("preco")
+    cat = metadata.get("categoria")
+
+    price = format_price(preco, "/un")
+
+    if intent["price"]:
+        return f"💰 **{prod}**: {price}\nEstoque: {qtd} unidades\n✅ Preço do banco de dados"
+    if intent["quantity"]:
+        return f"📦 **{prod}**: {qtd} unidades disponíveis\nPreço: {price}\n✅ Quantidade atualizada do MySQL"
+    return f"📦 **{prod}** ({cat})\n• Quantidade: {qtd} un\n• Preço: {price}\n✅ Dados do estoque"
+
+
+def retrieval_filter(intent: dict, products, clients=()):
+    # Filtro ``where`` do ChromaDB a partir da intenção e dos produtos citados,
+    # para a busca já voltar só linhas da fonte e do produto certos.
+    # As palavras de intenção casam por substring ("quais", "valor"), então
+    # sozinhas não restringem ao estoque: sem produto citado a pergunta pode
+    # ser sobre um documento da base de conhecimento.
+    names = sorted({name for name in products if name})
+    clauses = []
+    if intent["sales"]:
+        clauses.append({"source": "vendas"})
+    elif names and (intent["price"] or intent["quantity"] or intent["list"]):
+        clauses.append({"source": "estoque"})
+
+    if len(names) == 1:
+        clauses.append({"produto": names[0]})
+    elif names:
+        clauses.append({"produto": {"$in": names}})
+
+    clients = sorted(set(clients))
+    if len(clients) == 1:
+        clauses.append({"cliente": clients[0]})
+    elif clients:
+        clauses.append({"cliente": {"$in": clients}})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+class NameMatcher:
+    # Acha nomes de uma ou mais palavras (produtos, clientes) na pergunta.
+    # ``entries`` são pares (tokens do nome, valor devolvido no match).
+    def __init__(self, entries=()):
+        by_first_token = {}
+        for tokens, value in entries:
+            if tokens:
+                by_first_token.setdefault(tokens[0], []).append((tuple(tokens), value))
+        # Nomes mais longos primeiro, para "feijão preto" ganhar de "feijão".
+        for candidates in by_first_token.values():
+            candidates.sort(key=lambda c: len(c[0]), reverse=True)
+        self._by_first_token = by_first_token
+
+    def match(self, question: str):
+        tokens = tokenize(question)
+        matches = {}
+        for i, token in enumerate(tokens):
+            for candidate, value in self._by_first_token.get(token, ()):
+                if tuple(tokens[i:i + len(candidate)]) == candidate:
+                    matches[value] = None
+                    break
+        return list(matches)
+
+
+ProductRow = namedtuple("ProductRow", ["id", "produto", "quantidade", "unidade", "preco", "categoria"])
+
+
+class ProductIndex:
+    # Também é o armazenamento lateral dos metadados do estoque: uma coluna
+    # por campo, indexada pela posição do produto, em vez de um dicionário
+    # completo por documento no ChromaDB.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matcher = NameMatcher()
+        self._positions = {}
+        self._columns = _empty_columns()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def refresh(self, db):
+        names = []
+        positions = {}
+        columns = {name: [] for name in ProductRow._fields}
+
+        result = db.execute(
+            text("SELECT id, produto, quantidade, unidade, preco, categoria FROM estoque")
+        )
+        for row in result:
+            tokens = tuple(tokenize(row.produto))
+            if not tokens:
+                continue
+            positions[row.id] = len(columns["id"])
+            for name in ProductRow._fields:
+                columns[name].append(getattr(row, name))
+            names.append((tokens, row.id))
+
+        columns["id"] = np.asarray(columns["id"], dtype=np.int64)
+        columns["quantidade"] = np.asarray(columns["quantidade"], dtype=np.int64)
+        columns["preco"] = np.asarray([p if p is not None else np.nan for p in columns["preco"]], dtype=np.float64)
+
+        with self._lock:
+            self._matcher = NameMatcher(names)
+            self._positions = positions
+            self._columns = columns
+
+    def row(self, row_id: int):
+        with self._lock:
+            position = self._positions.get(row_id)
+            columns = self._columns
+        if position is None:
+            return None
+        return ProductRow(
+            int(columns["id"][position]),
+            columns["produto"][position],
+            int(columns["quantidade"][position]),
+            columns["unidade"][position],
+            float(columns["preco"][position]),
+            columns["categoria"][position],
+        )
+
+    def metadata(self, row_id: int):
+        row = self.row(row_id)
+        return estoque_metadata(row) if row else None
+
+    def match(self, question: str):
+        with self._lock:
+            matcher = self._matcher
+        return [row for row in map(self.row, matcher.match(question)) if row is not None]
+
+
+def _empty_columns():
+    columns = {name: [] for name in ProductRow._fields}
+    columns["id"] = np.zeros(0, dtype=np.int64)
+    columns["quantidade"] = np.zeros(0, dtype=np.int64)
+    columns["preco"] = np.zeros(0, dtype=np.float64)
+    return columns
+
+
+class IntentRouter:
+    def __init__(self):
+        self.index = ProductIndex()
+
+    def refresh(self, db):
+        self.index.refresh(db)
+
+    def route(self, question: str):
+        # Só perguntas de preço ou quantidade: "como conservar alface?" cita
+        # um produto, mas a resposta está na base de conhecimento.
+        intent = detect_intent(question)
+        if intent["sales"] or intent["list"] or not (intent["price"] or intent["quantity"]):
+            return None
+
+        matches = self.index.match(question)
+        if len(matches) != 1:
+            return None
+
+        row = matches[0]
+        _, doc_text, _ = estoque_documents(row)[0]
+        metadata = estoque_metadata(row)
+        return {
+            "answer": product_answer(metadata, intent),
+            "sources": [doc_text],
+            "metadata": [metadata]
+        }
@@ -0,0 +1,156 @@
+import heapq
+import math
+import threading
+from collections import Counter
+from app.intent_router import tokenize
+
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "em", "no", "na",
+    "nos", "nas", "por", "para", "com", "e", "ou", "que", "qual", "se", "ao", "r",
+}
+
+
+def matches_where(metadata: dict, where: dict) -> bool:
+    # Subconjunto do filtro ``where`` do ChromaDB usado pelo RAGService.
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, expected in condition.items():
+                if op == "$eq" and value != expected:
+                    return False
+                if op == "$ne" and value == expected:
+                    return False
+                if op == "$in" and value not in expected:
+                    return False
+                if op == "$nin" and value in expected:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _terms(text: str):
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._docs = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        terms, length, _ = entry
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def upsert(self, ids, documents, metadatas):
+        with self._lock:
+            for doc_id, doc_text, metadata in zip(ids, documents, metadatas):
+                self._remove(doc_id)
+                terms = Counter(_terms(doc_text or ""))
+                length = sum(terms.values())
+                self._docs[doc_id] = (tuple(terms), length, metadata or {})
+                self._total_length += length
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[doc_id] = tf
+
+    def delete(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._total_length = 0
+
+    def rebuild(self, collection, page_size: int = 5000):
+        self.clear()
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            self.upsert(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+
+    def search(self, query: str, k: int, where: dict = None):
+        terms = set(_terms(query))
+        with self._lock:
+            total = len(self._docs)
+            if not terms or not total:
+                return []
+            avg_length = self._total_length / total
+            scores = {}
+            allowed = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                # Termos presentes em mais da metade da coleção ("produto",
+                # "preço") quase não pesam no BM25 e custam varrer a lista toda.
+                df = len(postings)
+                if df * 2 > total:
+                    continue
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    ok = allowed.get(doc_id)
+                    if ok is None:
+                        ok = allowed[doc_id] = matches_where(self._docs[doc_id][2], where)
+                    if not ok:
+                        continue
+                    length = self._docs[doc_id][1]
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class IndexedCollection:
+    # Envolve a coleção do ChromaDB para que toda escrita (sync, ingestão)
+    # também atualize o índice léxico; leituras vão direto para o ChromaDB.
+    def __init__(self, collection, lexical: LexicalIndex):
+        self._collection = collection
+        self.lexical = lexical
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def add(self, ids, documents=None, metadatas=None, embeddings=None, **kwargs):
+        self._collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings, **kwargs)
+        self.lexical.upsert(ids, documents or [""] * len(ids), metadatas or [None] * len(ids))
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None, **kwargs):
+        self._collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings, **kwargs)
+        self.lexical.upsert(ids, documents or [""] * len(ids), metadatas or [None] * len(ids))
+
+    def delete(self, ids=None, where=None, **kwargs):
+        if ids is None and where is not None:
+            ids = self._collection.get(where=where, include=[])["ids"]
+        if not ids:
+            return
+        self._collection.delete(ids=ids, **kwargs)
+        self.lexical.delete(ids)
@@ -0,0 +1,55 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from app.config import settings
+
+_listener = None
+_handler = None
+_stream = None
+
+
+def _start_listener():
+    global _listener
+    log_queue = queue.Queue(-1)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, _stream, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_in_child():
+    # A thread do listener não sobrevive ao fork (preload do gunicorn):
+    # cada worker sobe a sua, com uma fila nova no lugar da herdada.
+    if _listener is not None:
+        _start_listener()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _configure():
+    global _handler, _stream
+    # As threads de requisição só enfileiram o registro; a escrita no stdout
+    # acontece na thread do QueueListener.
+    _stream = logging.StreamHandler(sys.stdout)
+    _stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    _handler = QueueHandler(queue.Queue(-1))
+
+    root = logging.getLogger("pixaflow")
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.addHandler(_handler)
+    root.propagate = False
+
+    _start_listener()
+    atexit.register(_stop_listener)
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def get_logger(name: str) -> logging.Logger:
+    if _listener is None:
+        _configure()
+    return logging.getLogger(f"pixaflow.{name}")
@@ -1,9 +1,19 @@
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.routes import query_routes
-from app.database import engine, Base
+from app.config import settings
+from app.database import engine
+from app.executor import inference_executor
+from app.history_writer import history_writer
+from app.logger import get_logger
+from app.metrics import registry
+from app.rag_service import rag_service
+from app.readiness import readiness
+from app.scheduler import workload
 
-Base.metadata.create_all(bind=engine)
+logger = get_logger("app")
 
 app = FastAPI(
     title="RAG Query API",
@@ -17,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(query_routes.router, prefix="/api/v1", tags=["RAG Queries"])
@@ -31,7 +42,9 @@ async def root():
             "add_docs": "/api/v1/add-documents",
             "history": "/api/v1/queries",
             "sync": "/api/v1/sync-database",
-            "count": "/api/v1/documents/count"
+            "count": "/api/v1/documents/count",
+            "ready": "/ready",
+            "metrics": "/metrics"
         }
     }
 
@@ -39,17 +52,93 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
-@app.on_event("startup")
-async def startup_event():
+@app.get("/ready")
+async def readiness_check():
+    stages = readiness.snapshot()
+    ready = rag_service.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "stages": stages}
+    )
+
+def _cache_hit_rates():
+    embedding = rag_service.embedding_cache_stats()
+    values = {
+        (f"embedding_{namespace}",): embedding[namespace]["hit_rate"]
+        for namespace in ("documents", "query")
+        if namespace in embedding
+    }
+    answers = rag_service.answer_cache_stats()
+    if answers.get("enabled"):
+        values[("answer",)] = answers["hit_rate"]
+    return values
+
+registry.gauge(
+    "pixaflow_cache_hit_ratio",
+    "Taxa de acerto dos caches de embeddings e de respostas",
+    _cache_hit_rates,
+    labelnames=("cache",)
+)
+registry.gauge(
+    "pixaflow_vectorstore_documents",
+    "Documentos na coleção do ChromaDB",
+    lambda: rag_service.collection.count() if rag_service.collection else None
+)
+registry.gauge(
+    "pixaflow_inference_in_flight",
+    "Consultas em execução ou na fila do executor de inferência",
+    lambda: inference_executor.stats()["in_flight"]
+)
+registry.gauge(
+    "pixaflow_inference_rejected",
+    "Consultas recusadas por fila cheia desde o início do processo",
+    lambda: inference_executor.stats()["rejected"]
+)
+registry.gauge(
+    "pixaflow_query_batch_avg_size",
+    "Tamanho médio dos lotes de embeddings de perguntas",
+    lambda: rag_service.query_batcher.stats()["avg_batch_size"] if rag_service.query_batcher else None
+)
+registry.gauge(
+    "pixaflow_workload_jobs",
+    "Jobs de fundo na fila ou rodando, por classe (sync, ingest, maintenance)",
+    workload.depth,
+    labelnames=("workload", "state")
+)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Sem async: os gauges do índice chamam o ChromaDB (count), que bloqueia;
+    # como def o FastAPI roda a coleta no threadpool.
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def _bootstrap():
     try:
-        from app.rag_service import rag_service
-        print("✅ RAG Service inicializado!")
-        print(f"📚 Documentos no sistema: {rag_service.collection.count()}")
+        with readiness.stage("database"):
+            from app.init_db import init_database
+            # Vários workers sobem juntos: um por vez cria tabelas e dados.
+            with rag_service.coordinator.writer(settings.SYNC_LOCK_TIMEOUT):
+                init_database()
+            logger.info("✅ Banco de dados inicializado!")
     except Exception as e:
-        print(f"⚠️ Aviso ao inicializar RAG: {e}")
+        logger.warning(f"⚠️ Aviso ao inicializar DB: {e}")
+    
     try:
-        from app.init_db import init_database
-        init_database()
-        print("✅ Banco de dados inicializado!")
+        rag_service.start()
+        logger.info(f"📚 Documentos no sistema: {rag_service.collection.count()}")
     except Exception as e:
-        print(f"⚠️ Aviso ao inicializar DB: {e}")
\ No newline at end of file
+        logger.warning(f"⚠️ Aviso ao inicializar RAG: {e}")
+
+@app.on_event("startup")
+async def startup_event():
+    # Modelo, ChromaDB e sincronização sobem em segundo plano para que
+    # /health e /ready respondam imediatamente.
+    threading.Thread(target=_bootstrap, name="rag-startup", daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    inference_executor.shutdown()
+    workload.shutdown()
+    rag_service.shutdown()
+    history_writer.stop()
+    engine.dispose()
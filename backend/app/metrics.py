@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(s, counts=list(s["counts"]))) for key, s in self._series.items()]
+
+        result = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                result.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            result.append((f"{self.name}_sum", labels, series["sum"]))
+            result.append((f"{self.name}_count", labels, series["count"]))
+        return result
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, collect, labelnames=()):
+        # ``collect`` devolve {valores dos labels: valor} no momento do scrape.
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+
+    def samples(self):
+        try:
+            values = self._collect()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            (self.name, _format_labels(self.labelnames, key if isinstance(key, tuple) else (key,)), value)
+            for key, value in values.items()
+            if value is not None
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, collect, labelnames=()):
+        return self.register(Gauge(name, help_text, collect, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "pixaflow_stage_duration_seconds",
+    "Duração de cada etapa do pipeline RAG",
+    labelnames=("stage",)
+)
+QUERY_SECONDS = registry.histogram(
+    "pixaflow_query_duration_seconds",
+    "Duração total de RAGService.query por rota de resposta",
+    labelnames=("route",)
+)
+QUERIES_TOTAL = registry.counter(
+    "pixaflow_queries_total",
+    "Consultas processadas por rota de resposta",
+    labelnames=("route",)
+)
+WORKLOAD_WAIT_SECONDS = registry.histogram(
+    "pixaflow_workload_wait_seconds",
+    "Espera na fila até começar a rodar, por classe de trabalho",
+    labelnames=("workload",)
+)
+WORKLOAD_YIELD_SECONDS = registry.histogram(
+    "pixaflow_workload_yield_seconds",
+    "Pausas do trabalho de fundo cedendo a vez às consultas",
+    labelnames=("workload",)
+)
+
+
+def timed(stage: str):
+    return STAGE_SECONDS.time(stage=stage)
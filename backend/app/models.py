@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float
+from sqlalchemy import Column, Date, Integer, String, Text, DateTime, Float, Index
 from datetime import datetime
 from app.database import Base
 
@@ -16,18 +16,23 @@ class Query(Base):
     id = Column(Integer, primary_key=True, index=True)
     query_text = Column(Text, nullable=False)
     response = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Paginação por cursor em (created_at, id) percorre só este índice.
+    __table_args__ = (
+        Index("ix_queries_created_at_id", "created_at", "id"),
+    )
 
 class Estoque(Base):
     __tablename__ = "estoque"
     
     id = Column(Integer, primary_key=True, index=True)
-    produto = Column(String(100), nullable=False)
+    produto = Column(String(100), nullable=False, index=True)
     quantidade = Column(Integer, nullable=False)
     unidade = Column(String(20), default="unidade")
     preco = Column(Float)
     categoria = Column(String(50))
-    ultima_atualizacao = Column(DateTime, default=datetime.utcnow)
+    ultima_atualizacao = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 class Vendas(Base):
     __tablename__ = "vendas"
@@ -36,5 +41,22 @@ class Vendas(Base):
     produto = Column(String(100), nullable=False)
     quantidade = Column(Integer, nullable=False)
     valor_total = Column(Float)
-    data_venda = Column(DateTime, default=datetime.utcnow)
-    cliente = Column(String(100))
\ No newline at end of file
+    data_venda = Column(DateTime, default=datetime.utcnow, index=True)
+    cliente = Column(String(100))
+
+class VendasAgregado(Base):
+    # Totais por dia, produto e cliente, mantidos pelo sync a cada mês
+    # alterado; somar aqui é bem mais barato que varrer a tabela vendas.
+    __tablename__ = "vendas_agregados"
+    
+    dia = Column(Date, primary_key=True)
+    produto = Column(String(100), primary_key=True)
+    cliente = Column(String(100), primary_key=True, default="")
+    vendas = Column(Integer, nullable=False)
+    quantidade = Column(Integer, nullable=False)
+    valor_total = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_vendas_agregados_produto_dia", "produto", "dia"),
+        Index("ix_vendas_agregados_cliente_dia", "cliente", "dia"),
+    )
\ No newline at end of file
@@ -0,0 +1,52 @@
+import argparse
+import os
+from app.embeddings import ONNX_MODEL_FILE, ONNX_QUANTIZED_FILE
+
+
+def export(model_name: str, output: str, quantize: bool = True, opset: int = 14):
+    # Roda uma vez, fora do servidor: precisa de torch, transformers e onnx,
+    # que a imagem com EMBEDDING_BACKEND=onnx não instala.
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    sample = tokenizer(["Alface crespa orgânica"], return_tensors="pt")
+    model_file = os.path.join(output, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            model_file,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]},
+            opset_version=opset
+        )
+    tokenizer.save_pretrained(output)
+    print(f"✅ Modelo exportado: {model_file} ({os.path.getsize(model_file) / 1e6:.1f} MB)")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_file = os.path.join(output, ONNX_QUANTIZED_FILE)
+        quantize_dynamic(model_file, quantized_file, weight_type=QuantType.QInt8)
+        print(f"✅ Modelo int8: {quantized_file} ({os.path.getsize(quantized_file) / 1e6:.1f} MB)")
+
+
+def main():
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Exporta o modelo de embeddings para ONNX")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--output", default=settings.EMBEDDING_ONNX_PATH)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+    export(args.model, args.output, quantize=not args.no_quantize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+
+def check_dtype(dtype: str) -> str:
+    if dtype not in DTYPES:
+        raise ValueError(f"Tipo de armazenamento de vetores inválido: {dtype} (use {', '.join(DTYPES)})")
+    return dtype
+
+
+def _int8_codes(vectors):
+    # Escala simétrica por vetor: o maior componente vira ±127.
+    scales = np.abs(vectors).max(axis=-1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.round(vectors / scales[..., None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def encode(vector, dtype: str) -> bytes:
+    vector = np.asarray(vector, dtype=np.float32)
+    if dtype == "float16":
+        return vector.astype(np.float16).tobytes()
+    if dtype == "int8":
+        codes, scales = _int8_codes(vector[None, :])
+        return scales.tobytes() + codes.tobytes()
+    return vector.tobytes()
+
+
+def decode(blob: bytes, dtype: str):
+    if dtype == "float16":
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+    if dtype == "int8":
+        scale = np.frombuffer(blob[:4], dtype=np.float32)[0]
+        return np.frombuffer(blob[4:], dtype=np.int8).astype(np.float32) * scale
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class QuantizedMatrix:
+    # Matriz de vetores unitários pré-alocada, uma linha por slot. Em int8
+    # a varredura usa os códigos (1 byte por dimensão) e só os melhores
+    # ``rescore_factor * n`` candidatos são repontuados com a cópia float16.
+    def __init__(self, capacity: int, dim: int, dtype: str = "float32", rescore_factor: int = 4):
+        self.dtype = check_dtype(dtype)
+        self.rescore_factor = max(1, rescore_factor)
+        storage = np.float16 if dtype == "float16" else np.float32
+        if dtype == "int8":
+            self._codes = np.zeros((capacity, dim), dtype=np.int8)
+            self._scales = np.zeros(capacity, dtype=np.float32)
+            storage = np.float16
+        self._vectors = np.zeros((capacity, dim), dtype=storage)
+
+    @property
+    def nbytes(self):
+        total = self._vectors.nbytes
+        if self.dtype == "int8":
+            total += self._codes.nbytes + self._scales.nbytes
+        return total
+
+    def set(self, slot: int, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        self._vectors[slot] = vector
+        if self.dtype == "int8":
+            codes, scales = _int8_codes(vector[None, :])
+            self._codes[slot] = codes[0]
+            self._scales[slot] = scales[0]
+
+    def clear(self, slot: int):
+        self._vectors[slot] = 0
+        if self.dtype == "int8":
+            self._codes[slot] = 0
+            self._scales[slot] = 0.0
+
+    def top(self, query, n: int):
+        # (slot, produto escalar) dos ``n`` mais parecidos, do maior para o menor.
+        query = np.asarray(query, dtype=np.float32)
+        rows = self._vectors.shape[0]
+        if rows == 0:
+            return []
+        if self.dtype == "int8":
+            approx = (self._codes @ query) * self._scales
+            shortlist = min(rows, n * self.rescore_factor)
+            candidates = np.argpartition(-approx, shortlist - 1)[:shortlist]
+            scores = self._vectors[candidates].astype(np.float32) @ query
+        else:
+            scores = self._vectors @ query
+            candidates = np.arange(rows)
+        n = min(n, len(candidates))
+        best = np.argpartition(-scores, n - 1)[:n]
+        best = best[np.argsort(-scores[best])]
+        return [(int(candidates[i]), float(scores[i])) for i in best]
@@ -0,0 +1,128 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from langchain_core.documents import Document
+from app.embedding_cache import embed_queries
+from app.metrics import timed
+
+_STOP = object()
+
+
+class QueryBatcher:
+    def __init__(self, embeddings, collection, window_ms: float = 5.0, max_batch_size: int = 32):
+        self.embeddings = embeddings
+        self.collection = collection
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="query-batcher", daemon=True)
+        self._thread.start()
+
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._questions = 0
+
+    def search(self, question: str, k: int = 5, where: dict = None, with_ids: bool = False, vector=None):
+        # Com ``vector`` (já calculado pelo cache de respostas, por exemplo)
+        # a pergunta entra só na consulta do lote, sem passar pelo modelo.
+        future = Future()
+        self._queue.put((question, k, where, vector, future))
+        results = future.result()
+        return results if with_ids else [doc for _, doc in results]
+
+    def embed(self, question: str):
+        # k=0 pede só o vetor da pergunta, que também entra no lote.
+        future = Future()
+        self._queue.put((question, 0, None, None, future))
+        return future.result()
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "questions": self._questions,
+                "avg_batch_size": round(self._questions / self._batches, 2) if self._batches else 0.0
+            }
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            try:
+                self._process(batch)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        vectors = [vector for _, _, _, vector, _ in batch]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        # Um único forward pass do modelo para todas as perguntas da janela e
+        # uma única consulta multi-vetor no ChromaDB.
+        if missing:
+            with timed("embedding"):
+                embedded = embed_queries(self.embeddings, [batch[i][0] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+
+        with self._lock:
+            self._batches += 1
+            self._questions += len(batch)
+
+        # O filtro ``where`` vale para a consulta inteira, então perguntas com
+        # o mesmo filtro dividem uma consulta multi-vetor.
+        groups = {}
+        for i, (_, k, where, _, future) in enumerate(batch):
+            if k == 0:
+                future.set_result(vectors[i])
+            else:
+                key = json.dumps(where, sort_keys=True) if where else None
+                groups.setdefault(key, []).append(i)
+
+        for searches in groups.values():
+            where = batch[searches[0]][2]
+            with timed("vector_search"):
+                results = self.collection.query(
+                    query_embeddings=[vectors[i] for i in searches],
+                    n_results=max(batch[i][1] for i in searches),
+                    where=where,
+                    include=["documents", "metadatas", "distances"]
+                )
+
+            for row, i in enumerate(searches):
+                k, future = batch[i][1], batch[i][4]
+                future.set_result([
+                    (doc_id, Document(page_content=doc_text, metadata=metadata or {}))
+                    for doc_id, doc_text, metadata in zip(
+                        results["ids"][row][:k], results["documents"][row][:k], results["metadatas"][row][:k]
+                    )
+                ])
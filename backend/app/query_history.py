@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, select
+from app.models import Query
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, query_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{query_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, query_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(query_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Cursor inválido: {cursor}") from e
+
+
+def history_statement(limit: int, cursor: str = None, since: datetime = None, until: datetime = None, text: str = None):
+    # Mais recentes primeiro. O cursor é a última linha da página anterior,
+    # então cada página é um range scan em ix_queries_created_at_id, sem
+    # OFFSET, e o custo não cresce com o tamanho da tabela.
+    statement = select(Query).order_by(Query.created_at.desc(), Query.id.desc()).limit(limit)
+    if cursor:
+        created_at, query_id = decode_cursor(cursor)
+        statement = statement.where(or_(
+            Query.created_at < created_at,
+            and_(Query.created_at == created_at, Query.id < query_id)
+        ))
+    if since:
+        statement = statement.where(Query.created_at >= since)
+    if until:
+        statement = statement.where(Query.created_at < until)
+    if text:
+        statement = statement.where(Query.query_text.contains(text, autoescape=True))
+    return statement
+
+
+def serialize(query: Query) -> dict:
+    return {
+        "id": query.id,
+        "query_text": query.query_text,
+        "response": query.response,
+        "created_at": query.created_at.isoformat() if query.created_at else None,
+    }
+
+
+def history_page(db, limit: int, cursor: str = None, since: datetime = None, until: datetime = None, text: str = None):
+    rows = db.execute(history_statement(limit, cursor, since, until, text)).scalars().all()
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [serialize(row) for row in rows], next_cursor
+
+
+def iter_history_ndjson(session_factory, batch_size: int, cursor: str = None, since: datetime = None, until: datetime = None, text: str = None):
+    # Exportação: percorre o filtro inteiro página a página, com uma sessão
+    # curta por lote, então a memória fica limitada a ``batch_size`` linhas.
+    while True:
+        db = session_factory()
+        try:
+            items, cursor = history_page(db, batch_size, cursor, since, until, text)
+        finally:
+            db.close()
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        if cursor is None:
+            return
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+
+def encode_event(event: str, data: dict, format: str = "sse") -> str:
+    if format == "ndjson":
+        return json.dumps(dict(data, event=event), ensure_ascii=False, default=str) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class QueryStream:
+    # Liga a thread de inferência à resposta em streaming: as fontes saem
+    # assim que a busca termina, a resposta quando fica pronta.
+    def __init__(self, format: str = "sse"):
+        self.format = format
+        self.result = None
+        self._loop = asyncio.get_running_loop()
+        self._sources = self._loop.create_future()
+
+    def on_sources(self, sources: list, metadata: list):
+        # Chamado na thread de inferência.
+        self._loop.call_soon_threadsafe(self._set_sources, {"sources": sources, "metadata": metadata})
+
+    def _set_sources(self, payload):
+        if not self._sources.done():
+            self._sources.set_result(payload)
+
+    async def events(self, future):
+        # ``future``: o concurrent.futures.Future do executor de inferência.
+        result = asyncio.wrap_future(future)
+        try:
+            await asyncio.wait({self._sources, result}, return_when=asyncio.FIRST_COMPLETED)
+            if self._sources.done():
+                yield encode_event("sources", self._sources.result(), self.format)
+
+            try:
+                answer = await result
+            except Exception as e:
+                yield encode_event("error", {"detail": str(e)}, self.format)
+                return
+
+            # Rotas sem busca vetorial (índice de produtos, cache de
+            # respostas) têm tudo pronto de uma vez.
+            if not self._sources.done():
+                yield encode_event("sources", {
+                    "sources": answer["sources"],
+                    "metadata": answer.get("metadata", [])
+                }, self.format)
+            yield encode_event("answer", {"answer": answer["answer"]}, self.format)
+            self.result = answer
+        finally:
+            self._sources.cancel()
@@ -1,219 +1,820 @@
+import threading
 import chromadb
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from chromadb.api.client import SharedSystemClient
 from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
 from app.config import settings
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from app.database import SessionLocal
+from app.sync import CHECKPOINT_VERSION, SyncCheckpoint, format_price, has_price, run_sync
+from app.embedding_cache import EmbeddingCache, CachedEmbeddings, embed_queries
+from app.embeddings import create_embeddings, embedding_model_key
+from app.ingestion import BulkIngestor
+from app.document_ingest import IngestJobs, document_chunks, skip_existing
+from app.query_batcher import QueryBatcher
+from app.intent_router import IntentRouter, NameMatcher, detect_intent, product_answer, normalize, retrieval_filter, tokenize
+from app.date_range import format_date_range, parse_date_range
+from app.sales_aggregates import client_names, sales_months, sales_totals
+from app.sales_index import SalesPartitions
+from app.lexical_index import IndexedCollection, LexicalIndex
+from app.readiness import readiness, QUERY_STAGES
+from app.coordination import SyncCoordinator
+from app.ann_index import copy_collection, hnsw_metadata, index_params, needs_rebuild, open_collection, swap_collection
+from app.snapshots import export_snapshot, latest_snapshot, list_snapshots, load_rows, prune_snapshots, summary
+from app.answer_cache import AnswerCache, cache_entities
+from app.scheduler import workload
+from app.logger import get_logger
+from app.metrics import QUERIES_TOTAL, QUERY_SECONDS, timed
+import json
+import os
+import time
+
+logger = get_logger("rag")
 
 class RAGService:
-    def __init__(self):
+    def __init__(self, embeddings_factory=None, session_factory=None):
+        self.embeddings_factory = embeddings_factory
+        self.embedding_spec = dict(
+            backend=settings.EMBEDDING_BACKEND,
+            model_name=settings.EMBEDDING_MODEL,
+            onnx_path=settings.EMBEDDING_ONNX_PATH,
+            quantized=settings.EMBEDDING_ONNX_QUANTIZED,
+            max_length=settings.EMBEDDING_MAX_LENGTH
+        )
+        self.model_key = embedding_model_key(
+            settings.EMBEDDING_BACKEND, settings.EMBEDDING_MODEL, settings.EMBEDDING_ONNX_QUANTIZED
+        )
+        self.embeddings = None
+        self.preloaded = None
+        self.embedding_cache = None
+        self.chroma_client = None
+        self.collection = None
+        self.sales_partitions = None
+        self.hnsw_metadata = None
+        self.client_matcher = NameMatcher()
+        self.vectorstore = None
+        self.query_batcher = None
+        self.lexical_index = None
+        self.ingestor = None
+        self.intent_router = IntentRouter()
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                max_items=settings.ANSWER_CACHE_MAX_ITEMS,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+                vector_dtype=settings.VECTOR_STORAGE_DTYPE,
+                rescore_factor=settings.VECTOR_RESCORE_FACTOR
+            )
+        self.checkpoint = SyncCheckpoint(
+            os.path.join(settings.CHROMA_PATH, settings.SYNC_CHECKPOINT_FILE)
+        )
+        # Sync, ingestão e manutenção do índice vão para a fila de fundo,
+        # que cede a vez às consultas entre um lote e outro.
+        self.workload = workload
+        self.ingest_jobs = IngestJobs(scheduler=workload)
+        self.estoque_views = tuple(
+            view.strip() for view in settings.SYNC_ESTOQUE_VIEWS.split(",") if view.strip()
+        )
+        # Mesmo pool das rotas: o sync não abre conexões próprias.
+        self.SessionLocal = session_factory or SessionLocal
+        # Com vários workers no mesmo CHROMA_PATH, só um escreve por vez e
+        # os outros reabrem o índice quando a geração publicada muda.
+        self.coordinator = SyncCoordinator(settings.CHROMA_PATH)
+        self._generation = None
+        self._generation_checked = 0.0
+        self._reload_lock = threading.Lock()
+    
+    @property
+    def ready(self):
+        return readiness.is_done(QUERY_STAGES)
+    
+    def start(self):
+        if self.ready:
+            return
+        
         try:
-            print("Inicializando RAG Service...")
+            logger.info("Inicializando RAG Service...")
             
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2"
-            )
+            with readiness.stage("model"):
+                self._load_model()
             
-            self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
+            with readiness.stage("vectorstore"):
+                self._open_vectorstore()
+                if settings.SNAPSHOT_RESTORE_ON_START:
+                    self._restore_snapshot()
+                if settings.HNSW_REBUILD_ON_START:
+                    self._rebuild_outdated_index()
             
+            logger.info("✅ RAG Service pronto para consultas!")
+        except Exception as e:
+            logger.error(f"❌ Erro ao inicializar RAG: {e}")
+            raise
+        
+        # A sincronização roda depois que o serviço já aceita consultas; até
+        # lá as respostas vêm do que já está persistido no ChromaDB. Com
+        # vários workers, só o primeiro a pegar o lock sincroniza.
+        with readiness.stage("sync"):
+            if self.workload.run("sync", self._sync_database_to_rag, once_per_boot=True) is None:
+                raise RuntimeError("Falha ao sincronizar banco de dados")
+        
+        if settings.SYNC_INTERVAL_SECONDS > 0:
+            # Sync contínuo em baixa prioridade: cada rodada só reembeda o
+            # que mudou desde o checkpoint.
+            self.workload.every(settings.SYNC_INTERVAL_SECONDS, "sync", self._sync_database_to_rag)
+    
+    def preload(self):
+        # Chamado pelo master do gunicorn (preload_app) antes do fork: os
+        # pesos ficam em páginas copy-on-write compartilhadas pelos workers.
+        # Sem forward pass aqui, para nenhum pool de threads existir no fork.
+        # Sessões do onnxruntime criam threads ao abrir, então cada worker
+        # abre a sua (o modelo int8 é pequeno).
+        if self.embeddings_factory or self.embedding_spec["backend"] != "torch":
+            return
+        self.preloaded = create_embeddings(**self.embedding_spec, threads=settings.EMBEDDING_THREADS)
+        logger.info(f"📦 Modelo {settings.EMBEDDING_MODEL} carregado antes do fork")
+    
+    def _load_model(self):
+        if self.preloaded:
+            base = self.preloaded
+        elif self.embeddings_factory:
+            base = self.embeddings_factory()
+        else:
+            base = create_embeddings(**self.embedding_spec, threads=settings.EMBEDDING_THREADS)
+        # Primeiro forward pass fora do caminho das requisições.
+        base.embed_query("aquecimento do modelo")
+        
+        self.embeddings = base
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(settings.CHROMA_PATH, settings.EMBEDDING_CACHE_FILE),
+                self.model_key,
+                max_memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                max_disk_items=settings.EMBEDDING_CACHE_DISK_ITEMS,
+                storage_dtype=settings.VECTOR_STORAGE_DTYPE
+            )
+            self.embeddings = CachedEmbeddings(base, self.embedding_cache)
+    
+    def _open_vectorstore(self):
+        self._generation = self.coordinator.generation()
+        self._open_collections()
+        
+        if settings.QUERY_BATCHING_ENABLED:
+            self.query_batcher = QueryBatcher(
+                self.embeddings,
+                self.collection,
+                window_ms=settings.QUERY_BATCH_WINDOW_MS,
+                max_batch_size=settings.QUERY_BATCH_MAX_SIZE
+            )
+        
+        self.ingestor = BulkIngestor(
+            self.collection,
+            self.embeddings,
+            self.embedding_spec,
+            batch_size=settings.INGEST_BATCH_SIZE,
+            workers=settings.INGEST_WORKERS,
+            write_batch_size=settings.INGEST_WRITE_BATCH_SIZE,
+            pause=self.workload.checkpoint,
+            nice=settings.BACKGROUND_NICE
+        )
+        
+        # O índice de produtos não depende do ChromaDB; carregá-lo aqui
+        # libera o caminho rápido antes mesmo da sincronização terminar.
+        self._load_names()
+    
+    def _load_names(self):
+        try:
+            db = self.SessionLocal()
             try:
-                self.collection = self.chroma_client.get_collection("documents")
-            except:
-                self.collection = self.chroma_client.create_collection("documents")
-            
+                self._refresh_names(db)
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"⚠️  Aviso ao carregar índice de produtos: {e}")
+    
+    def _open_collections(self):
+        self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
+        self.hnsw_metadata = hnsw_metadata(
+            settings.HNSW_SPACE, settings.HNSW_M, settings.HNSW_CONSTRUCTION_EF, settings.HNSW_SEARCH_EF
+        )
+        
+        self.collection = open_collection(self.chroma_client, "documents", self.hnsw_metadata)
+        self.sales_partitions = SalesPartitions(self.chroma_client, metadata=self.hnsw_metadata)
+        
+        if settings.HYBRID_SEARCH_ENABLED:
+            self.lexical_index = LexicalIndex(k1=settings.BM25_K1, b=settings.BM25_B)
+            with timed("lexical_index_build"):
+                self.lexical_index.rebuild(self.collection)
+            self.collection = IndexedCollection(self.collection, self.lexical_index)
+        
+        self.vectorstore = Chroma(
+            client=self.chroma_client,
+            collection_name="documents",
+            embedding_function=self.embeddings
+        )
+    
+    def _reload_if_stale(self, force: bool = False):
+        # Outro worker escreveu no índice: o HNSW em memória deste processo
+        # só enxerga essas escritas depois de reabrir as coleções.
+        if self._generation is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._generation_checked < settings.INDEX_RELOAD_CHECK_SECONDS:
+            return
+        self._generation_checked = now
+        generation = self.coordinator.generation()
+        if generation == self._generation:
+            return
+        with self._reload_lock:
+            if generation == self._generation:
+                return
+            with timed("index_reload"):
+                # Sem o cache, o PersistentClient abre um System novo, que
+                # relê o índice do disco; consultas em andamento terminam
+                # no antigo.
+                SharedSystemClient.clear_system_cache()
+                self._open_collections()
+                self._repoint()
+                self.checkpoint.reset()
+                self.checkpoint.load()
+                self._load_names()
+                if self.answer_cache:
+                    self.answer_cache.clear()
+            self._generation = generation
+            logger.info(f"🔄 Índice recarregado (geração {generation})")
+    
+    def _repoint(self):
+        if self.query_batcher:
+            self.query_batcher.collection = self.collection
+        if self.ingestor:
+            self.ingestor.collection = self.collection
+    
+    def _raw_collection(self):
+        if isinstance(self.collection, IndexedCollection):
+            return self.collection._collection
+        return self.collection
+    
+    def _outdated_index(self):
+        outdated = ["documents"] if needs_rebuild(self._raw_collection(), self.hnsw_metadata) else []
+        return outdated + [f"vendas:{key}" for key in self.sales_partitions.outdated()]
+    
+    def _rebuild_outdated_index(self):
+        # Parâmetros do HNSW mudaram na config: reconstrói na subida em vez
+        # de seguir com o índice antigo sem avisar.
+        try:
+            if self._outdated_index():
+                return self.rebuild_index()
+        except Exception as e:
+            logger.warning(f"⚠️  Índice não reconstruído, seguindo com os parâmetros antigos: {e}")
+        return None
+    
+    def rebuild_index(self, force: bool = False):
+        with timed("index_rebuild"):
+            return self.workload.run("maintenance", self._as_writer, self._rebuild_index, force)
+    
+    def _rebuild_index(self, force: bool):
+        # Outro worker pode ter reconstruído enquanto este esperava o lock.
+        started = time.perf_counter()
+        rebuilt = self._outdated_index()
+        if force:
+            rebuilt = ["documents"] + [f"vendas:{key}" for key in self.sales_partitions.months()]
+        
+        if "documents" in rebuilt:
+            fresh = copy_collection(self.chroma_client, self._raw_collection(), self.hnsw_metadata)
+            # Consultas passam para a cópia antes de a original sair; o
+            # índice léxico não muda, só o HNSW.
+            self.collection = IndexedCollection(fresh, self.lexical_index) if self.lexical_index else fresh
+            self._repoint()
+            swap_collection(self.chroma_client, fresh, "documents")
             self.vectorstore = Chroma(
                 client=self.chroma_client,
                 collection_name="documents",
                 embedding_function=self.embeddings
             )
-            
-            DATABASE_URL = f"mysql+pymysql://{settings.MYSQL_USER}:{settings.MYSQL_PASSWORD}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}"
-            self.engine = create_engine(DATABASE_URL)
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            
-            self._sync_database_to_rag()
-            
-            print("✅ RAG Service inicializado com sucesso!")
-            
-        except Exception as e:
-            print(f"❌ Erro ao inicializar RAG: {e}")
-            raise
+        self.sales_partitions.rebuild([name.split(":", 1)[1] for name in rebuilt if name.startswith("vendas:")])
+        if rebuilt and self.answer_cache:
+            self.answer_cache.clear()
+        
+        if rebuilt:
+            logger.info(f"🧱 Índice reconstruído em {time.perf_counter() - started:.1f}s: {', '.join(rebuilt)}")
+        return {"rebuilt": rebuilt, "params": self.hnsw_metadata}
+    
+    def index_info(self):
+        return {
+            "configured": self.hnsw_metadata,
+            "documents": index_params(self._raw_collection()),
+            "outdated": self._outdated_index(),
+            "default_k": settings.QUERY_DEFAULT_K
+        }
     
-    def _sync_database_to_rag(self):
+    def _restore_snapshot(self):
+        # Volume novo (coleções vazias): parte do snapshot mais recente do
+        # mesmo modelo em vez de recalcular todos os embeddings; o sync
+        # depois aplica só o que mudou desde o checkpoint gravado nele.
         try:
-            db = self.SessionLocal()
-            
+            return self._as_writer(self._load_snapshot)
+        except Exception as e:
+            logger.warning(f"⚠️  Snapshot não restaurado, o sync vai reconstruir o índice: {e}")
+            return None
+    
+    def _load_snapshot(self):
+        if self.collection.count() or self.sales_partitions.count():
+            return None
+        manifest = latest_snapshot(settings.SNAPSHOT_DIR, self.model_key, CHECKPOINT_VERSION)
+        if manifest is None:
+            return None
+        started = time.perf_counter()
+        with timed("snapshot_restore"):
+            for ids, documents, metadatas, vectors in load_rows(manifest["path"], "documents"):
+                self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors)
+            for ids, documents, metadatas, vectors in load_rows(manifest["path"], "vendas"):
+                self.sales_partitions.upsert(ids, documents, metadatas, vectors)
+            # Só com os vetores no lugar o checkpoint passa a valer.
+            self.checkpoint.restore(manifest["checkpoint"])
+            self.checkpoint.save()
+        logger.info(
+            f"📦 Snapshot {os.path.basename(manifest['path'])} restaurado em "
+            f"{time.perf_counter() - started:.1f}s: {manifest['collections']['documents']['count']} documentos, "
+            f"{manifest['collections']['vendas']['count']} vendas"
+        )
+        return manifest
+    
+    def export_snapshot(self):
+        # Com o lock de escrita: vetores e checkpoint do mesmo instante.
+        def export():
+            manifest = export_snapshot(
+                settings.SNAPSHOT_DIR,
+                {
+                    "documents": [self.collection],
+                    "vendas": [self.sales_partitions.collection(key) for key in self.sales_partitions.months()]
+                },
+                self.checkpoint.to_dict(),
+                self.model_key
+            )
+            prune_snapshots(settings.SNAPSHOT_DIR, settings.SNAPSHOT_KEEP)
+            return summary(manifest)
+        
+        with timed("snapshot_export"):
+            return self.workload.run("maintenance", self._as_writer, export, read_only=True)
+    
+    def snapshots(self):
+        return [summary(manifest) for manifest in list_snapshots(settings.SNAPSHOT_DIR)]
+    
+    def _as_writer(self, fn, *args, once_per_boot: bool = False, read_only: bool = False, **kwargs):
+        # Coleções que não vieram do CHROMA_PATH (testes, benchmarks) não
+        # são compartilhadas com outros processos.
+        if self._generation is None:
+            return fn(*args, **kwargs)
+        with self.coordinator.writer(settings.SYNC_LOCK_TIMEOUT):
+            # Antes de escrever, enxergar o que o último escritor gravou.
+            self._reload_if_stale(force=True)
+            if once_per_boot and self.coordinator.synced_this_boot():
+                logger.info("✅ Sync desta subida já feito por outro worker")
+                return {"mode": "skipped"}
+            if read_only:
+                return fn(*args, **kwargs)
             try:
-                all_items = self.collection.get()
-                ids_to_delete = []
-                
-                for i, metadata in enumerate(all_items['metadatas']):
-                    if metadata and metadata.get('source') in ['estoque', 'vendas']:
-                        ids_to_delete.append(all_items['ids'][i])
-                
-                if ids_to_delete:
-                    self.collection.delete(ids=ids_to_delete)
-            except Exception as e:
-                print(f"⚠️  Aviso ao limpar: {e}")
-            
-            estoque_query = text("SELECT * FROM estoque")
-            estoque_result = db.execute(estoque_query)
-            estoque_rows = estoque_result.fetchall()
-            
-            if not estoque_rows:
-                print("⚠️  AVISO: Tabela estoque está VAZIA!")
-            
-            texts_to_add = []
-            metadatas_to_add = []
-            ids_to_add = []
-            
-            for row in estoque_rows:
-                base_id = f"estoque_{row.id}"
-                
-                doc_text = (
-                    f"Produto: {row.produto}. "
-                    f"Temos {row.quantidade} {row.unidade} em estoque. "
-                    f"Preço: R$ {row.preco:.2f} por {row.unidade}. "
-                    f"Categoria: {row.categoria}."
-                )
-                texts_to_add.append(doc_text)
-                metadatas_to_add.append({
-                    "source": "estoque",
-                    "produto": row.produto,
-                    "quantidade": row.quantidade,
-                    "preco": float(row.preco),
-                    "categoria": row.categoria,
-                    "id": row.id
-                })
-                ids_to_add.append(f"{base_id}_1")
-                
-                doc_text2 = f"Quantidade de {row.produto} disponível: {row.quantidade} {row.unidade}"
-                texts_to_add.append(doc_text2)
-                metadatas_to_add.append({
-                    "source": "estoque",
-                    "produto": row.produto,
-                    "quantidade": row.quantidade,
-                    "preco": float(row.preco),
-                    "categoria": row.categoria,
-                    "id": row.id
-                })
-                ids_to_add.append(f"{base_id}_2")
-                
-                doc_text3 = f"Preço do {row.produto}: R$ {row.preco:.2f}"
-                texts_to_add.append(doc_text3)
-                metadatas_to_add.append({
-                    "source": "estoque",
-                    "produto": row.produto,
-                    "quantidade": row.quantidade,
-                    "preco": float(row.preco),
-                    "categoria": row.categoria,
-                    "id": row.id
-                })
-                ids_to_add.append(f"{base_id}_3")
-            
-            vendas_query = text("SELECT * FROM vendas ORDER BY data_venda DESC LIMIT 20")
-            vendas_result = db.execute(vendas_query)
-            vendas_rows = vendas_result.fetchall()
-            
-            if not vendas_rows:
-                print("⚠️  AVISO: Tabela vendas está VAZIA!")
-            
-            for row in vendas_rows:
-                venda_text = (
-                    f"Venda: {row.quantidade} unidades de {row.produto} "
-                    f"para {row.cliente}. "
-                    f"Valor: R$ {row.valor_total:.2f}. "
-                    f"Data: {row.data_venda}."
-                )
-                texts_to_add.append(venda_text)
-                metadatas_to_add.append({
-                    "source": "vendas",
-                    "produto": row.produto,
-                    "cliente": row.cliente,
-                    "valor": float(row.valor_total),
-                    "quantidade": row.quantidade,
-                    "id": row.id
-                })
-                ids_to_add.append(f"vendas_{row.id}")
-            
+                return fn(*args, **kwargs)
+            finally:
+                self._generation = self.coordinator.publish(synced=once_per_boot)
+    
+    def _refresh_names(self, db):
+        self.intent_router.refresh(db)
+        self.client_matcher = NameMatcher(
+            (tuple(tokenize(name)), name) for name in client_names(db)
+        )
+    
+    def shutdown(self):
+        self.ingest_jobs.shutdown()
+        if self.ingestor:
+            self.ingestor.shutdown()
+        if self.query_batcher:
+            self.query_batcher.stop()
+    
+    def _sync_database_to_rag(self, full: bool = False, once_per_boot: bool = False):
+        try:
+            with timed("sync_total"):
+                return self._as_writer(self._run_sync, full, once_per_boot=once_per_boot)
+        except Exception as e:
+            logger.exception(f"❌ ERRO ao sincronizar banco: {e}")
+            return None
+    
+    def _run_sync(self, full: bool):
+        db = self.SessionLocal()
+        try:
+            report = run_sync(
+                db,
+                self.collection,
+                self.sales_partitions,
+                self.checkpoint,
+                self.ingestor,
+                full=full,
+                stream_batch_size=settings.SYNC_STREAM_BATCH_SIZE,
+                estoque_views=self.estoque_views,
+                on_rows_changed=self.answer_cache.invalidate_rows if self.answer_cache else None
+            )
+            self._refresh_names(db)
+        finally:
             db.close()
-            
-            if texts_to_add:
-                self.collection.add(
-                    documents=texts_to_add,
-                    metadatas=metadatas_to_add,
-                    ids=ids_to_add
-                )
-                print(f"✅ {len(estoque_rows)} produtos (com {len([m for m in metadatas_to_add if m['source']=='estoque'])} variações)")
-                print(f"✅ {len(vendas_rows)} vendas sincronizadas")
-                print(f"📊 Total no ChromaDB: {self.collection.count()} documentos")
+
+        if self.answer_cache:
+            if report["mode"] == "full":
+                self.answer_cache.clear()
             else:
-                print("❌ ERRO: Nenhum dado foi sincronizado!")
-                
-        except Exception as e:
-            print(f"❌ ERRO ao sincronizar banco: {e}")
-            import traceback
-            traceback.print_exc()
+                if report["vendas_months_changed"]:
+                    self.answer_cache.invalidate_intent("sales")
+                # Um produto novo não tem linha nas respostas em cache, mas
+                # pode entrar em listas e perguntas que não citam produto.
+                if report["estoque_inserted"]:
+                    self.answer_cache.invalidate_unscoped()
+        
+        if report["estoque_rows"] == 0:
+            logger.warning("⚠️  AVISO: Tabela estoque está VAZIA!")
+        if report["vendas_rows"] == 0:
+            logger.warning("⚠️  AVISO: Tabela vendas está VAZIA!")
+
+        logger.info(
+            f"✅ Sync {report['mode']}: {report['inserted']} inseridos, "
+            f"{report['updated']} atualizados, {report['deleted']} removidos, "
+            f"{report['skipped']} inalterados"
+        )
+        logger.info(
+            f"📊 Total no ChromaDB: {self.collection.count()} documentos, "
+            f"{self.sales_partitions.count()} vendas em {len(self.sales_partitions.months())} partições"
+        )
+        return report
+
+    def sync_database(self, full: bool = False):
+        report = self.workload.run("sync", self._sync_database_to_rag, full=full)
+        if report is None:
+            return {"message": "Erro ao sincronizar banco de dados", "report": None}
+        return {"message": "Banco de dados sincronizado com sucesso!", "report": report}
     
+    def embedding_cache_stats(self):
+        if self.embedding_cache is None:
+            return {"enabled": False}
+        return dict(self.embedding_cache.stats(), enabled=True)
     
+    def answer_cache_stats(self):
+        if self.answer_cache is None:
+            return {"enabled": False}
+        return dict(self.answer_cache.stats(), enabled=True)
     
-    def sync_database(self):
-        self._sync_database_to_rag()
-        return {"message": "Banco de dados sincronizado com sucesso!"}
+    def ingest_documents(self, documents, on_progress=None):
+        return self._as_writer(self._ingest_documents, documents, on_progress)
+    
+    def _ingest_documents(self, documents, on_progress=None):
+        # ``documents`` gera (partes do texto, metadata). Os trechos seguem em
+        # lotes do cursor até o ChromaDB; trechos já indexados são pulados.
+        report = {"documents": 0, "chunks": 0, "duplicates": 0, "written": 0}
+        
+        def counted():
+            for document in documents:
+                report["documents"] += 1
+                yield document
+        
+        def progress(ingestion):
+            report["written"] = ingestion["documents"]
+            if on_progress:
+                on_progress(dict(report))
+        
+        chunks = document_chunks(counted(), settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+        with timed("document_ingest"):
+            ingestion = self.ingestor.ingest(
+                skip_existing(self.collection, chunks, self.ingestor.batch_size, report),
+                on_batch=progress
+            )
+        report["written"] = ingestion["documents"]
+        report["seconds"] = ingestion["seconds"]
+        if on_progress:
+            on_progress(dict(report))
+        
+        # Documentos novos podem mudar a resposta de perguntas já em cache.
+        if report["written"] and self.answer_cache:
+            self.answer_cache.clear()
+        logger.info(
+            f"✅ {report['documents']} documento(s), {report['chunks']} trecho(s): "
+            f"{report['written']} gravado(s), {report['duplicates']} duplicado(s)"
+        )
+        return report
     
     def add_documents(self, texts: list[str], metadatas: list[dict] = None):
         try:
-            self.vectorstore.add_texts(texts=texts, metadatas=metadatas)
-            print(f"✅ {len(texts)} documento(s) adicionado(s)")
-            return True
+            metadatas = metadatas or [None] * len(texts)
+            return self.workload.run("ingest", self.ingest_documents, (
+                ([doc_text], metadata) for doc_text, metadata in zip(texts, metadatas)
+            ))
         except Exception as e:
-            print(f"❌ Erro ao adicionar documentos: {e}")
-            return False
+            logger.error(f"❌ Erro ao adicionar documentos: {e}")
+            return None
+    
+    def submit_ingest_job(self, files):
+        # ``files``: lista de (caminho temporário, "ndjson" ou "text", nome original).
+        return self.ingest_jobs.submit(self.ingest_documents, files)
     
-    def query(self, question: str, k: int = 5):
+    def document_count(self):
+        self._reload_if_stale()
+        return self.collection.count()
+    
+    def query(self, question: str, k: int = None, on_sources=None):
         try:
-            print(f"🔍 Processando query: {question}")
-            
-            docs = self.vectorstore.similarity_search(question, k=k)
-            
-            if not docs:
-                return {
-                    "answer": "Não encontrei informações relevantes para responder sua pergunta. Tente adicionar mais documentos ao sistema.",
-                    "sources": []
-                }
-            
-            answer = self._generate_answer(question, docs)
-            sources = [doc.page_content for doc in docs]
-            
-            print(f"✅ Resposta gerada com {len(sources)} fontes")
-            
+            return self.query_or_raise(question, k, on_sources)
+        except Exception as e:
             return {
-                "answer": answer,
-                "sources": sources,
-                "metadata": [doc.metadata for doc in docs]
+                "answer": f"Desculpe, ocorreu um erro ao processar sua consulta: {str(e)}",
+                "sources": []
             }
+    
+    def query_or_raise(self, question: str, k: int = None, on_sources=None):
+        # Como ``query``, mas a falha sobe: o streaming precisa dela para
+        # mandar o evento de erro em vez de uma resposta com o texto do erro.
+        started = time.perf_counter()
+        k = k or settings.QUERY_DEFAULT_K
+        route = "error"
+        try:
+            logger.debug(f"🔍 Processando query: {question}")
+            self._reload_if_stale()
+            result, route = self._query(question, k, on_sources)
+            return result
             
         except Exception as e:
-            print(f"❌ Erro na query: {e}")
+            logger.error(f"❌ Erro na query: {e}")
+            raise
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - started, route=route)
+            QUERIES_TOTAL.inc(route=route)
+    
+    def query_many(self, questions: list[str], k: int = None):
+        # Várias perguntas de uma vez: um único forward pass do modelo para
+        # todas e uma consulta multi-vetor no ChromaDB por filtro. Erros
+        # ficam no item, sem derrubar o lote.
+        started = time.perf_counter()
+        k = k or settings.QUERY_DEFAULT_K
+        self._reload_if_stale()
+        unique = list(dict.fromkeys(questions))
+        answered = {}
+        plans = []
+        prefetched = {}
+        failure = None
+        try:
+            with timed("intent_routing"):
+                for question in unique:
+                    routed = self.intent_router.route(question)
+                    if routed:
+                        answered[question] = (routed, "structured")
+            pending = [question for question in unique if question not in answered]
+            vectors = {}
+            if pending:
+                with timed("embedding"):
+                    vectors = dict(zip(pending, embed_queries(self.embeddings, pending)))
+            for question in pending:
+                plan = self._plan(question, lambda question=question: vectors[question])
+                if "result" in plan:
+                    answered[question] = (plan["result"], plan["route"])
+                else:
+                    plans.append(dict(plan, vector=vectors[question]))
+            prefetched = self._prefetch_hits(plans, k)
+        except Exception as e:
+            # Sem embedding ou busca não há como seguir; as respostas que já
+            # saíram do índice de produtos ou do cache continuam valendo.
+            logger.error(f"❌ Erro no lote de queries: {e}")
+            plans = []
+            failure = str(e)
+        
+        for plan in plans:
+            try:
+                answered[plan["question"]] = self._answer(plan, k, hits=prefetched.get(plan["question"]))
+            except Exception as e:
+                logger.error(f"❌ Erro na query: {e}")
+                answered[plan["question"]] = ({"error": str(e)}, "error")
+        
+        items = []
+        for question in questions:
+            result, route = answered.get(question) or ({"error": failure}, "error")
+            items.append(dict(result, question=question))
+            QUERIES_TOTAL.inc(route=route)
+        QUERY_SECONDS.observe(time.perf_counter() - started, route="batch")
+        return items
+    
+    def _prefetch_hits(self, plans, k: int):
+        # Perguntas de estoque com o mesmo filtro dividem uma consulta.
+        candidates = k * len(self.estoque_views)
+        groups = {}
+        for plan in plans:
+            if not plan["intent"]["sales"]:
+                key = json.dumps(plan["where"], sort_keys=True) if plan["where"] else None
+                groups.setdefault(key, []).append(plan)
+        hits = {}
+        for group in groups.values():
+            where = group[0]["where"]
+            with timed("vector_search"):
+                results = self.collection.query(
+                    query_embeddings=[plan["vector"] for plan in group],
+                    n_results=candidates,
+                    where=where,
+                    include=["documents", "metadatas"]
+                )
+            for row, plan in enumerate(group):
+                hits[plan["question"]] = [
+                    (doc_id, Document(page_content=doc_text, metadata=metadata or {}))
+                    for doc_id, doc_text, metadata in zip(
+                        results["ids"][row], results["documents"][row], results["metadatas"][row]
+                    )
+                ]
+        return hits
+
+    def _query(self, question: str, k: int, on_sources=None):
+        # Perguntas estruturadas sobre um produto são respondidas direto
+        # do índice de produtos, sem embedding nem busca vetorial.
+        with timed("intent_routing"):
+            routed = self.intent_router.route(question)
+        if routed:
+            return routed, "structured"
+        
+        plan = self._plan(question, lambda: self._embed_question(question))
+        if "result" in plan:
+            return plan["result"], plan["route"]
+        return self._answer(plan, k, on_sources)
+    
+    def _plan(self, question: str, embed):
+        # Tudo o que vem antes da busca: intenção, cache de respostas e filtro.
+        cache_key = normalize(question)
+        intent = detect_intent(question)
+        # Citar um cliente pelo nome já é uma pergunta sobre vendas.
+        clients = self.client_matcher.match(question)
+        if clients:
+            intent = dict(intent, sales=True)
+        products = [row.produto for row in self.intent_router.index.match(question)]
+        entities = cache_entities(products, clients)
+        vector = None
+        if self.answer_cache:
+            with timed("answer_cache_lookup"):
+                cached, vector = self.answer_cache.get(cache_key, intent, embed=embed, entities=entities)
+            if cached:
+                return {"result": cached, "route": "answer_cache"}
+        
+        return {
+            "question": question,
+            "cache_key": cache_key,
+            "intent": intent,
+            "clients": clients,
+            "products": products,
+            "entities": entities,
+            "where": retrieval_filter(intent, products),
+            "vector": vector
+        }
+    
+    def _answer(self, plan: dict, k: int, on_sources=None, hits=None):
+        question, intent, vector = plan["question"], plan["intent"], plan["vector"]
+        sales = None
+        with timed("retrieval"):
+            if intent["sales"]:
+                docs, sales = self._retrieve_sales(question, k, intent, plan["products"], plan["clients"], vector)
+            else:
+                docs = self._retrieve(question, k, plan["where"], hits, vector)
+        
+        sources = [doc.page_content for doc in docs]
+        metadata = [doc.metadata for doc in docs]
+        # Streaming: o cliente recebe as fontes antes da resposta ficar pronta.
+        if on_sources and (docs or sales is not None):
+            on_sources(sources, metadata)
+        
+        if not docs and sales is None:
             return {
-                "answer": f"Desculpe, ocorreu um erro ao processar sua consulta: {str(e)}",
+                "answer": "Não encontrei informações relevantes para responder sua pergunta. Tente adicionar mais documentos ao sistema.",
                 "sources": []
-            }
+            }, "empty"
+        
+        with timed("answer_generation"):
+            answer = self._generate_answer(question, docs, sales)
+        
+        logger.debug(f"✅ Resposta gerada com {len(sources)} fontes")
+        
+        result = {
+            "answer": answer,
+            "sources": sources,
+            "metadata": metadata
+        }
+        if self.answer_cache:
+            self.answer_cache.put(plan["cache_key"], intent, result, vector, plan["entities"])
+        return result, "retrieval"
+    
+    def _retrieve(self, question: str, k: int, where: dict = None, hits=None, vector=None):
+        # Com várias visões por produto, busca candidatos suficientes para
+        # ainda sobrarem k produtos distintos depois de agrupar.
+        candidates = k * len(self.estoque_views)
+        if hits is None:
+            hits = self._vector_search(question, candidates, where, vector)
+        if self.lexical_index is not None:
+            with timed("lexical_search"):
+                lexical = self.lexical_index.search(question, candidates, where)
+            hits = self._fuse(hits, lexical, candidates)
+        
+        # Filtro restritivo demais (produto sem linhas na fonte pedida):
+        # melhor uma busca aberta do que nenhuma resposta.
+        if not hits and where:
+            return self._retrieve(question, k, vector=vector)
+        return self._collapse(hits, k)
+    
+    def _retrieve_sales(self, question: str, k: int, intent: dict, products, clients, vector=None):
+        # Vendas: busca vetorial só nas partições do período citado e totais
+        # dos agregados, que cobrem o histórico inteiro e não só os k trechos.
+        date_range = parse_date_range(question)
+        where = retrieval_filter(intent, products, clients)
+        
+        with timed("sales_aggregates"):
+            db = self.SessionLocal()
+            try:
+                totals = sales_totals(db, products, clients, date_range)
+                allowed = sales_months(db, products, clients, date_range) if products or clients else None
+            finally:
+                db.close()
+        
+        months = self.sales_partitions.months_for(date_range, settings.SALES_SEARCH_MONTHS, allowed)
+        docs = []
+        if months:
+            if vector is None:
+                vector = self._embed_question(question)
+            with timed("vector_search"):
+                docs = self._collapse(self.sales_partitions.search(vector, k, months, where), k)
+        return docs, {
+            "totals": totals,
+            "period": format_date_range(date_range) if date_range else None
+        }
+    
+    def _collapse(self, hits, k: int):
+        # Um resultado por linha do banco; os metadados do estoque vêm do
+        # ProductIndex, que tem os valores atuais.
+        docs = []
+        seen = set()
+        for doc_id, doc in hits:
+            source = doc.metadata.get("source")
+            key = (source, doc.metadata.get("id")) if source in ("estoque", "vendas") else doc_id
+            if key in seen:
+                continue
+            seen.add(key)
+            if source == "estoque":
+                metadata = self.intent_router.index.metadata(doc.metadata.get("id"))
+                if metadata is None:
+                    continue
+                doc = Document(page_content=doc.page_content, metadata=metadata)
+            docs.append(doc)
+            if len(docs) == k:
+                break
+        return docs
+    
+    def _vector_search(self, question: str, k: int, where: dict = None, vector=None):
+        # ``vector`` já vem do plano quando o cache de respostas embedou a
+        # pergunta; só sem ele o modelo roda de novo.
+        if self.query_batcher:
+            return self.query_batcher.search(question, k=k, where=where, with_ids=True, vector=vector)
+        
+        if vector is None:
+            vector = self.embeddings.embed_query(question)
+        results = self.collection.query(
+            query_embeddings=[vector],
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas"]
+        )
+        return [
+            (doc_id, Document(page_content=doc_text, metadata=metadata or {}))
+            for doc_id, doc_text, metadata in zip(results["ids"][0], results["documents"][0], results["metadatas"][0])
+        ]
+    
+    def _fuse(self, vector_hits, lexical_hits, k: int):
+        # Reciprocal Rank Fusion: só as posições importam, então distâncias
+        # do ChromaDB e pontuações BM25 não precisam estar na mesma escala.
+        scores = {}
+        for ranking in ([doc_id for doc_id, _ in vector_hits], [doc_id for doc_id, _ in lexical_hits]):
+            for rank, doc_id in enumerate(ranking):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (settings.HYBRID_RRF_K + rank + 1)
+        top = sorted(scores, key=scores.get, reverse=True)[:k]
+        
+        docs = dict(vector_hits)
+        missing = [doc_id for doc_id in top if doc_id not in docs]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for doc_id, doc_text, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                docs[doc_id] = Document(page_content=doc_text, metadata=metadata or {})
+        return [(doc_id, docs[doc_id]) for doc_id in top if doc_id in docs]
+    
+    def _embed_question(self, question: str):
+        if self.query_batcher:
+            return self.query_batcher.embed(question)
+        return self.embeddings.embed_query(question)
     
-    def _generate_answer(self, question: str, docs: list):
+    def _generate_answer(self, question: str, docs: list, sales: dict = None):
+        
+        if sales is not None:
+            return self._sales_answer(docs, sales)
         
         if not docs:
             return "Não encontrei informações relevantes."
         
-        question_lower = question.lower()
-        
         estoque_docs = [d for d in docs if d.metadata.get("source") == "estoque"]
         vendas_docs = [d for d in docs if d.metadata.get("source") == "vendas"]
         
-        # Debug
-        print(f"🔍 Análise:")
-        print(f"   Estoque encontrado: {len(estoque_docs)}")
-        print(f"   Vendas encontradas: {len(vendas_docs)}")
+        logger.debug(f"🔍 Análise: {len(estoque_docs)} de estoque, {len(vendas_docs)} de vendas")
         
         if not estoque_docs and not vendas_docs:
             # Só usa conhecimento geral se NÃO houver nada do banco
@@ -225,50 +826,16 @@ class RAGService:
                 )
             return "Não encontrei informações específicas sobre sua pergunta."
         
-        print("✅ Respondendo com dados REAIS do banco de dados MySQL")
-        
-        is_quantity = any(w in question_lower for w in ["quanto", "quantos", "quantidade"])
-        is_price = any(w in question_lower for w in ["preço", "valor", "custa"])
-        is_sales = any(w in question_lower for w in ["venda", "vendeu", "cliente"])
-        is_list = any(w in question_lower for w in ["lista", "todos", "quais"])
+        intent = detect_intent(question)
+        is_list = intent["list"]
         
-        produtos_conhecidos = ["alface", "tomate", "cenoura", "batata", "cebola", "arroz", "feijão"]
-        produto_mencionado = next((p for p in produtos_conhecidos if p in question_lower), None)
-        
-        if is_sales and vendas_docs:
-            vendas_info = []
-            total = 0
-            
-            for doc in vendas_docs[:5]:
-                prod = doc.metadata.get("produto")
-                cli = doc.metadata.get("cliente")
-                val = doc.metadata.get("valor", 0)
-                qtd = doc.metadata.get("quantidade", 0)
-                total += float(val)
-                vendas_info.append(f"• {qtd}x {prod} → {cli} (R$ {val:.2f})")
-            
-            return (
-                f"📊 **Histórico de Vendas**\n\n" +
-                "\n".join(vendas_info) +
-                f"\n\n💵 Total: R$ {total:.2f}\n"
-                f"✅ Dados reais do banco MySQL"
-            )
+        produtos_mencionados = {normalize(row.produto) for row in self.intent_router.index.match(question)}
         
         if estoque_docs:
-            if produto_mencionado:
+            if produtos_mencionados:
                 for doc in estoque_docs:
-                    if produto_mencionado in doc.metadata.get("produto", "").lower():
-                        prod = doc.metadata.get("produto")
-                        qtd = doc.metadata.get("quantidade")
-                        preco = doc.metadata.get("preco")
-                        cat = doc.metadata.get("categoria")
-                        
-                        if is_price:
-                            return f"💰 **{prod}**: R$ {preco:.2f}/un\nEstoque: {qtd} unidades\n✅ Preço do banco de dados"
-                        elif is_quantity:
-                            return f"📦 **{prod}**: {qtd} unidades disponíveis\nPreço: R$ {preco:.2f}/un\n✅ Quantidade atualizada do MySQL"
-                        else:
-                            return f"📦 **{prod}** ({cat})\n• Quantidade: {qtd} un\n• Preço: R$ {preco:.2f}/un\n✅ Dados do estoque"
+                    if normalize(doc.metadata.get("produto", "")) in produtos_mencionados:
+                        return product_answer(doc.metadata, intent)
             
             if is_list or len(estoque_docs) > 1:
                 produtos = []
@@ -279,6 +846,9 @@ class RAGService:
                     qtd = doc.metadata.get("quantidade")
                     preco = doc.metadata.get("preco")
                     cat = doc.metadata.get("categoria", "")
+                    if not has_price(preco):
+                        produtos.append(f"• **{prod}** ({cat}): {qtd} un, sem preço")
+                        continue
                     total_valor += qtd * preco
                     produtos.append(f"• **{prod}** ({cat}): {qtd} un × R$ {preco:.2f} = R$ {qtd*preco:.2f}")
                 
@@ -294,14 +864,40 @@ class RAGService:
             qtd = doc.metadata.get("quantidade")
             preco = doc.metadata.get("preco")
             cat = doc.metadata.get("categoria", "")
+            total = format_price(qtd * preco if has_price(preco) else None)
             
             return (
                 f"📦 **{prod}** ({cat})\n"
                 f"• Quantidade: {qtd} unidades\n"
-                f"• Preço: R$ {preco:.2f}/un\n"
-                f"• Total: R$ {qtd * preco:.2f}\n\n"
+                f"• Preço: {format_price(preco, '/un')}\n"
+                f"• Total: {total}\n\n"
                 f"✅ Dados atualizados do MySQL"
             )
         
         return "Encontrei informações mas não consegui processá-las adequadamente."
-rag_service = RAGService()
\ No newline at end of file
+    
+    def _sales_answer(self, docs: list, sales: dict):
+        totals = sales["totals"]
+        period = f" ({sales['period']})" if sales["period"] else ""
+        if not totals["vendas"] and not docs:
+            return f"📊 Nenhuma venda encontrada{period}."
+        
+        vendas_info = []
+        for doc in docs[:5]:
+            prod = doc.metadata.get("produto")
+            cli = doc.metadata.get("cliente")
+            val = doc.metadata.get("valor", 0)
+            qtd = doc.metadata.get("quantidade", 0)
+            data = doc.metadata.get("data")
+            vendas_info.append(f"• {qtd}x {prod} → {cli} (R$ {val:.2f})" + (f" em {data}" if data else ""))
+        
+        # Os totais vêm de vendas_agregados e cobrem todas as vendas do
+        # filtro, não só os exemplos listados acima.
+        return (
+            f"📊 **Histórico de Vendas**{period}\n\n" +
+            "\n".join(vendas_info) +
+            f"\n\n🧾 {totals['vendas']} venda(s), {totals['quantidade']} unidades\n"
+            f"💵 Total: R$ {totals['valor']:.2f}\n"
+            f"✅ Dados reais do banco MySQL"
+        )
+rag_service = RAGService()
@@ -0,0 +1,54 @@
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_STAGES = ["database", "model", "vectorstore", "sync"]
+QUERY_STAGES = ["model", "vectorstore"]
+
+
+class Readiness:
+    def __init__(self, stages: list[str]):
+        self._lock = threading.Lock()
+        self._events = {name: threading.Event() for name in stages}
+        self._stages = {
+            name: {"status": "pending", "error": None, "seconds": None}
+            for name in stages
+        }
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        with self._lock:
+            self._stages[name].update(status="running", error=None, seconds=None)
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self._stages[name].update(
+                    status="failed",
+                    error=str(e),
+                    seconds=round(time.perf_counter() - started, 3)
+                )
+            self._events[name].set()
+            raise
+        with self._lock:
+            self._stages[name].update(status="done", seconds=round(time.perf_counter() - started, 3))
+        self._events[name].set()
+
+    def is_done(self, stages: list[str]) -> bool:
+        with self._lock:
+            return all(self._stages[name]["status"] == "done" for name in stages)
+
+    def wait(self, stages: list[str], timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        for name in stages:
+            if not self._events[name].wait(max(0.0, deadline - time.monotonic())):
+                return False
+        return self.is_done(stages)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(state) for name, state in self._stages.items()}
+
+
+readiness = Readiness(STARTUP_STAGES)
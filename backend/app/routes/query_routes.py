@@ -1,43 +1,269 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import tempfile
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import Query as QueryParam
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional, List
-from app.database import get_db
-from app.models import Query
+from typing import Literal, Optional, List
+from app.config import settings
+from app.database import SessionLocal, get_db
+from app.executor import ExecutorSaturated, inference_executor
+from app.history_writer import history_writer
+from app.query_history import InvalidCursor, decode_cursor, history_page, iter_history_ndjson
+from app.query_stream import MEDIA_TYPES, QueryStream
 from app.rag_service import rag_service
+from app.readiness import readiness, QUERY_STAGES
+from app.scheduler import workload
 
 router = APIRouter()
 
 class QueryRequest(BaseModel):
     question: str
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=settings.QUERY_BATCH_MAX_QUESTIONS)
+
 class DocumentRequest(BaseModel):
     texts: List[str]
     metadatas: Optional[List[dict]] = None
 
-@router.post("/query")
-async def create_query(request: QueryRequest, db: Session = Depends(get_db)):
+async def require_rag():
+    if rag_service.ready:
+        return
+    ready = await run_in_threadpool(readiness.wait, QUERY_STAGES, settings.STARTUP_WAIT_TIMEOUT)
+    if not ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Serviço RAG ainda está inicializando",
+            headers={"Retry-After": "5"}
+        )
+
+@router.post("/query", dependencies=[Depends(require_rag)])
+async def create_query(request: QueryRequest):
+    try:
+        result = await inference_executor.run(rag_service.query, request.question)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # O histórico é gravado em lotes por uma thread; a resposta não espera o banco.
+    history_writer.record(request.question, result["answer"])
+
+    return {
+        "answer": result["answer"],
+        "sources": result["sources"],
+        "metadata": result.get("metadata", [])
+    }
+
+@router.post("/query/batch", dependencies=[Depends(require_rag)])
+async def batch_query(request: BatchQueryRequest):
+    try:
+        items = await inference_executor.run(rag_service.query_many, request.questions)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Todas as linhas de histórico do lote entram juntas no buffer do writer.
+    history_writer.record_many([(item["question"], item["answer"]) for item in items if "error" not in item])
+
+    return {
+        "results": items,
+        "errors": sum(1 for item in items if "error" in item)
+    }
+
+def _record_streamed(question: str, stream: QueryStream):
+    # Só grava se a resposta chegou a ser gerada: falhas e clientes que
+    # desconectaram não entram no histórico.
+    if stream.result is not None:
+        history_writer.record(question, stream.result["answer"])
+
+@router.post("/query/stream", dependencies=[Depends(require_rag)])
+async def stream_query(request: QueryRequest, format: Literal["sse", "ndjson"] = "sse"):
+    stream = QueryStream(format)
+    try:
+        future = inference_executor.submit(rag_service.query_or_raise, request.question, on_sources=stream.on_sources)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": "1"}
+        )
+
+    # Fontes assim que a busca vetorial volta, depois a resposta; o
+    # histórico é registrado só depois que o stream fecha.
+    return StreamingResponse(
+        stream.events(future),
+        media_type=MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_record_streamed, request.question, stream)
+    )
+
+@router.get("/queries")
+def get_queries(
+    response: Response,
+    limit: int = QueryParam(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db)
+):
     try:
-        result = rag_service.query(request.question)
-        
-        query = Query(
-            query_text=request.question,
-            response=result["answer"]
+        if cursor:
+            decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        # Exportação completa do filtro, a partir do cursor, sem paginar no cliente.
+        return StreamingResponse(
+            iter_history_ndjson(SessionLocal, settings.HISTORY_EXPORT_BATCH_SIZE, cursor, since, until, q),
+            media_type="application/x-ndjson"
         )
-        db.add(query)
-        db.commit()
-        
-        return {
-            "answer": result["answer"],
-            "sources": result["sources"],
-            "metadata": result.get("metadata", [])
-        }
+
+    items, next_cursor = history_page(db, limit, cursor, since, until, q)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+@router.post("/add-documents", dependencies=[Depends(require_rag)])
+def add_documents(request: DocumentRequest):
+    if request.metadatas is not None and len(request.metadatas) != len(request.texts):
+        raise HTTPException(status_code=422, detail="metadatas deve ter o mesmo tamanho de texts")
+    report = rag_service.add_documents(request.texts, request.metadatas)
+    if report is None:
+        raise HTTPException(status_code=500, detail="Erro ao adicionar documentos")
+    return {
+        "message": f"{len(request.texts)} documento(s) processado(s)",
+        "count": len(request.texts),
+        "report": report
+    }
+
+def _upload_kind(content_type: str, filename: str = None):
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return "text"
+
+async def _spool(chunks):
+    # Corpo vai direto para um arquivo temporário em blocos: o upload
+    # nunca fica inteiro em memória e o job lê do disco depois.
+    fd, path = tempfile.mkstemp(prefix="pixaflow-upload-", dir=settings.UPLOAD_DIR or None)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def _remove_spooled(files):
+    for path, _, _ in files:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+async def _upload_file_chunks(upload):
+    while True:
+        chunk = await upload.read(1024 * 1024)
+        if not chunk:
+            return
+        yield chunk
+
+@router.post("/documents/upload", status_code=202, dependencies=[Depends(require_rag)])
+async def upload_documents(request: Request):
+    content_type = request.headers.get("content-type", "")
+    files = []
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            for upload in form.getlist("files") + form.getlist("file"):
+                if not hasattr(upload, "read"):
+                    continue
+                path = await _spool(_upload_file_chunks(upload))
+                files.append((path, _upload_kind(upload.content_type or "", upload.filename), upload.filename))
+        else:
+            path = await _spool(request.stream())
+            files.append((path, _upload_kind(content_type), None))
+    except BaseException:
+        _remove_spooled(files)
+        raise
+
+    if not files:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
+    try:
+        return rag_service.submit_ingest_job(files)
+    except BaseException:
+        # O job é quem apaga os arquivos; se ele nem entrou na fila, apaga aqui.
+        _remove_spooled(files)
+        raise
+
+@router.get("/documents/jobs/{job_id}")
+async def ingest_job_status(job_id: str):
+    job = rag_service.ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+@router.get("/documents/count", dependencies=[Depends(require_rag)])
+async def document_count():
+    return {"count": await run_in_threadpool(rag_service.document_count)}
+
+@router.post("/sync-database", dependencies=[Depends(require_rag)])
+def sync_database(full: bool = False):
+    try:
+        return rag_service.sync_database(full=full)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/snapshots", dependencies=[Depends(require_rag)])
+def create_snapshot():
+    try:
+        return rag_service.export_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/snapshots")
+def list_snapshots():
+    return rag_service.snapshots()
 
+@router.get("/index", dependencies=[Depends(require_rag)])
+async def index_info():
+    return await run_in_threadpool(rag_service.index_info)
 
+@router.post("/index/rebuild", dependencies=[Depends(require_rag)])
+def rebuild_index(force: bool = False):
+    try:
+        return rag_service.rebuild_index(force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/embeddings/cache", dependencies=[Depends(require_rag)])
+async def embedding_cache_stats():
+    return rag_service.embedding_cache_stats()
 
+@router.get("/workload")
+async def workload_stats():
+    return workload.stats()
 
+@router.get("/answers/cache")
+async def answer_cache_stats():
+    return rag_service.answer_cache_stats()
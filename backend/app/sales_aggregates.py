@@ -0,0 +1,108 @@
+from datetime import datetime
+from sqlalchemy import delete, func, select, text
+from app.models import VendasAgregado
+
+# Vendas sem data ficam numa partição própria e fora dos totais por dia.
+NO_DATE_MONTH = "sem-data"
+
+_MONTH_SQL = {
+    "mysql": "DATE_FORMAT(data_venda, '%Y-%m')",
+    "sqlite": "strftime('%Y-%m', data_venda)",
+}
+
+_AGGREGATE_SQL = (
+    "INSERT INTO vendas_agregados (dia, produto, cliente, vendas, quantidade, valor_total) "
+    "SELECT DATE(data_venda), produto, COALESCE(cliente, ''), COUNT(*), "
+    "COALESCE(SUM(quantidade), 0), COALESCE(SUM(valor_total), 0) "
+    "FROM vendas WHERE {where} "
+    "GROUP BY DATE(data_venda), produto, COALESCE(cliente, '')"
+)
+
+
+def month_key(value) -> str:
+    if value is None:
+        return NO_DATE_MONTH
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value.strftime("%Y-%m")
+
+
+def month_bounds(key: str):
+    if key == NO_DATE_MONTH:
+        return None
+    year, month = (int(part) for part in key.split("-"))
+    return datetime(year, month, 1), datetime(year + month // 12, month % 12 + 1, 1)
+
+
+def months_between(start: datetime, end: datetime):
+    # Meses que tocam o intervalo [start, end).
+    keys = []
+    current = datetime(start.year, start.month, 1)
+    while current < end:
+        keys.append(current.strftime("%Y-%m"))
+        current = datetime(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return keys
+
+
+def month_sql(db) -> str:
+    return _MONTH_SQL.get(db.get_bind().dialect.name, _MONTH_SQL["mysql"])
+
+
+def refresh_aggregates(db, months):
+    # Recalcula só os meses que o sync viu mudar: cada mês é um DELETE e um
+    # INSERT ... SELECT sobre o índice de data_venda, na mesma transação.
+    for key in months:
+        bounds = month_bounds(key)
+        if bounds is None:
+            continue
+        start, end = bounds
+        db.execute(
+            delete(VendasAgregado).where(VendasAgregado.dia >= start.date(), VendasAgregado.dia < end.date())
+        )
+        db.execute(
+            text(_AGGREGATE_SQL.format(where="data_venda >= :start AND data_venda < :end")),
+            {"start": start, "end": end}
+        )
+    db.commit()
+
+
+def rebuild_aggregates(db):
+    db.execute(delete(VendasAgregado))
+    db.execute(text(_AGGREGATE_SQL.format(where="data_venda IS NOT NULL")))
+    db.commit()
+
+
+def _filtered(statement, produtos, clientes, date_range):
+    if produtos:
+        statement = statement.where(VendasAgregado.produto.in_(list(produtos)))
+    if clientes:
+        statement = statement.where(VendasAgregado.cliente.in_(list(clientes)))
+    if date_range:
+        start, end = date_range
+        statement = statement.where(VendasAgregado.dia >= start.date(), VendasAgregado.dia < end.date())
+    return statement
+
+
+def sales_totals(db, produtos=(), clientes=(), date_range=None):
+    statement = _filtered(select(
+        func.coalesce(func.sum(VendasAgregado.vendas), 0),
+        func.coalesce(func.sum(VendasAgregado.quantidade), 0),
+        func.coalesce(func.sum(VendasAgregado.valor_total), 0.0),
+    ), produtos, clientes, date_range)
+    vendas, quantidade, valor = db.execute(statement).one()
+    return {"vendas": int(vendas), "quantidade": int(quantidade), "valor": round(float(valor), 2)}
+
+
+def sales_months(db, produtos=(), clientes=(), date_range=None):
+    # Meses com alguma venda do filtro: a busca vetorial pula as partições
+    # em que o produto ou o cliente nem aparecem.
+    statement = _filtered(select(VendasAgregado.dia).distinct(), produtos, clientes, date_range)
+    return {month_key(dia) for dia in db.execute(statement).scalars()}
+
+
+def client_names(db):
+    return [
+        row.cliente for row in db.execute(
+            select(VendasAgregado.cliente).where(VendasAgregado.cliente != "").distinct()
+        )
+    ]
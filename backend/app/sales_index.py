@@ -0,0 +1,156 @@
+import threading
+from langchain_core.documents import Document
+from app.ann_index import REBUILD_SUFFIX, copy_collection, needs_rebuild, swap_collection
+from app.sales_aggregates import NO_DATE_MONTH, months_between
+
+
+class SalesPartitions:
+    # Uma coleção do ChromaDB por mês de venda (vendas_2024_05, ...). Cada
+    # índice HNSW fica do tamanho de um mês e a busca só abre os meses do
+    # período perguntado, então o custo não cresce com o histórico inteiro.
+    def __init__(self, client, prefix: str = "vendas_", metadata: dict = None):
+        self.client = client
+        self.prefix = prefix
+        # Parâmetros do HNSW de cada partição nova.
+        self.metadata = metadata
+        self._lock = threading.Lock()
+        self._collections = {}
+        existing = {c.name: c for c in client.list_collections() if c.name.startswith(prefix)}
+        for name, collection in existing.items():
+            if name.endswith(REBUILD_SUFFIX):
+                # Cópia de uma reconstrução interrompida: só vale se a
+                # original já tinha sido apagada.
+                name = name[:-len(REBUILD_SUFFIX)]
+                if name in existing:
+                    continue
+                collection.modify(name=name)
+            self._collections[self._key(name)] = collection
+
+    def _name(self, key: str) -> str:
+        return self.prefix + key.replace("-", "_")
+
+    def _key(self, name: str) -> str:
+        return name[len(self.prefix):].replace("_", "-")
+
+    def months(self):
+        with self._lock:
+            return sorted(self._collections)
+
+    def collection(self, key: str):
+        with self._lock:
+            collection = self._collections.get(key)
+            if collection is None:
+                collection = self.client.get_or_create_collection(self._name(key), metadata=self.metadata)
+                self._collections[key] = collection
+            return collection
+
+    def count(self):
+        with self._lock:
+            collections = list(self._collections.values())
+        return sum(collection.count() for collection in collections)
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        # Interface de coleção para o BulkIngestor: cada documento vai para a
+        # partição do mês indicado em metadata["mes"].
+        groups = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(metadata.get("mes", NO_DATE_MONTH), []).append(i)
+        for key, positions in groups.items():
+            self.collection(key).upsert(
+                ids=[ids[i] for i in positions],
+                documents=[documents[i] for i in positions] if documents else None,
+                metadatas=[metadatas[i] for i in positions],
+                embeddings=[embeddings[i] for i in positions] if embeddings else None
+            )
+
+    def hashes(self, key: str, page_size: int = 5000):
+        # Hash de conteúdo de cada venda já indexada no mês, guardado nos
+        # próprios metadados para o checkpoint não crescer com o histórico.
+        with self._lock:
+            collection = self._collections.get(key)
+        if collection is None:
+            return {}
+        hashes = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return hashes
+            for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+                hashes[doc_id] = (metadata or {}).get("hash")
+            offset += len(page["ids"])
+
+    def delete(self, key: str, ids):
+        with self._lock:
+            collection = self._collections.get(key)
+        if collection is not None and ids:
+            collection.delete(ids=list(ids))
+
+    def drop(self, key: str):
+        with self._lock:
+            if self._collections.pop(key, None) is None:
+                return
+        self.client.delete_collection(self._name(key))
+
+    def outdated(self):
+        if self.metadata is None:
+            return []
+        with self._lock:
+            collections = dict(self._collections)
+        return [key for key, collection in sorted(collections.items()) if needs_rebuild(collection, self.metadata)]
+
+    def rebuild(self, keys):
+        # Um mês por vez: as buscas passam a usar a cópia antes de a
+        # partição original ser apagada.
+        for key in keys:
+            with self._lock:
+                collection = self._collections.get(key)
+            if collection is None:
+                continue
+            fresh = copy_collection(self.client, collection, self.metadata)
+            with self._lock:
+                self._collections[key] = fresh
+            swap_collection(self.client, fresh, self._name(key))
+
+    def drop_all(self):
+        for key in self.months():
+            self.drop(key)
+
+    def months_for(self, date_range=None, recent: int = 12, allowed=None):
+        # Sem período na pergunta, busca os ``recent`` meses mais novos.
+        # ``allowed`` restringe aos meses que os agregados sabem ter vendas
+        # do filtro; a partição sem data não tem agregado e sempre entra.
+        existing = self.months()
+        if allowed is not None:
+            existing = [key for key in existing if key in allowed or key == NO_DATE_MONTH]
+        if date_range:
+            wanted = set(months_between(*date_range))
+            return [key for key in existing if key in wanted]
+        dated = [key for key in existing if key != NO_DATE_MONTH]
+        undated = [key for key in existing if key == NO_DATE_MONTH]
+        return dated[-recent:] + undated if recent else existing
+
+    def search(self, vector, k: int, months, where: dict = None):
+        hits = []
+        for key in months:
+            with self._lock:
+                collection = self._collections.get(key)
+            if collection is None:
+                continue
+            results = collection.query(
+                query_embeddings=[vector],
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas", "distances"]
+            )
+            hits.extend(zip(
+                results["distances"][0],
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0]
+            ))
+        hits.sort(key=lambda hit: hit[0])
+        return [
+            (doc_id, Document(page_content=doc_text, metadata=metadata or {}))
+            for _, doc_id, doc_text, metadata in hits[:k]
+        ]
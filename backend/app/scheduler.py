@@ -0,0 +1,216 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from app.config import settings
+from app.executor import inference_executor
+from app.logger import get_logger
+from app.metrics import WORKLOAD_WAIT_SECONDS, WORKLOAD_YIELD_SECONDS
+
+logger = get_logger("scheduler")
+
+# Classes de trabalho de fundo e prioridade na fila (menor sai primeiro).
+# Consultas ("query") não passam por aqui: vão para o executor de inferência
+# e sempre têm a vez.
+BACKGROUND_PRIORITIES = {"sync": 0, "ingest": 1, "maintenance": 2}
+
+
+class WorkloadScheduler:
+    # Sync, ingestão e manutenção do índice rodam num pool próprio de baixa
+    # prioridade. Entre um lote e outro o trabalho chama ``checkpoint()``:
+    # com consultas em andamento ele espera (até ``max_defer``) e depois
+    # limita a fatia de CPU a ``cpu_share`` enquanto houver disputa.
+    def __init__(self, workers: int = 1, cpu_share: float = 0.5, max_defer: float = 2.0, nice: int = 10,
+                 interactive_load=None, poll_interval: float = 0.005):
+        self.workers = max(1, workers)
+        self.cpu_share = min(1.0, max(0.05, cpu_share))
+        self.max_defer = max_defer
+        self.nice = nice
+        self.interactive_load = interactive_load or (lambda: 0)
+        self.poll_interval = poll_interval
+
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopped = threading.Event()
+        self._local = threading.local()
+        self._periodic = {}
+        self._stats = {
+            name: {"queued": 0, "running": 0, "done": 0, "failed": 0, "wait_seconds": 0.0,
+                   "max_wait_seconds": 0.0, "yields": 0, "yield_seconds": 0.0}
+            for name in BACKGROUND_PRIORITIES
+        }
+
+    def _start_threads(self):
+        # Threads só na primeira tarefa: com o preload do gunicorn o objeto
+        # nasce no master, e threads de antes do fork não existiriam nos workers.
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f"background-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _lower_priority(self):
+        # No Linux o nice vale por thread (o id nativo é um pid para o
+        # setpriority); o embedding desta thread perde a CPU para as consultas.
+        if not self.nice:
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"Prioridade da thread de fundo não alterada: {e}")
+
+    def submit(self, workload: str, fn, *args, **kwargs) -> Future:
+        if workload not in BACKGROUND_PRIORITIES:
+            raise ValueError(f"Classe de trabalho desconhecida: {workload}")
+        if self._stopped.is_set():
+            raise RuntimeError("Agendador de trabalho de fundo encerrado")
+        self._start_threads()
+        future = Future()
+        with self._lock:
+            self._stats[workload]["queued"] += 1
+        self._queue.put((BACKGROUND_PRIORITIES[workload], next(self._seq),
+                         (workload, fn, args, kwargs, future, time.perf_counter())))
+        return future
+
+    def run(self, workload: str, fn, *args, **kwargs):
+        # Já numa thread de fundo (um job que chama outro), roda direto:
+        # esperar na própria fila travaria o pool.
+        if getattr(self._local, "workload", None):
+            return fn(*args, **kwargs)
+        return self.submit(workload, fn, *args, **kwargs).result()
+
+    def _loop(self):
+        self._lower_priority()
+        while True:
+            _, _, item = self._queue.get()
+            if item is None:
+                return
+            workload, fn, args, kwargs, future, submitted = item
+            waited = time.perf_counter() - submitted
+            WORKLOAD_WAIT_SECONDS.observe(waited, workload=workload)
+            with self._lock:
+                stats = self._stats[workload]
+                stats["queued"] -= 1
+                stats["running"] += 1
+                stats["wait_seconds"] += waited
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+            if not future.set_running_or_notify_cancel():
+                with self._lock:
+                    stats["running"] -= 1
+                continue
+
+            self._local.workload = workload
+            self._local.resumed = time.perf_counter()
+            try:
+                future.set_result(fn(*args, **kwargs))
+                outcome = "done"
+            except BaseException as e:
+                future.set_exception(e)
+                outcome = "failed"
+            finally:
+                self._local.workload = None
+            with self._lock:
+                stats["running"] -= 1
+                stats[outcome] += 1
+
+    def checkpoint(self):
+        # Chamado entre lotes. Fora das threads de fundo (testes, consultas)
+        # não faz nada.
+        workload = getattr(self._local, "workload", None)
+        if not workload:
+            return
+        now = time.perf_counter()
+        busy = now - self._local.resumed
+
+        contended = False
+        deadline = now + self.max_defer
+        while self.interactive_load() > 0 and time.perf_counter() < deadline and not self._stopped.is_set():
+            contended = True
+            time.sleep(self.poll_interval)
+        if contended and self.cpu_share < 1.0:
+            # Fatia de CPU: para cada segundo de lote, descansa o bastante
+            # para o fundo ficar em ``cpu_share`` do tempo.
+            time.sleep(busy * (1.0 - self.cpu_share) / self.cpu_share)
+
+        yielded = time.perf_counter() - now
+        self._local.resumed = time.perf_counter()
+        if contended:
+            WORKLOAD_YIELD_SECONDS.observe(yielded, workload=workload)
+            with self._lock:
+                self._stats[workload]["yields"] += 1
+                self._stats[workload]["yield_seconds"] += yielded
+
+    def every(self, seconds: float, workload: str, fn, *args, **kwargs):
+        # Agenda ``fn`` a cada ``seconds``; não enfileira de novo enquanto a
+        # execução anterior ainda estiver pendente.
+        key = (workload, getattr(fn, "__qualname__", repr(fn)))
+        if key in self._periodic:
+            return
+
+        def loop():
+            pending = None
+            while not self._stopped.wait(seconds):
+                if pending is not None and not pending.done():
+                    continue
+                try:
+                    pending = self.submit(workload, fn, *args, **kwargs)
+                except RuntimeError:
+                    return
+
+        thread = threading.Thread(target=loop, name=f"periodic-{workload}", daemon=True)
+        self._periodic[key] = thread
+        thread.start()
+
+    def depth(self):
+        with self._lock:
+            return {
+                (name, state): stats[state]
+                for name, stats in self._stats.items()
+                for state in ("queued", "running")
+            }
+
+    def stats(self):
+        with self._lock:
+            classes = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in classes.values():
+            started = stats["done"] + stats["failed"] + stats["running"]
+            stats["avg_wait_seconds"] = round(stats.pop("wait_seconds") / started, 4) if started else 0.0
+            stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 4)
+            stats["yield_seconds"] = round(stats["yield_seconds"], 4)
+        inference = inference_executor.stats()
+        return {
+            "background_workers": self.workers,
+            "cpu_share": self.cpu_share,
+            "query": {"in_flight": inference["in_flight"], "rejected": inference["rejected"]},
+            "background": classes,
+        }
+
+    def shutdown(self):
+        # Jobs ainda na fila são cancelados; os que estão rodando terminam.
+        self._stopped.set()
+        while True:
+            try:
+                _, _, item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[4].cancel()
+                with self._lock:
+                    self._stats[item[0]]["queued"] -= 1
+        for _ in self._threads:
+            self._queue.put((-1, next(self._seq), None))
+
+
+workload = WorkloadScheduler(
+    workers=settings.BACKGROUND_WORKERS,
+    cpu_share=settings.BACKGROUND_CPU_SHARE,
+    max_defer=settings.BACKGROUND_MAX_DEFER_SECONDS,
+    nice=settings.BACKGROUND_NICE,
+    interactive_load=lambda: inference_executor.stats()["in_flight"]
+)
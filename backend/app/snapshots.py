@@ -0,0 +1,148 @@
+import json
+import os
+from datetime import datetime
+import numpy as np
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".npz"
+
+
+def _pack(data) -> np.ndarray:
+    return np.frombuffer(json.dumps(data, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack(array: np.ndarray):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+def _pages(collection, page_size: int):
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def read_collections(collections, page_size: int = 5000):
+    # Vetores em float32 contíguos e metadados por coluna (um valor por
+    # documento, None quando a chave não existe) em vez de um dict por linha.
+    ids, documents, metadatas, vectors = [], [], [], []
+    for collection in collections:
+        for page in _pages(collection, page_size):
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(metadata or {} for metadata in page["metadatas"])
+            vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+    keys = sorted({key for metadata in metadatas for key in metadata})
+    columns = {key: [metadata.get(key) for metadata in metadatas] for key in keys}
+    matrix = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    return {"ids": ids, "documents": documents, "metadata": columns}, matrix
+
+
+def export_snapshot(directory: str, collections: dict, checkpoint: dict, model: str, page_size: int = 5000):
+    # ``collections``: nome -> lista de coleções do ChromaDB (as partições
+    # de vendas viram um único bloco). O arquivo é escrito ao lado e só
+    # aparece com o nome final quando está completo.
+    os.makedirs(directory, exist_ok=True)
+    created = datetime.utcnow()
+    arrays = {}
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "model": model,
+        "created_at": created.isoformat(),
+        "checkpoint": checkpoint,
+        "collections": {},
+    }
+    for name, sources in collections.items():
+        rows, vectors = read_collections(sources, page_size)
+        arrays[f"{name}.vectors"] = vectors
+        arrays[f"{name}.rows"] = _pack(rows)
+        manifest["collections"][name] = {"count": len(rows["ids"]), "dim": int(vectors.shape[1]) if len(vectors) else 0}
+    arrays["manifest"] = _pack(manifest)
+
+    path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{created:%Y%m%dT%H%M%S%f}{SNAPSHOT_SUFFIX}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return dict(manifest, path=path, bytes=os.path.getsize(path))
+
+
+def read_manifest(path: str) -> dict:
+    with np.load(path) as data:
+        return _unpack(data["manifest"])
+
+
+def list_snapshots(directory: str):
+    # Mais recente primeiro; arquivos ilegíveis ficam de fora.
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            manifest = read_manifest(path)
+        except (OSError, ValueError, KeyError):
+            continue
+        snapshots.append(dict(manifest, path=path, bytes=os.path.getsize(path)))
+    return snapshots
+
+
+def compatible(manifest: dict, model: str, checkpoint_version: int) -> bool:
+    # Vetores de outro modelo (ou outro backend/quantização) não servem, e
+    # um checkpoint de outra versão faria o sync aplicar o delta errado.
+    return (
+        manifest.get("format") == SNAPSHOT_FORMAT
+        and manifest.get("model") == model
+        and manifest.get("checkpoint", {}).get("version") == checkpoint_version
+    )
+
+
+def latest_snapshot(directory: str, model: str, checkpoint_version: int):
+    for manifest in list_snapshots(directory):
+        if compatible(manifest, model, checkpoint_version):
+            return manifest
+    return None
+
+
+def load_rows(path: str, name: str, batch_size: int = 5000):
+    # (ids, documentos, metadatas, vetores) em lotes, prontos para upsert.
+    with np.load(path) as data:
+        rows = _unpack(data[f"{name}.rows"])
+        vectors = data[f"{name}.vectors"]
+    columns = rows["metadata"]
+    for start in range(0, len(rows["ids"]), batch_size):
+        end = start + batch_size
+        metadatas = [
+            {key: values[i] for key, values in columns.items() if values[i] is not None} or None
+            for i in range(start, min(end, len(rows["ids"])))
+        ]
+        yield rows["ids"][start:end], rows["documents"][start:end], metadatas, vectors[start:end].tolist()
+
+
+def prune_snapshots(directory: str, keep: int):
+    removed = []
+    for manifest in list_snapshots(directory)[max(1, keep):]:
+        os.remove(manifest["path"])
+        removed.append(manifest["path"])
+    return removed
+
+
+def summary(manifest: dict) -> dict:
+    # O checkpoint inteiro tem um hash por linha do estoque; na listagem
+    # basta o ponto do banco que o snapshot reflete.
+    checkpoint = manifest.get("checkpoint", {})
+    return {
+        "file": os.path.basename(manifest["path"]),
+        "created_at": manifest["created_at"],
+        "model": manifest["model"],
+        "collections": manifest["collections"],
+        "bytes": manifest["bytes"],
+        "watermark": checkpoint.get("estoque", {}).get("watermark"),
+        "last_sync": checkpoint.get("last_sync"),
+    }
@@ -0,0 +1,425 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from sqlalchemy import text
+from app.logger import get_logger
+from app.metrics import timed
+from app.sales_aggregates import NO_DATE_MONTH, month_bounds, month_key, month_sql, rebuild_aggregates, refresh_aggregates
+
+logger = get_logger("sync")
+
+# Versão 3: histórico de vendas completo, particionado por mês.
+CHECKPOINT_VERSION = 3
+
+# Visões de embedding por produto. Só "resumo" por padrão; as outras
+# existem para quem quiser trocar tamanho do índice por recall.
+ESTOQUE_VIEWS = {
+    "resumo": lambda row: (
+        f"Produto: {row.produto}. "
+        f"Temos {row.quantidade} {row.unidade} em estoque. "
+        f"Preço: {format_price(row.preco, f' por {row.unidade}')}. "
+        f"Categoria: {row.categoria}."
+    ),
+    "quantidade": lambda row: f"Quantidade de {row.produto} disponível: {row.quantidade} {row.unidade}",
+    "preco": lambda row: f"Preço do {row.produto}: {format_price(row.preco)}",
+}
+DEFAULT_ESTOQUE_VIEWS = ("resumo",)
+
+
+def has_price(preco) -> bool:
+    # ``preco`` pode ser NULL no MySQL; no ProductIndex ele vira NaN.
+    return preco is not None and preco == preco
+
+
+def format_price(preco, suffix: str = "") -> str:
+    return f"R$ {preco:.2f}{suffix}" if has_price(preco) else "sem preço"
+
+
+def estoque_metadata(row):
+    return {
+        "source": "estoque",
+        "produto": row.produto,
+        "quantidade": row.quantidade,
+        "preco": float(row.preco) if has_price(row.preco) else None,
+        "categoria": row.categoria,
+        "id": row.id
+    }
+
+
+def estoque_ids(row_id, views=DEFAULT_ESTOQUE_VIEWS):
+    return [f"estoque_{row_id}" if i == 0 else f"estoque_{row_id}_{view}" for i, view in enumerate(views)]
+
+
+def estoque_documents(row, views=DEFAULT_ESTOQUE_VIEWS):
+    # No ChromaDB fica só o necessário para filtrar (fonte, produto, id);
+    # quantidade, preço e categoria vêm do ProductIndex na hora da consulta.
+    metadata = {"source": "estoque", "produto": row.produto, "id": row.id}
+    return [
+        (doc_id, ESTOQUE_VIEWS[view](row), dict(metadata))
+        for doc_id, view in zip(estoque_ids(row.id, views), views)
+    ]
+
+
+def venda_documents(row):
+    data_venda = _parse_datetime(row.data_venda)
+    return [(
+        f"vendas_{row.id}",
+        f"Venda: {row.quantidade} unidades de {row.produto} "
+        f"para {row.cliente}. "
+        f"Valor: R$ {row.valor_total:.2f}. "
+        f"Data: {row.data_venda}.",
+        {
+            "source": "vendas",
+            "produto": row.produto,
+            "cliente": row.cliente or "",
+            "valor": float(row.valor_total),
+            "quantidade": row.quantidade,
+            "id": row.id,
+            "mes": month_key(data_venda),
+            "data": data_venda.date().isoformat() if data_venda else ""
+        }
+    )]
+
+
+def venda_ids(row_id):
+    return [f"vendas_{row_id}"]
+
+
+def content_hash(documents):
+    # O hash cobre o texto e os metadados gerados, então uma mudança no
+    # template dos documentos também força a reindexação da linha.
+    payload = json.dumps(
+        [[text_, metadata] for _, text_, metadata in documents],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _isoformat(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+class SyncCheckpoint:
+    def __init__(self, path: str):
+        self.path = path
+        self.reset()
+        self.load()
+
+    def reset(self):
+        self.estoque = {"watermark": None, "max_id": 0, "views": list(DEFAULT_ESTOQUE_VIEWS), "hashes": {}}
+        self.vendas = {"months": {}}
+        self.last_sync = None
+
+    @property
+    def empty(self):
+        return self.last_sync is None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Checkpoint de sync inválido, ignorando: {e}")
+            return
+
+        self.restore(data)
+
+    def restore(self, data: dict):
+        if data.get("version") != CHECKPOINT_VERSION:
+            logger.warning("⚠️  Checkpoint de sync de outra versão, ignorando")
+            return False
+
+        self.estoque = data["estoque"]
+        self.vendas = data["vendas"]
+        self.last_sync = data.get("last_sync")
+        return True
+
+    def to_dict(self):
+        return {
+            "version": CHECKPOINT_VERSION,
+            "last_sync": self.last_sync,
+            "estoque": self.estoque,
+            "vendas": self.vendas
+        }
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.path)
+
+
+def _month_fingerprints(db):
+    # Uma passada agregada por mês: só os meses cuja assinatura mudou são
+    # relidos e comparados linha a linha. Cobre inserções, remoções e
+    # edições de quantidade, valor, produto, cliente ou data.
+    month = month_sql(db)
+    rows = db.execute(text(
+        f"SELECT {month} AS mes, COUNT(*) AS total, MAX(id) AS max_id, SUM(id) AS id_sum, "
+        "SUM(quantidade) AS quantidade, SUM(valor_total) AS valor, "
+        "SUM(LENGTH(produto) + COALESCE(LENGTH(cliente), 0)) AS texto, "
+        "MIN(data_venda) AS primeira, MAX(data_venda) AS ultima "
+        f"FROM vendas GROUP BY {month}"
+    )).fetchall()
+    return {
+        row.mes or NO_DATE_MONTH: [
+            row.total, row.max_id, int(row.id_sum or 0), int(row.quantidade or 0),
+            round(float(row.valor or 0), 2), int(row.texto or 0),
+            _isoformat(_parse_datetime(row.primeira)), _isoformat(_parse_datetime(row.ultima))
+        ]
+        for row in rows
+    }
+
+
+def _new_report(mode):
+    return {
+        "mode": mode,
+        "inserted": 0,
+        "updated": 0,
+        "deleted": 0,
+        "skipped": 0,
+        "estoque_rows": 0,
+        "vendas_rows": 0
+    }
+
+
+class _SyncRun:
+    def __init__(self, db, sales, checkpoint, report, full, stream_batch_size, estoque_views):
+        self.db = db
+        self.sales = sales
+        self.estoque_views = estoque_views
+        self.checkpoint = checkpoint
+        self.report = report
+        self.full = full
+        self.stream_batch_size = stream_batch_size
+        self.delete_ids = []
+        self.sales_deletes = {}
+        self.dropped_months = []
+        self.changed_months = []
+        self.changed_rows = []
+        self.estoque_inserted = 0
+        self.estoque_state = None
+        self.vendas_state = None
+
+    def _stream(self, query, params=None):
+        return self.db.execute(
+            text(query).execution_options(stream_results=True, yield_per=self.stream_batch_size),
+            params or {}
+        )
+
+    def _diff(self, source, documents, key, hashes):
+        row_hash = content_hash(documents)
+        previous = hashes.get(key)
+        if previous == row_hash:
+            return False
+
+        hashes[key] = row_hash
+        if previous is None:
+            self.report["inserted"] += 1
+            if source == "estoque":
+                self.estoque_inserted += 1
+        else:
+            self.report["updated"] += 1
+            self.changed_rows.append((source, int(key)))
+        return True
+
+    def _delete(self, source, key, hashes, ids):
+        self.delete_ids.extend(ids)
+        self.changed_rows.append((source, int(key)))
+        del hashes[key]
+        self.report["deleted"] += 1
+
+    def estoque_changes(self):
+        state = self.checkpoint.estoque
+        hashes = {} if self.full else dict(state["hashes"])
+
+        current_ids = {row.id for row in self.db.execute(text("SELECT id FROM estoque"))}
+        self.report["estoque_rows"] = len(current_ids)
+
+        watermark = None if self.full else _parse_datetime(state["watermark"])
+        if watermark is None:
+            rows = self._stream("SELECT * FROM estoque")
+        else:
+            rows = self._stream(
+                "SELECT * FROM estoque "
+                "WHERE ultima_atualizacao >= :watermark "
+                "OR ultima_atualizacao IS NULL "
+                "OR id > :max_id",
+                {"watermark": watermark, "max_id": state["max_id"]}
+            )
+
+        changed = 0
+        new_watermark = watermark
+        for row in rows:
+            updated_at = _parse_datetime(row.ultima_atualizacao)
+            if updated_at and (new_watermark is None or updated_at > new_watermark):
+                new_watermark = updated_at
+
+            documents = estoque_documents(row, self.estoque_views)
+            if self._diff("estoque", documents, str(row.id), hashes):
+                changed += 1
+                yield from documents
+
+        for key in list(hashes):
+            if int(key) not in current_ids:
+                self._delete("estoque", key, hashes, estoque_ids(key, self.estoque_views))
+
+        self.report["skipped"] += len(current_ids) - changed
+
+        self.estoque_state = {
+            "watermark": _isoformat(new_watermark),
+            "max_id": max(current_ids, default=0),
+            "views": list(self.estoque_views),
+            "hashes": hashes
+        }
+
+    def vendas_changes(self):
+        previous = {} if self.full else self.checkpoint.vendas["months"]
+        fingerprints = _month_fingerprints(self.db)
+        self.report["vendas_rows"] = sum(fingerprint[0] for fingerprint in fingerprints.values())
+
+        for key, fingerprint in sorted(fingerprints.items()):
+            if previous.get(key) == fingerprint:
+                self.report["skipped"] += fingerprint[0]
+                continue
+            self.changed_months.append(key)
+            yield from self._month_changes(key)
+
+        for key in previous:
+            if key not in fingerprints:
+                self.dropped_months.append(key)
+                self.changed_months.append(key)
+                for doc_id in self.sales.hashes(key):
+                    self.changed_rows.append(("vendas", int(doc_id.rsplit("_", 1)[1])))
+                    self.report["deleted"] += 1
+
+        self.vendas_state = {"months": fingerprints}
+
+    def _month_changes(self, key):
+        hashes = {} if self.full else self.sales.hashes(key)
+        bounds = month_bounds(key)
+        if bounds is None:
+            rows = self._stream("SELECT * FROM vendas WHERE data_venda IS NULL")
+        else:
+            rows = self._stream(
+                "SELECT * FROM vendas WHERE data_venda >= :start AND data_venda < :end",
+                {"start": bounds[0], "end": bounds[1]}
+            )
+
+        seen = changed = 0
+        for row in rows:
+            seen += 1
+            documents = venda_documents(row)
+            row_hash = content_hash(documents)
+            previous = None
+            for doc_id in venda_ids(row.id):
+                previous = hashes.pop(doc_id, None)
+            if previous == row_hash:
+                continue
+
+            changed += 1
+            if previous is None:
+                self.report["inserted"] += 1
+            else:
+                self.report["updated"] += 1
+                self.changed_rows.append(("vendas", row.id))
+            yield from (
+                (doc_id, doc_text, dict(metadata, hash=row_hash))
+                for doc_id, doc_text, metadata in documents
+            )
+
+        # O que sobrou no mês foi apagado no banco ou mudou de mês.
+        for doc_id in hashes:
+            self.sales_deletes.setdefault(key, []).append(doc_id)
+            self.changed_rows.append(("vendas", int(doc_id.rsplit("_", 1)[1])))
+            self.report["deleted"] += 1
+        self.report["skipped"] += seen - changed
+
+
+def _delete_synced_documents(collection):
+    # "vendas" limpa também coleções de antes do particionamento por mês.
+    for source in ("estoque", "vendas"):
+        existing = collection.get(where={"source": source}, include=[])
+        if existing["ids"]:
+            collection.delete(ids=existing["ids"])
+
+
+def _merge_ingestion(first, second):
+    seconds = first["seconds"] + second["seconds"]
+    documents = first["documents"] + second["documents"]
+    return {
+        "documents": documents,
+        "batches": first["batches"] + second["batches"],
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(documents / seconds, 1) if seconds else 0.0
+    }
+
+
+def run_sync(db, collection, sales, checkpoint: SyncCheckpoint, ingestor, full: bool = False, stream_batch_size: int = 1000, on_rows_changed=None, estoque_views=DEFAULT_ESTOQUE_VIEWS):
+    # Sem checkpoint não há como saber o que já está no ChromaDB, e um
+    # checkpoint com a coleção vazia indica que o volume foi recriado.
+    if not full and (checkpoint.empty or collection.count() == 0):
+        full = True
+    # Mudar as visões troca os ids dos documentos de estoque.
+    if checkpoint.estoque.get("views") != list(estoque_views):
+        full = True
+
+    report = _new_report("full" if full else "incremental")
+    run = _SyncRun(db, sales, checkpoint, report, full, stream_batch_size, tuple(estoque_views))
+
+    if full:
+        _delete_synced_documents(collection)
+        sales.drop_all()
+
+    # As linhas alteradas vão direto do cursor para o ingestor em lotes,
+    # sem materializar o catálogo inteiro em memória. Vendas vão para a
+    # partição do mês, só nos meses que mudaram.
+    with timed("sync_ingest"):
+        report["ingestion"] = _merge_ingestion(
+            ingestor.ingest(run.estoque_changes()),
+            ingestor.ingest(run.vendas_changes(), collection=sales)
+        )
+
+    with timed("sync_delete"):
+        if run.delete_ids:
+            collection.delete(ids=run.delete_ids)
+        for key, ids in run.sales_deletes.items():
+            sales.delete(key, ids)
+        for key in run.dropped_months:
+            sales.drop(key)
+
+    with timed("sales_aggregates"):
+        if full:
+            rebuild_aggregates(db)
+        elif run.changed_months:
+            refresh_aggregates(db, run.changed_months)
+    report["vendas_months_changed"] = len(run.changed_months)
+    report["estoque_inserted"] = run.estoque_inserted
+
+    if on_rows_changed and run.changed_rows:
+        on_rows_changed(run.changed_rows)
+
+    checkpoint.estoque = run.estoque_state
+    checkpoint.vendas = run.vendas_state
+    checkpoint.last_sync = datetime.utcnow().isoformat()
+    checkpoint.save()
+
+    return report
@@ -0,0 +1,195 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+import numpy as np
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, seed: int):
+    # Mistura de gaussianas normalizada: agrupada como embeddings de texto
+    # reais, sem depender do modelo.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + rng.normal(scale=0.6, size=(count, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def snapshot_vectors(path: str, name: str = "documents"):
+    from app.snapshots import load_rows
+
+    return np.concatenate([
+        np.asarray(vectors, dtype=np.float32) for _, _, _, vectors in load_rows(path, name)
+    ])
+
+
+def split_queries(vectors, queries: int, seed: int):
+    # Perguntas fora do índice, da mesma distribuição dos documentos.
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[order[queries:]], vectors[order[:queries]]
+
+
+def exact_top_k(documents, queries, k: int, space: str):
+    # Busca exata por força bruta: a referência de recall de cada métrica.
+    if space == "l2":
+        scores = -(
+            (queries ** 2).sum(axis=1, keepdims=True) - 2 * queries @ documents.T + (documents ** 2).sum(axis=1)
+        )
+    elif space == "cosine":
+        units = documents / np.clip(np.linalg.norm(documents, axis=1, keepdims=True), 1e-12, None)
+        scores = queries @ units.T
+    else:
+        scores = queries @ documents.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    rows = np.arange(len(queries))[:, None]
+    return top[rows, np.argsort(-scores[rows, top], axis=1)]
+
+
+def recall(expected, found):
+    hits = sum(len(set(a) & set(b)) for a, b in zip(expected, found))
+    return round(hits / sum(len(a) for a in expected), 4)
+
+
+def index_bytes(documents, space: str, m: int):
+    # O grafo que o ChromaDB guarda em memória é um índice do hnswlib: o
+    # tamanho salvo é o dos vetores mais os links, e não depende do ef.
+    import hnswlib
+
+    index = hnswlib.Index(space=space, dim=documents.shape[1])
+    index.init_index(max_elements=len(documents), M=m, ef_construction=10)
+    index.add_items(documents, np.arange(len(documents)))
+    with tempfile.TemporaryDirectory(prefix="pixaflow-ann-") as workdir:
+        path = os.path.join(workdir, "index.bin")
+        index.save_index(path)
+        return os.path.getsize(path)
+
+
+def run_config(client, documents, queries, expected, config, k: int, batch_size: int = 5000):
+    from app.ann_index import hnsw_metadata
+    from benchmarks.scenario import percentiles
+
+    collection = client.create_collection(f"ann_{uuid.uuid4().hex[:12]}", metadata=hnsw_metadata(**config))
+    try:
+        ids = [str(i) for i in range(len(documents))]
+        started = time.perf_counter()
+        for start in range(0, len(documents), batch_size):
+            collection.add(ids=ids[start:start + batch_size], embeddings=documents[start:start + batch_size].tolist())
+        build_seconds = time.perf_counter() - started
+
+        latencies, found = [], []
+        for query in queries.tolist():
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[query], n_results=k, include=[])
+            latencies.append((time.perf_counter() - started) * 1000)
+            found.append([int(doc_id) for doc_id in result["ids"][0]])
+    finally:
+        client.delete_collection(collection.name)
+
+    return dict(
+        config,
+        recall_at_k=recall(expected.tolist(), found),
+        query=percentiles(latencies),
+        build_seconds=round(build_seconds, 3),
+    )
+
+
+def pareto(results):
+    # Configurações que nenhuma outra supera em recall e p99 ao mesmo tempo.
+    front = []
+    for result in results:
+        dominated = any(
+            other["recall_at_k"] >= result["recall_at_k"]
+            and other["query"]["p99_ms"] <= result["query"]["p99_ms"]
+            and (other["recall_at_k"], other["query"]["p99_ms"]) != (result["recall_at_k"], result["query"]["p99_ms"])
+            for other in results
+        )
+        if not dominated:
+            front.append(result)
+    return front
+
+
+def recommend(results, target_recall: float):
+    # A mais rápida (p99) entre as que atingem o recall pedido.
+    eligible = [r for r in results if r["recall_at_k"] >= target_recall]
+    return min(eligible, key=lambda r: (r["query"]["p99_ms"], r["index_mb"])) if eligible else None
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Recall@k x latência x memória de parâmetros do HNSW")
+    parser.add_argument("--snapshot", help="Snapshot exportado (POST /api/v1/snapshots) em vez de vetores sintéticos")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.QUERY_DEFAULT_K)
+    parser.add_argument("--spaces", default=settings.HNSW_SPACE)
+    parser.add_argument("--m", default="8,16,32")
+    parser.add_argument("--construction-ef", default="100,200")
+    parser.add_argument("--search-ef", default="10,50,100")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_ann.json")
+    args = parser.parse_args()
+
+    import chromadb
+
+    if args.snapshot:
+        vectors = snapshot_vectors(args.snapshot)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim, args.clusters, args.seed)
+    documents, queries = split_queries(vectors, args.queries, args.seed)
+
+    client = chromadb.EphemeralClient()
+    spaces = [s for s in args.spaces.split(",") if s]
+    expected = {space: exact_top_k(documents, queries, args.k, space) for space in spaces}
+    memory = {}
+    results = []
+    for space, m, construction_ef, search_ef in itertools.product(
+        spaces, _ints(args.m), _ints(args.construction_ef), _ints(args.search_ef)
+    ):
+        config = {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef}
+        print(f"⏱️  Medindo {config}...", file=sys.stderr)
+        result = run_config(client, documents, queries, expected[space], config, args.k)
+        if (space, m) not in memory:
+            memory[space, m] = index_bytes(documents, space, m)
+        result["index_mb"] = round(memory[space, m] / 1e6, 2)
+        results.append(result)
+
+    best = recommend(results, args.target_recall)
+    output = {
+        "source": args.snapshot or "synthetic",
+        "documents": len(documents),
+        "dim": int(documents.shape[1]),
+        "queries": len(queries),
+        "k": args.k,
+        "results": results,
+        "pareto": [{key: r[key] for key in ("space", "m", "construction_ef", "search_ef")} for r in pareto(results)],
+        "recommended": best,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(json.dumps(output, indent=2, ensure_ascii=False))
+    if best:
+        print(
+            f"✅ HNSW_SPACE={best['space']} HNSW_M={best['m']} HNSW_CONSTRUCTION_EF={best['construction_ef']} "
+            f"HNSW_SEARCH_EF={best['search_ef']}: recall@{args.k} {best['recall_at_k']}, "
+            f"p99 {best['query']['p99_ms']} ms, índice {best['index_mb']} MB",
+            file=sys.stderr
+        )
+    else:
+        print(f"⚠️  Nenhuma configuração atingiu recall {args.target_recall}", file=sys.stderr)
+    print(f"📊 Resultados salvos em {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
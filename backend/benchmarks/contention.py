@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Agendador desligado: o sync disputa a CPU com as consultas de igual para igual.
+MODES = {
+    "off": {"BACKGROUND_CPU_SHARE": "1.0", "BACKGROUND_MAX_DEFER_SECONDS": "0", "BACKGROUND_NICE": "0"},
+    "on": {},
+}
+
+
+def busy_embeddings(work: int):
+    from benchmarks.datasets import HashEmbeddings
+
+    class BusyEmbeddings(HashEmbeddings):
+        # Embeddings por hashing com custo de CPU parecido com o de um
+        # modelo: ``work`` multiplicações de matriz por texto (o numpy
+        # solta o GIL, como o torch).
+        def __init__(self):
+            super().__init__()
+            self._weights = np.random.default_rng(0).normal(size=(self.dimensions, self.dimensions)).astype(np.float32)
+
+        def _embed(self, text):
+            vector = super()._embed(text)
+            state = np.asarray(vector, dtype=np.float32)
+            for _ in range(work):
+                state = np.tanh(state @ self._weights)
+            return vector
+
+    return BusyEmbeddings
+
+
+def query_load(questions, qps, stop):
+    # Carga aberta: perguntas chegam a ``qps`` por segundo, como usuários
+    # reais, independente de as anteriores já terem respondido.
+    from app.executor import ExecutorSaturated, inference_executor
+    from app.rag_service import rag_service
+
+    latencies = []
+    rejected = []
+
+    def done(started):
+        return lambda future: latencies.append((time.perf_counter() - started) * 1000)
+
+    def dispatch():
+        pending = []
+        next_at = time.perf_counter()
+        i = 0
+        while not stop.is_set():
+            next_at += 1.0 / qps
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            started = time.perf_counter()
+            try:
+                future = inference_executor.submit(rag_service.query, questions[i % len(questions)])
+            except ExecutorSaturated:
+                rejected.append(i)
+                continue
+            future.add_done_callback(done(started))
+            pending.append(future)
+            i += 1
+        for future in pending:
+            future.result()
+
+    thread = threading.Thread(target=dispatch)
+    thread.start()
+    return thread, latencies, rejected
+
+
+def run_mode(args):
+    from app.database import Base, SessionLocal, engine
+    from app.rag_service import rag_service
+    from app.scheduler import workload
+    from benchmarks.datasets import populate, questions
+    from benchmarks.scenario import percentiles
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    populate(db, args.rows, int(args.rows * args.sales_ratio), args.seed)
+    db.close()
+
+    rag_service.embeddings_factory = busy_embeddings(args.work)
+    rag_service.start()
+    sample = questions(args.queries, args.rows, args.seed)
+
+    # Consultas sozinhas, depois durante um sync completo.
+    stop = threading.Event()
+    thread, idle, _ = query_load(sample, args.qps, stop)
+    time.sleep(args.idle_seconds)
+    stop.set()
+    thread.join()
+
+    stop = threading.Event()
+    thread, contended, rejected = query_load(sample, args.qps, stop)
+    started = time.perf_counter()
+    report = workload.run("sync", rag_service._sync_database_to_rag, full=True)
+    sync_seconds = time.perf_counter() - started
+    stop.set()
+    thread.join()
+
+    result = {
+        "idle": percentiles(idle),
+        "during_sync": dict(percentiles(contended), rejected=len(rejected)),
+        "sync_seconds": round(sync_seconds, 3),
+        "sync_report": report,
+        "workload": workload.stats()["background"]["sync"],
+    }
+    rag_service.shutdown()
+    workload.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência das consultas durante um sync, com e sem o agendador de fundo")
+    parser.add_argument("--modes", default="off,on")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--sales-ratio", type=float, default=0.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--qps", type=float, default=20.0)
+    parser.add_argument("--work", type=int, default=20, help="Custo simulado do modelo por texto")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_contention.json")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = {}
+    for mode in [m for m in args.modes.split(",") if m]:
+        print(f"⏱️  Medindo agendador {mode}...", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix=f"pixaflow-contention-{mode}-") as workdir:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                CHROMA_PATH=os.path.join(workdir, "chroma"),
+                SNAPSHOT_DIR=os.path.join(workdir, "snapshots"),
+                INGEST_WORKERS="1",
+                EMBEDDING_CACHE_ENABLED="false",
+                ANSWER_CACHE_ENABLED="false",
+                QUERY_BATCHING_ENABLED="false",
+                **MODES[mode]
+            )
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.contention", "--worker",
+                 "--rows", str(args.rows), "--sales-ratio", str(args.sales_ratio),
+                 "--queries", str(args.queries), "--qps", str(args.qps),
+                 "--work", str(args.work), "--idle-seconds", str(args.idle_seconds), "--seed", str(args.seed)],
+                cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, text=True, check=True
+            )
+            results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    output = {"rows": args.rows, "qps": args.qps, "work": args.work, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(json.dumps(output, indent=2, ensure_ascii=False))
+    print(f"📊 Resultados salvos em {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import hashlib
+import random
+import re
+from datetime import datetime, timedelta
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import insert
+from app.models import Estoque, Vendas
+
+PRODUTOS = [
+    ("Alface", "Verdura", "unidade"), ("Tomate", "Legume", "kg"), ("Cenoura", "Legume", "kg"),
+    ("Batata", "Tubérculo", "kg"), ("Cebola", "Legume", "kg"), ("Arroz", "Grão", "kg"),
+    ("Feijão", "Grão", "kg"), ("Couve", "Verdura", "maço"), ("Pimentão", "Legume", "kg"),
+    ("Abóbora", "Legume", "kg"), ("Mandioca", "Tubérculo", "kg"), ("Milho", "Grão", "kg"),
+    ("Banana", "Fruta", "dúzia"), ("Maçã", "Fruta", "kg"), ("Laranja", "Fruta", "kg"),
+    ("Limão", "Fruta", "kg"), ("Repolho", "Verdura", "unidade"), ("Beterraba", "Legume", "kg"),
+]
+VARIEDADES = ["", "Orgânico", "Premium", "Baby", "Crioulo", "Hidropônico", "Roxo", "Amarelo"]
+CLIENTES = [
+    "João Silva", "Maria Santos", "Pedro Costa", "Ana Souza", "Carlos Lima",
+    "Fernanda Alves", "Lucas Rocha", "Juliana Dias", "Rafael Gomes", "Patrícia Melo",
+]
+PERGUNTAS = [
+    "Quanto custa o {produto}?",
+    "Qual o preço da {produto}?",
+    "Quantos {produto} temos no estoque?",
+    "Mostre as vendas recentes de {produto}",
+    "Quais produtos da categoria {categoria} temos?",
+    "Lista todos os produtos em estoque",
+    "Quais clientes compraram {produto}?",
+    "Tem {produto} disponível?",
+]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashEmbeddings(Embeddings):
+    # Embedding determinístico por hashing de tokens: mede o custo do
+    # pipeline (cache, lotes, ChromaDB) sem depender do modelo.
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def product_name(i: int) -> str:
+    base, _, _ = PRODUTOS[i % len(PRODUTOS)]
+    variedade = VARIEDADES[(i // len(PRODUTOS)) % len(VARIEDADES)]
+    lote = i // (len(PRODUTOS) * len(VARIEDADES))
+    parts = [base, variedade, str(lote) if lote else ""]
+    return " ".join(p for p in parts if p)
+
+
+def estoque_rows(count: int, rng: random.Random, now: datetime):
+    for i in range(count):
+        _, categoria, unidade = PRODUTOS[i % len(PRODUTOS)]
+        yield {
+            "produto": product_name(i),
+            "quantidade": rng.randint(0, 500),
+            "unidade": unidade,
+            "preco": round(rng.uniform(0.5, 40.0), 2),
+            "categoria": categoria,
+            "ultima_atualizacao": now - timedelta(minutes=rng.randint(1, 60 * 24 * 30)),
+        }
+
+
+def vendas_rows(count: int, products: int, rng: random.Random, now: datetime):
+    for _ in range(count):
+        quantidade = rng.randint(1, 20)
+        yield {
+            "produto": product_name(rng.randrange(products)),
+            "quantidade": quantidade,
+            "valor_total": round(quantidade * rng.uniform(0.5, 40.0), 2),
+            "data_venda": now - timedelta(minutes=rng.randint(1, 60 * 24 * 730)),
+            "cliente": rng.choice(CLIENTES),
+        }
+
+
+def _insert(db, model, rows, chunk_size: int = 10000):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+    db.commit()
+
+
+def populate(db, products: int, sales: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    _insert(db, Estoque, estoque_rows(products, rng, now))
+    _insert(db, Vendas, vendas_rows(sales, products, rng, now))
+
+
+def questions(count: int, products: int, seed: int = 42):
+    # Distribuição concentrada nos primeiros produtos, como o tráfego real,
+    # onde poucas perguntas populares se repetem muito.
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        i = min(int(rng.paretovariate(1.2)) - 1, products - 1)
+        _, categoria, _ = PRODUTOS[i % len(PRODUTOS)]
+        template = rng.choice(PERGUNTAS)
+        result.append(template.format(produto=product_name(i).lower(), categoria=categoria.lower()))
+    return result
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from importlib import metadata
+from types import SimpleNamespace
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Pacotes que cada backend precisa além do resto do serviço. onnxruntime e
+# tokenizers já vêm com o chromadb, então o ONNX não acrescenta nada.
+PACKAGES = {
+    "torch": ["torch", "sentence-transformers", "transformers"],
+    "onnx": ["onnxruntime", "tokenizers"],
+    "onnx-fp32": ["onnxruntime", "tokenizers"],
+    "hash": [],
+}
+
+
+def _package_mb(names):
+    total = 0
+    for name in names:
+        try:
+            files = metadata.distribution(name).files or []
+        except metadata.PackageNotFoundError:
+            continue
+        total += sum(f.size or 0 for f in files)
+    return round(total / 1e6, 1)
+
+
+def _load(name):
+    from app.config import settings
+
+    if name == "hash":
+        from benchmarks.datasets import HashEmbeddings
+        return HashEmbeddings()
+
+    from app.embeddings import create_embeddings
+    return create_embeddings(
+        "torch" if name == "torch" else "onnx",
+        settings.EMBEDDING_MODEL,
+        onnx_path=settings.EMBEDDING_ONNX_PATH,
+        quantized=name == "onnx",
+        max_length=settings.EMBEDDING_MAX_LENGTH
+    )
+
+
+def corpus(size: int, queries: int, seed: int):
+    from app.sync import ESTOQUE_VIEWS
+    from benchmarks.datasets import estoque_rows, questions
+
+    # Os mesmos textos que o sync indexa e as mesmas perguntas do cenário.
+    rows = estoque_rows(size, random.Random(seed), datetime(2024, 1, 1))
+    documents = [ESTOQUE_VIEWS["resumo"](SimpleNamespace(**row)) for row in rows]
+    return documents, questions(queries, size, seed)
+
+
+def run_backend(name, documents, queries, output):
+    # Roda num processo próprio para que import, memória e RSS de pico
+    # sejam só deste backend.
+    from benchmarks.scenario import percentiles
+
+    started = time.perf_counter()
+    embeddings = _load(name)
+    embeddings.embed_query("aquecimento do modelo")
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    query_vectors = []
+    for question in queries:
+        started = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(question))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    doc_vectors = []
+    for start in range(0, len(documents), 64):
+        doc_vectors.extend(embeddings.embed_documents(documents[start:start + 64]))
+    embed_seconds = time.perf_counter() - started
+
+    np.savez(output, documents=np.asarray(doc_vectors, dtype=np.float32), queries=np.asarray(query_vectors, dtype=np.float32))
+    return {
+        "load_seconds": round(load_seconds, 3),
+        "query": percentiles(latencies),
+        "documents_per_second": round(len(documents) / embed_seconds, 1) if embed_seconds else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "packages_mb": _package_mb(PACKAGES[name]),
+    }
+
+
+def _top_k(documents, queries, k):
+    scores = queries @ documents.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(expected, found):
+    hits = sum(len(set(a) & set(b)) for a, b in zip(expected.tolist(), found.tolist()))
+    return round(hits / expected.size, 4)
+
+
+def storage_recall(documents, queries, k, rescore_factor):
+    # Mesmos vetores, guardados em float16 ou int8: quanto da busca exata
+    # em float32 cada formato preserva, e quanto ocupa por vetor.
+    from app.quantization import QuantizedMatrix
+
+    norms = np.linalg.norm(documents, axis=1, keepdims=True)
+    units = documents / np.clip(norms, 1e-12, None)
+    expected = _top_k(units, queries, k)
+    result = {}
+    for dtype in ("float32", "float16", "int8"):
+        matrix = QuantizedMatrix(len(units), units.shape[1], dtype, rescore_factor)
+        for slot, vector in enumerate(units):
+            matrix.set(slot, vector)
+        found = np.array([[slot for slot, _ in matrix.top(query, k)] for query in queries])
+        result[dtype] = {
+            "recall_at_k": recall(expected, found),
+            "bytes_per_vector": round(matrix.nbytes / len(units), 1),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara backends de embeddings e formatos de armazenamento de vetores")
+    parser.add_argument("--backends", default="torch,onnx,onnx-fp32", help="O primeiro é a referência de recall")
+    parser.add_argument("--corpus", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_embeddings.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    documents, queries = corpus(args.corpus, args.queries, args.seed)
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, documents, queries, args.vectors)))
+        return
+
+    results = {"corpus": len(documents), "queries": len(queries), "k": args.k, "backends": {}}
+    vectors = {}
+    with tempfile.TemporaryDirectory(prefix="pixaflow-embeddings-") as workdir:
+        for name in [b for b in args.backends.split(",") if b]:
+            print(f"⏱️  Medindo backend {name}...", file=sys.stderr)
+            path = os.path.join(workdir, f"{name}.npz")
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.embeddings", "--worker", name, "--vectors", path,
+                 "--corpus", str(args.corpus), "--queries", str(args.queries), "--seed", str(args.seed)],
+                cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True
+            )
+            if completed.returncode != 0:
+                print(f"⚠️  Backend {name} indisponível, pulando", file=sys.stderr)
+                continue
+            results["backends"][name] = json.loads(completed.stdout.strip().splitlines()[-1])
+            with np.load(path) as data:
+                vectors[name] = (data["documents"], data["queries"])
+
+    if vectors:
+        reference = next(iter(vectors))
+        expected = _top_k(*vectors[reference], args.k)
+        for name, (doc_vectors, query_vectors) in vectors.items():
+            results["backends"][name]["recall_at_k"] = recall(expected, _top_k(doc_vectors, query_vectors, args.k))
+        results["reference"] = reference
+        results["storage"] = storage_recall(*vectors[reference], args.k, args.rescore_factor)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"📊 Resultados salvos em {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# (caminho da métrica, direção boa)
+METRICS = [
+    ("sync.full_seconds", "lower"),
+    ("sync.incremental_noop_seconds", "lower"),
+    ("sync.incremental_1pct_seconds", "lower"),
+    ("embedding.texts_per_second", "higher"),
+    ("query.p50_ms", "lower"),
+    ("query.p99_ms", "lower"),
+    ("http.qps", "higher"),
+    ("http.p99_ms", "lower"),
+    ("peak_rss_mb", "lower"),
+]
+
+
+def _lookup(data, path):
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def compare(current, baseline, tolerance):
+    regressions = []
+    for rows, result in current["results"].items():
+        previous = baseline.get("results", {}).get(rows)
+        if previous is None:
+            continue
+        for path, direction in METRICS:
+            new, old = _lookup(result, path), _lookup(previous, path)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if direction == "lower" else change < -tolerance
+            if worse:
+                regressions.append({
+                    "rows": rows,
+                    "metric": path,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 4),
+                })
+    return regressions
+
+
+def run_size(rows, args):
+    with tempfile.TemporaryDirectory(prefix=f"pixaflow-bench-{rows}-") as workdir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            CHROMA_PATH=os.path.join(workdir, "chroma"),
+        )
+        if args.embeddings == "hash":
+            env.setdefault("INGEST_WORKERS", "1")
+
+        command = [
+            sys.executable, "-m", "benchmarks.scenario",
+            "--rows", str(rows),
+            "--sales-ratio", str(args.sales_ratio),
+            "--queries", str(args.queries),
+            "--http-requests", str(args.http_requests),
+            "--concurrency", str(args.concurrency),
+            "--embeddings", args.embeddings,
+            "--seed", str(args.seed),
+        ]
+        print(f"⏱️  Executando cenário com {rows} linhas...", file=sys.stderr)
+        completed = subprocess.run(
+            command, cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, text=True, check=True
+        )
+        # O serviço também escreve no stdout; o resultado é a última linha.
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de sync, embeddings e consultas do Pixaflow")
+    parser.add_argument("--sizes", default="1000,10000", help="Tamanhos do estoque, separados por vírgula")
+    parser.add_argument("--sales-ratio", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--http-requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Resultado anterior para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embeddings": args.embeddings,
+            "seed": args.seed,
+        },
+        "results": {str(rows): run_size(rows, args) for rows in sizes},
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["regressions"] = compare(results, baseline, args.tolerance)
+        for item in results["regressions"]:
+            print(
+                f"❌ Regressão em {item['metric']} ({item['rows']} linhas): "
+                f"{item['baseline']} → {item['current']} ({item['change']:+.1%})",
+                file=sys.stderr
+            )
+        if results["regressions"]:
+            exit_code = 1
+        else:
+            print("✅ Nenhuma regressão em relação ao baseline", file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"📊 Resultados salvos em {args.output}", file=sys.stderr)
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import resource
+import socket
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": pick(50),
+        "p90_ms": pick(90),
+        "p99_ms": pick(99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - started, 3)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _http_load(url, questions, concurrency):
+    import httpx
+
+    latencies = []
+    statuses = {}
+    cursor = iter(questions)
+    lock = asyncio.Lock()
+
+    async def client_loop(client):
+        while True:
+            async with lock:
+                question = next(cursor, None)
+            if question is None:
+                return
+            started = time.perf_counter()
+            response = await client.post(url, json={"question": question})
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return dict(
+        percentiles(latencies),
+        qps=round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        concurrency=concurrency,
+        statuses={str(k): v for k, v in sorted(statuses.items())},
+    )
+
+
+def run_http(questions, concurrency):
+    import uvicorn
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        return asyncio.run(_http_load(f"http://127.0.0.1:{port}/api/v1/query", questions, concurrency))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def run_scenario(args):
+    from sqlalchemy import text
+    from app.database import Base, SessionLocal, engine
+    from app.rag_service import rag_service
+    from app.readiness import readiness
+    from benchmarks.datasets import HashEmbeddings, populate, questions
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    _, load_seconds = _timed(populate, db, args.rows, int(args.rows * args.sales_ratio), args.seed)
+    db.close()
+
+    if args.embeddings == "hash":
+        rag_service.embeddings_factory = HashEmbeddings
+
+    _, start_seconds = _timed(rag_service.start)
+    stages = readiness.snapshot()
+    noop_report, noop_seconds = _timed(rag_service.sync_database)
+
+    db = SessionLocal()
+    touched = max(1, args.rows // 100)
+    db.execute(
+        text(
+            "UPDATE estoque SET preco = preco * 1.01, ultima_atualizacao = :now "
+            "WHERE id <= :touched"
+        ),
+        {"now": datetime.utcnow() + timedelta(seconds=1), "touched": touched}
+    )
+    db.commit()
+    db.close()
+    delta_report, delta_seconds = _timed(rag_service.sync_database)
+
+    # Vazão medida direto no backend, sem passar pelo cache de embeddings.
+    base = getattr(rag_service.embeddings, "base", rag_service.embeddings)
+    sample = [f"Produto sintético {i} para medir vazão de embeddings" for i in range(args.embedding_sample)]
+    _, embed_seconds = _timed(base.embed_documents, sample)
+
+    query_latencies = []
+    for question in questions(args.queries, args.rows, args.seed):
+        started = time.perf_counter()
+        rag_service.query(question)
+        query_latencies.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        "rows": args.rows,
+        "sales": int(args.rows * args.sales_ratio),
+        "load_seconds": load_seconds,
+        "startup": {
+            "seconds": start_seconds,
+            "stages": {name: state["seconds"] for name, state in stages.items()},
+        },
+        "sync": {
+            "full_seconds": stages["sync"]["seconds"],
+            "incremental_noop_seconds": noop_seconds,
+            "incremental_1pct_seconds": delta_seconds,
+            "incremental_noop": noop_report["report"],
+            "incremental_1pct": delta_report["report"],
+            "collection_size": rag_service.collection.count(),
+            "sales_index_size": rag_service.sales_partitions.count(),
+        },
+        "embedding": {
+            "texts": len(sample),
+            "seconds": embed_seconds,
+            "texts_per_second": round(len(sample) / embed_seconds, 1) if embed_seconds else 0.0,
+        },
+        "query": dict(
+            percentiles(query_latencies),
+            answer_cache=rag_service.answer_cache_stats(),
+            embedding_cache=rag_service.embedding_cache_stats(),
+        ),
+    }
+
+    if args.http_requests:
+        result["http"] = run_http(
+            questions(args.http_requests, args.rows, args.seed + 1),
+            args.concurrency
+        )
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    rag_service.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--sales-ratio", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--http-requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embedding-sample", type=int, default=1024)
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(json.dumps(run_scenario(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Config do gunicorn usada no benchmark: a mesma do projeto, com a opção
+# de trocar o modelo por embeddings determinísticos antes do preload.
+GUNICORN_CONF = """
+import sys
+sys.path.insert(0, {backend!r})
+from gunicorn_conf import *
+from gunicorn_conf import when_ready as _when_ready
+
+bind = {bind!r}
+loglevel = "warning"
+
+
+def when_ready(server):
+    if {hash_embeddings!r}:
+        from app.rag_service import rag_service
+        from benchmarks.datasets import HashEmbeddings
+        rag_service.embeddings_factory = HashEmbeddings
+    _when_ready(server)
+"""
+
+
+def _memory(pid):
+    # KB de /proc/<pid>/smaps_rollup: Pss divide as páginas compartilhadas
+    # entre os processos; Private é o que só aquele processo usa (USS).
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    private = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return {
+        "rss_mb": round(values.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(values.get("Pss", 0) / 1024, 1),
+        "private_mb": round(private / 1024, 1),
+    }
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def _wait_ready(url, workers, timeout):
+    import httpx
+
+    # /ready cai em um worker qualquer: exige várias respostas seguidas com
+    # todas as etapas, inclusive o sync, concluídas.
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            stages = httpx.get(url, timeout=5).json()["stages"]
+            done = all(stage["status"] == "done" for stage in stages.values())
+            streak = streak + 1 if done else 0
+        except (httpx.HTTPError, ValueError, KeyError):
+            streak = 0
+        if streak >= workers * 4:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run_workers(count, args, workdir):
+    from benchmarks.scenario import _free_port, _http_load
+    from benchmarks.datasets import questions
+
+    port = _free_port()
+    conf = os.path.join(workdir, f"gunicorn_{count}.py")
+    with open(conf, "w", encoding="utf-8") as f:
+        f.write(GUNICORN_CONF.format(
+            backend=BACKEND_DIR, bind=f"127.0.0.1:{port}", hash_embeddings=args.embeddings == "hash"
+        ))
+    chroma = os.path.join(workdir, f"chroma_{count}")
+    env = dict(os.environ, WEB_CONCURRENCY=str(count), CHROMA_PATH=chroma)
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", conf, "app.main:app"], cwd=BACKEND_DIR, env=env
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        if not _wait_ready(f"{base}/ready", count, args.timeout):
+            raise RuntimeError(f"{count} worker(s) não ficaram prontos em {args.timeout}s")
+        ready_seconds = round(time.perf_counter() - started, 3)
+
+        http = asyncio.run(_http_load(
+            f"{base}/api/v1/query", questions(args.requests, args.rows, args.seed), args.concurrency
+        ))
+        master = _memory(server.pid)
+        workers = [_memory(pid) for pid in _children(server.pid)]
+        with open(os.path.join(chroma, "sync.generation"), encoding="utf-8") as f:
+            generation = json.load(f)["generation"]
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    return {
+        "workers": count,
+        "ready_seconds": ready_seconds,
+        "master": master,
+        "worker_private_mb": round(sum(w["private_mb"] for w in workers) / len(workers), 1),
+        "worker_rss_mb": round(sum(w["rss_mb"] for w in workers) / len(workers), 1),
+        "total_pss_mb": round(sum(w["pss_mb"] for w in workers), 1),
+        # Escritas publicadas no índice durante a subida: 1 = um único sync.
+        "index_writes": generation,
+        "http": http,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória e vazão com N workers do gunicorn (preload do modelo)")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--sales-ratio", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_workers.json")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pixaflow-workers-") as workdir:
+        # O mesmo banco SQLite para todas as rodadas; cada uma tem o seu índice.
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ.setdefault("INGEST_WORKERS", "1")
+        from app.database import Base, SessionLocal, engine
+        from benchmarks.datasets import populate
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        populate(db, args.rows, int(args.rows * args.sales_ratio), args.seed)
+        db.close()
+        engine.dispose()
+
+        for count in [int(n) for n in args.workers.split(",") if n]:
+            print(f"⏱️  Medindo {count} worker(s)...", file=sys.stderr)
+            results.append(run_workers(count, args, workdir))
+
+    output = {"rows": args.rows, "embeddings": args.embeddings, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(json.dumps(output, indent=2, ensure_ascii=False))
+    print(f"📊 Resultados salvos em {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
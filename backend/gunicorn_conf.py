@@ -0,0 +1,31 @@
+# Vários workers com memória do modelo compartilhada:
+#   gunicorn -c gunicorn_conf.py app.main:app
+# O app é importado e o modelo carregado no master, antes do fork; cada
+# worker herda as páginas dos pesos (copy-on-write) em vez de carregar a sua
+# cópia. O sync de subida roda em um único worker (lock em CHROMA_PATH).
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def when_ready(server):
+    from app.database import pool_size
+    from app.config import settings
+    from app.rag_service import rag_service
+
+    # Cada worker tem o seu pool: o MySQL precisa aceitar todos juntos.
+    server.log.info(
+        f"Conexões ao banco: até {workers * (pool_size() + settings.DB_MAX_OVERFLOW)} "
+        f"({workers} workers x pool {pool_size()} + overflow {settings.DB_MAX_OVERFLOW})"
+    )
+    rag_service.preload()
+    # Objetos do master fora da coleta de lixo: o GC dos workers não toca
+    # nessas páginas e elas continuam compartilhadas.
+    gc.freeze()
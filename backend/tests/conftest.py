@@ -0,0 +1,108 @@
+import sys
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import settings
+from app.database import Base
+
+
+class FakeEmbeddings:
+    # Sem modelo. ``calls`` guarda cada lote de embed_documents (um forward
+    # pass) e ``queries`` as perguntas de embed_query.
+    def __init__(self):
+        self.calls = []
+        self.queries = []
+
+    @property
+    def texts(self):
+        return sum(len(batch) for batch in self.calls)
+
+    def vector(self, text):
+        raise NotImplementedError
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self.vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return self.vector(text)
+
+
+class KeywordEmbeddings(FakeEmbeddings):
+    # Um eixo por palavra-chave, mais um fixo. Sem palavras-chave todo texto
+    # vira o mesmo vetor e a precisão tem que vir do BM25.
+    def __init__(self, *keywords):
+        super().__init__()
+        self.keywords = keywords
+
+    def vector(self, text):
+        text = text.lower()
+        return [float(keyword in text) for keyword in self.keywords] + [0.1]
+
+
+class LengthEmbeddings(FakeEmbeddings):
+    def vector(self, text):
+        return [float(len(text)), 1.0]
+
+
+# O serviço de teste não sobe threads nem caches além do necessário.
+SERVICE_SETTINGS = {
+    "INGEST_WORKERS": 1,
+    "EMBEDDING_CACHE_ENABLED": False,
+    "QUERY_BATCHING_ENABLED": False,
+    "ANSWER_CACHE_ENABLED": False,
+}
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch, session_factory):
+    # RAGService aberto como na subida (modelo, ChromaDB em ``volume``,
+    # índice de produtos), com o banco SQLite de ``session_factory``.
+    # ``rows`` entram no banco antes; ``overrides`` trocam settings.
+    from app import rag_service
+    from app.scheduler import WorkloadScheduler
+
+    # Agendador próprio: o shutdown do app (testes de rota) encerra o global.
+    scheduler = WorkloadScheduler(workers=1, nice=0)
+    monkeypatch.setattr(rag_service, "workload", scheduler)
+    services = []
+
+    def make(embeddings, rows=(), volume="chroma", **overrides):
+        values = dict(SERVICE_SETTINGS, CHROMA_PATH=str(tmp_path / volume), SNAPSHOT_DIR=str(tmp_path / "snapshots"))
+        values.update(overrides)
+        for name, value in values.items():
+            monkeypatch.setattr(settings, name, value)
+
+        if rows:
+            db = session_factory()
+            db.add_all(rows)
+            db.commit()
+            db.close()
+
+        service = rag_service.RAGService(embeddings_factory=lambda: embeddings, session_factory=session_factory)
+        service._load_model()
+        service._open_vectorstore()
+        # O aquecimento do modelo não conta nos testes.
+        embeddings.calls.clear()
+        embeddings.queries.clear()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.shutdown()
+    scheduler.shutdown()
@@ -0,0 +1,110 @@
+import sys
+import os
+import uuid
+from datetime import datetime
+import chromadb
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ann_index import REBUILD_SUFFIX, copy_collection, hnsw_metadata, index_params, needs_rebuild, open_collection, swap_collection
+from app.config import settings
+from app.models import Estoque, Vendas
+from app.sales_index import SalesPartitions
+from tests.conftest import LengthEmbeddings
+
+COSINE = hnsw_metadata("cosine", 8, 50, 40)
+
+
+def unique(prefix="test_"):
+    return f"{prefix}{uuid.uuid4().hex[:12]}"
+
+
+def test_defaults_match_existing_collections():
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(unique())
+
+    assert not needs_rebuild(collection, hnsw_metadata("l2", 16, 100, 10))
+    assert needs_rebuild(collection, COSINE)
+    with pytest.raises(ValueError):
+        hnsw_metadata("manhattan", 16, 100, 10)
+
+
+def test_copy_and_swap_keep_rows_and_apply_params():
+    client = chromadb.EphemeralClient()
+    name = unique()
+    collection = client.create_collection(name, metadata={"owner": "sync"})
+    collection.add(
+        ids=["a", "b"], documents=["Alface", "Tomate"],
+        metadatas=[{"source": "estoque"}, None], embeddings=[[1.0, 0.0], [0.0, 1.0]]
+    )
+
+    fresh = copy_collection(client, collection, COSINE)
+    swap_collection(client, fresh, name)
+
+    rebuilt = client.get_collection(name)
+    assert index_params(rebuilt) == COSINE
+    assert rebuilt.metadata["owner"] == "sync"
+    rows = rebuilt.get(include=["documents", "metadatas", "embeddings"])
+    assert dict(zip(rows["ids"], rows["metadatas"])) == {"a": {"source": "estoque"}, "b": None}
+    assert rebuilt.query(query_embeddings=[[0.1, 1.0]], n_results=1)["ids"] == [["b"]]
+    assert name + REBUILD_SUFFIX not in [c.name for c in client.list_collections()]
+
+
+def test_open_collection_finishes_interrupted_swap():
+    client = chromadb.EphemeralClient()
+    name = unique()
+    copy = client.create_collection(name + REBUILD_SUFFIX, metadata=COSINE)
+    copy.add(ids=["a"], embeddings=[[1.0, 0.0]])
+
+    collection = open_collection(client, name, hnsw_metadata("l2", 16, 100, 10))
+
+    assert collection.name == name
+    assert collection.count() == 1
+    assert index_params(collection) == COSINE
+
+
+def test_sales_partitions_rebuild_outdated_months():
+    client = chromadb.EphemeralClient()
+    prefix = unique("vendas_") + "_"
+    old = SalesPartitions(client, prefix)
+    old.upsert(["v1", "v2"], ["a", "b"], [{"mes": "2024-05"}, {"mes": "2024-06"}], [[1.0, 0.0], [0.0, 1.0]])
+    # Sobra de uma cópia interrompida com a original ainda presente.
+    client.create_collection(f"{prefix}2024_05{REBUILD_SUFFIX}")
+
+    sales = SalesPartitions(client, prefix, metadata=COSINE)
+    assert sales.months() == ["2024-05", "2024-06"]
+    assert sales.outdated() == ["2024-05", "2024-06"]
+
+    sales.rebuild(sales.outdated())
+
+    assert sales.outdated() == []
+    assert sales.count() == 2
+    assert [doc_id for doc_id, _ in sales.search([1.0, 0.0], 1, sales.months())] == ["v1"]
+
+
+def test_changed_settings_rebuild_without_reembedding(make_service, monkeypatch):
+    rows = [Estoque(produto=f"Produto {i}", quantidade=i, unidade="kg", preco=1.0 + i, categoria="Teste") for i in range(10)]
+    rows.append(Vendas(produto="Produto 1", quantidade=1, valor_total=2.0, cliente="Ana", data_venda=datetime(2024, 5, 3)))
+
+    first = make_service(LengthEmbeddings(), rows=rows)
+    first._sync_database_to_rag()
+    assert first._outdated_index() == []
+    first.shutdown()
+
+    monkeypatch.setattr(settings, "HNSW_SPACE", "cosine")
+    monkeypatch.setattr(settings, "HNSW_SEARCH_EF", 50)
+    embeddings = LengthEmbeddings()
+    service = make_service(embeddings)
+    assert service._outdated_index() == ["documents", "vendas:2024-05"]
+
+    report = service._rebuild_outdated_index()
+
+    assert report["rebuilt"] == ["documents", "vendas:2024-05"]
+    assert embeddings.texts == 0
+    assert service.index_info()["documents"] == service.hnsw_metadata
+    assert service.collection.count() == 10
+    assert len(service._retrieve("Produto 3", k=3)) == 3
+    assert service._sync_database_to_rag()["mode"] == "incremental"
+    assert embeddings.texts == 0
+    service.shutdown()
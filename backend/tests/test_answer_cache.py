@@ -0,0 +1,113 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.answer_cache import AnswerCache, cache_entities
+from app.models import Estoque
+from tests.conftest import LengthEmbeddings
+
+PRICE = {"quantity": False, "price": True, "sales": False, "list": False}
+LIST = {"quantity": False, "price": False, "sales": False, "list": True}
+QUANTITY = {"quantity": True, "price": False, "sales": False, "list": False}
+RESULT = {
+    "answer": "Alface custa R$ 2.50",
+    "sources": ["Preço do Alface: R$ 2.50"],
+    "metadata": [{"source": "estoque", "produto": "Alface", "id": 1}]
+}
+
+
+def test_exact_hit_does_not_embed():
+    cache = AnswerCache()
+    cache.put("qual o preco da alface", PRICE, RESULT, [1.0, 0.0])
+
+    def fail():
+        raise AssertionError("não deveria calcular embedding")
+
+    result, _ = cache.get("qual o preco da alface", PRICE, embed=fail)
+    assert result is RESULT
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_requires_similarity_and_same_intent():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("qual o preco da alface", PRICE, RESULT, [1.0, 0.0])
+
+    assert cache.get("preco alface", PRICE, embed=lambda: [0.99, 0.05])[0] is RESULT
+    assert cache.get("quantas alface", QUANTITY, embed=lambda: [0.99, 0.05])[0] is None
+    assert cache.get("horario de funcionamento", PRICE, embed=lambda: [0.0, 1.0])[0] is None
+
+
+def test_semantic_hit_requires_same_products():
+    cache = AnswerCache(similarity_threshold=0.9)
+    alface = cache_entities(["Alface"])
+    cache.put("qual o preco da alface", PRICE, RESULT, [1.0, 0.0], alface)
+
+    # Embeddings de "alface" e "tomate" numa frase quase igual ficam muito próximos.
+    assert cache.get("qual o preco do tomate", PRICE, embed=lambda: [0.99, 0.05], entities=cache_entities(["Tomate"]))[0] is None
+    assert cache.get("preco alface", PRICE, embed=lambda: [0.99, 0.05], entities=alface)[0] is RESULT
+
+
+def test_changed_rows_invalidate_answers():
+    cache = AnswerCache()
+    cache.put("qual o preco da alface", PRICE, RESULT, [1.0, 0.0])
+
+    cache.invalidate_rows([("vendas", 1)])
+    assert cache.get("qual o preco da alface", PRICE)[0] is RESULT
+
+    cache.invalidate_rows([("estoque", 1)])
+    assert cache.get("qual o preco da alface", PRICE)[0] is None
+
+
+def test_ttl_and_size_bound():
+    expired = AnswerCache(ttl_seconds=0)
+    expired.put("a", PRICE, RESULT)
+    assert expired.get("a", PRICE)[0] is None
+
+    small = AnswerCache(max_items=2)
+    for key in ("a", "b", "c"):
+        small.put(key, PRICE, RESULT, [1.0, 0.0])
+    assert small.get("a", PRICE)[0] is None
+    assert small.stats()["size"] == 2
+    assert small.stats()["evictions"] == 1
+
+
+def test_sales_answers_invalidate_by_intent():
+    cache = AnswerCache()
+    sales = dict(PRICE, sales=True)
+    cache.put("total de vendas", sales, RESULT)
+    cache.put("qual o preco da alface", PRICE, RESULT)
+
+    cache.invalidate_intent("sales")
+    assert cache.get("total de vendas", sales)[0] is None
+    assert cache.get("qual o preco da alface", PRICE)[0] is RESULT
+
+
+def test_new_product_invalidates_answers_without_a_product():
+    cache = AnswerCache()
+    cache.put("quais produtos tem", LIST, RESULT)
+    cache.put("qual o preco da alface", PRICE, RESULT, entities=cache_entities(["Alface"]))
+
+    cache.invalidate_unscoped()
+    assert cache.get("quais produtos tem", LIST)[0] is None
+    assert cache.get("qual o preco da alface", PRICE)[0] is RESULT
+
+
+def test_sync_with_inserted_product_refreshes_list_answer(make_service, session_factory):
+    service = make_service(LengthEmbeddings(), rows=[
+        Estoque(produto="Alface", quantidade=50, unidade="unidade", preco=2.50, categoria="Verdura")
+    ], ANSWER_CACHE_ENABLED=True)
+    service._sync_database_to_rag()
+    question = "Quais produtos tem no estoque?"
+    service._query(question, k=5)
+    assert service._query(question, k=5)[1] == "answer_cache"
+
+    db = session_factory()
+    db.add(Estoque(produto="Tomate", quantidade=30, unidade="kg", preco=4.00, categoria="Legume"))
+    db.commit()
+    db.close()
+    assert service._sync_database_to_rag()["estoque_inserted"] == 1
+
+    result, route = service._query(question, k=5)
+    assert route == "retrieval"
+    assert "Tomate" in result["answer"]
@@ -0,0 +1,46 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from benchmarks.ann import exact_top_k, pareto, recommend, recall
+from benchmarks.run import compare
+from benchmarks.scenario import percentiles
+
+
+def test_percentiles():
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert stats["count"] == 100
+    assert stats["p50_ms"] == 51.0
+    assert stats["p99_ms"] == 100.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"results": {"1000": {"query": {"p99_ms": 10.0}, "http": {"qps": 100.0}}}}
+    current = {"results": {"1000": {"query": {"p99_ms": 11.0}, "http": {"qps": 70.0}}}}
+
+    regressions = compare(current, baseline, tolerance=0.15)
+
+    assert [r["metric"] for r in regressions] == ["http.qps"]
+
+
+def test_exact_top_k_per_space():
+    documents = np.array([[1.0, 0.0], [10.0, 3.0], [0.0, 1.0]], dtype=np.float32)
+    queries = np.array([[1.0, 0.1]], dtype=np.float32)
+
+    assert exact_top_k(documents, queries, 2, "l2").tolist() == [[0, 2]]
+    assert exact_top_k(documents, queries, 2, "cosine").tolist() == [[0, 1]]
+    assert exact_top_k(documents, queries, 2, "ip").tolist() == [[1, 0]]
+    assert recall([[0, 1]], [[1, 2]]) == 0.5
+
+
+def test_recommend_fastest_config_meeting_recall():
+    def result(search_ef, recall_at_k, p99_ms):
+        return {"search_ef": search_ef, "recall_at_k": recall_at_k, "query": {"p99_ms": p99_ms}, "index_mb": 1.0}
+
+    results = [result(10, 0.8, 1.0), result(50, 0.97, 2.0), result(100, 0.99, 3.0), result(200, 0.99, 4.0)]
+
+    assert [r["search_ef"] for r in pareto(results)] == [10, 50, 100]
+    assert recommend(results, 0.95)["search_ef"] == 50
+    assert recommend(results, 0.999) is None
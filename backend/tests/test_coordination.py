@@ -0,0 +1,82 @@
+import sys
+import os
+import multiprocessing
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import settings
+from app.coordination import SyncCoordinator, WriterBusy
+from tests.conftest import SERVICE_SETTINGS, LengthEmbeddings
+
+
+def _hold_lock(path, locked, release):
+    with SyncCoordinator(path).writer():
+        locked.set()
+        release.wait(10)
+
+
+def _write_documents(path, texts):
+    # Outro worker: processo próprio, com o seu PersistentClient.
+    for name, value in dict(SERVICE_SETTINGS, CHROMA_PATH=path).items():
+        setattr(settings, name, value)
+    from app.rag_service import RAGService
+
+    service = RAGService(embeddings_factory=LengthEmbeddings)
+    service._load_model()
+    service._open_vectorstore()
+    service.add_documents(texts)
+    service.shutdown()
+
+
+def test_writer_lock_excludes_other_processes(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    locked, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_lock, args=(str(tmp_path), locked, release))
+    holder.start()
+    try:
+        assert locked.wait(30)
+        with pytest.raises(WriterBusy):
+            with SyncCoordinator(str(tmp_path)).writer(timeout=0.1):
+                pass
+    finally:
+        release.set()
+        holder.join(30)
+
+    with SyncCoordinator(str(tmp_path)).writer(timeout=1):
+        pass
+
+
+def test_generation_tracks_writes_and_boot_sync(tmp_path):
+    first = SyncCoordinator(str(tmp_path), boot="a")
+    assert first.generation() == 0
+    assert not first.synced_this_boot()
+
+    assert first.publish() == 1
+    assert not first.synced_this_boot()
+    assert first.publish(synced=True) == 2
+    assert first.synced_this_boot()
+
+    # Uma ingestão depois do sync não apaga a marca da subida.
+    assert SyncCoordinator(str(tmp_path), boot="a").publish() == 3
+    assert first.synced_this_boot()
+    assert not SyncCoordinator(str(tmp_path), boot="b").synced_this_boot()
+
+
+def test_reader_reopens_index_written_by_another_process(make_service):
+    reader = make_service(LengthEmbeddings(), INDEX_RELOAD_CHECK_SECONDS=0)
+    assert reader.document_count() == 0
+    assert reader._retrieve("Alface crespa", k=1) == []
+
+    writer = multiprocessing.get_context("spawn").Process(
+        target=_write_documents, args=(settings.CHROMA_PATH, ["Alface crespa", "Tomate italiano"])
+    )
+    writer.start()
+    writer.join(60)
+    assert writer.exitcode == 0
+
+    assert reader.coordinator.generation() == 1
+    assert reader.document_count() == 2
+    docs = reader._retrieve("Alface crespa", k=1)
+    assert docs[0].page_content == "Alface crespa"
+    reader.shutdown()
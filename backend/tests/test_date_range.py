@@ -0,0 +1,43 @@
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.date_range import format_date_range, parse_date_range
+
+NOW = datetime(2024, 3, 13, 15, 30)
+
+
+def parse(question):
+    return parse_date_range(question, now=NOW)
+
+
+def test_explicit_dates():
+    assert parse("vendas entre 01/02/2024 e 10/02/2024") == (datetime(2024, 2, 1), datetime(2024, 2, 11))
+    assert parse("vendas do dia 05/01/2024") == (datetime(2024, 1, 5), datetime(2024, 1, 6))
+    assert parse("vendas desde 01/03/2024") == (datetime(2024, 3, 1), datetime(2024, 3, 14))
+    assert parse("vendas em 31/02/2024") is None
+
+
+def test_relative_expressions():
+    assert parse("quanto vendeu ontem?") == (datetime(2024, 3, 12), datetime(2024, 3, 13))
+    assert parse("vendas dos últimos 7 dias") == (datetime(2024, 3, 7), datetime(2024, 3, 14))
+    assert parse("vendas da semana passada") == (datetime(2024, 3, 4), datetime(2024, 3, 11))
+    assert parse("vendas do mês passado") == (datetime(2024, 2, 1), datetime(2024, 3, 1))
+    assert parse("vendas deste ano") == (datetime(2024, 1, 1), datetime(2025, 1, 1))
+    assert parse("vendas do ano passado") == (datetime(2023, 1, 1), datetime(2024, 1, 1))
+
+
+def test_months_and_years():
+    # Sem ano, vale a ocorrência mais recente do mês.
+    assert parse("vendas de março") == (datetime(2024, 3, 1), datetime(2024, 4, 1))
+    assert parse("vendas de dezembro") == (datetime(2023, 12, 1), datetime(2024, 1, 1))
+    assert parse("vendas de maio de 2022") == (datetime(2022, 5, 1), datetime(2022, 6, 1))
+    assert parse("vendas em 2023") == (datetime(2023, 1, 1), datetime(2024, 1, 1))
+    assert parse("vendas recentes de alface") is None
+
+
+def test_format_date_range():
+    assert format_date_range((datetime(2024, 1, 5), datetime(2024, 1, 6))) == "05/01/2024"
+    assert format_date_range((datetime(2024, 2, 1), datetime(2024, 3, 1))) == "01/02/2024 a 29/02/2024"
@@ -0,0 +1,151 @@
+import json
+import sys
+import os
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.document_ingest import (
+    IngestJobs,
+    chunk_id,
+    chunk_text,
+    file_documents,
+    stream_chunks,
+)
+from tests.conftest import LengthEmbeddings
+
+
+@pytest.fixture
+def service(make_service):
+    return make_service(LengthEmbeddings(), INGEST_BATCH_SIZE=4)
+
+
+def test_chunks_overlap_and_prefer_word_boundaries():
+    text = " ".join(f"palavra{i}" for i in range(300))
+    chunks = chunk_text(text, size=200, overlap=50)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.split()[0].startswith("palavra") for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.split()[0] in previous
+    assert chunks[-1].endswith("palavra299")
+
+
+def test_streamed_blocks_match_whole_text():
+    text = "Parágrafo sobre hortaliças orgânicas.\n\n" * 200
+    blocks = [text[i:i + 97] for i in range(0, len(text), 97)]
+
+    assert list(stream_chunks(blocks, 500, 100)) == chunk_text(text, 500, 100)
+
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("  Alface fresca  ", size=1000, overlap=200) == ["Alface fresca"]
+    assert chunk_text("   ", size=1000, overlap=200) == []
+
+
+def test_chunk_id_is_content_addressed():
+    assert chunk_id("Alface") == chunk_id("Alface")
+    assert chunk_id("Alface") != chunk_id("Tomate")
+
+
+def test_reupload_is_a_noop(service):
+    documents = [
+        ([" ".join(f"texto{i}" for i in range(400))], {"source": "manual"}),
+        (["Documento curto"], None),
+    ]
+
+    first = service.ingest_documents(iter(documents))
+    assert first["documents"] == 2
+    assert first["written"] == first["chunks"] > 2
+    embedded = service.embeddings.texts
+
+    second = service.ingest_documents(iter(documents))
+    assert second["written"] == 0
+    assert second["duplicates"] == second["chunks"] == first["chunks"]
+    assert service.embeddings.texts == embedded
+    assert service.collection.count() == first["chunks"]
+
+    metadata = service.collection.get(ids=[chunk_id("Documento curto")])["metadatas"][0]
+    assert metadata == {"source": "documento", "chunk": 0}
+
+
+def test_ndjson_file_documents(tmp_path):
+    path = tmp_path / "base.ndjson"
+    path.write_text(
+        json.dumps({"text": "Primeiro", "metadata": {"source": "faq"}}) + "\n\n" + json.dumps("Segundo") + "\n",
+        encoding="utf-8"
+    )
+
+    documents = [(list(pieces), metadata) for pieces, metadata in file_documents(str(path), "ndjson")]
+    assert documents == [(["Primeiro"], {"source": "faq"}), (["Segundo"], None)]
+
+
+def test_job_reports_progress_and_removes_upload(tmp_path, service):
+    path = tmp_path / "manual.txt"
+    path.write_text("".join(f"Passo {i}: cadastrar o produto no estoque. " for i in range(100)), encoding="utf-8")
+    jobs = IngestJobs()
+
+    job = jobs.submit(service.ingest_documents, [(str(path), "text", "manual.txt")])
+    assert job["status"] == "queued"
+
+    deadline = time.monotonic() + 5
+    while jobs.get(job["id"])["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    status = jobs.get(job["id"])
+    assert status["status"] == "done"
+    assert status["documents"] == 1
+    assert status["written"] == status["chunks"] > 1
+    assert not path.exists()
+    jobs.shutdown()
+
+
+def test_failed_job_keeps_error(tmp_path, service):
+    path = tmp_path / "ruim.ndjson"
+    path.write_text("{nao e json}\n", encoding="utf-8")
+    jobs = IngestJobs()
+
+    job = jobs.submit(service.ingest_documents, [(str(path), "ndjson", "ruim.ndjson")])
+    deadline = time.monotonic() + 5
+    while jobs.get(job["id"])["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    status = jobs.get(job["id"])
+    assert status["status"] == "failed"
+    assert "Linha 1" in status["error"]
+    jobs.shutdown()
+
+
+@pytest.mark.parametrize("metadata", [{"tags": ["a", "b"]}, {"origem": {"site": "x"}}, ["faq"]])
+def test_ndjson_rejects_nested_metadata_with_line_number(tmp_path, metadata):
+    path = tmp_path / "base.ndjson"
+    path.write_text(
+        json.dumps({"text": "Primeiro"}) + "\n" + json.dumps({"text": "Segundo", "metadata": metadata}) + "\n",
+        encoding="utf-8"
+    )
+
+    documents = file_documents(str(path), "ndjson")
+    assert next(documents)[1] is None
+    with pytest.raises(ValueError, match="Linha 2"):
+        next(documents)
+
+
+def test_upload_removes_spooled_files_when_submit_fails(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.routes import query_routes
+    from app.main import app
+
+    def fail(files):
+        raise RuntimeError("fila fechada")
+
+    monkeypatch.setattr(query_routes.settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(query_routes.rag_service, "submit_ingest_job", fail)
+    monkeypatch.setitem(app.dependency_overrides, query_routes.require_rag, lambda: None)
+
+    client = TestClient(app, raise_server_exceptions=False)
+    response = client.post("/api/v1/documents/upload", files={"file": ("manual.txt", b"Passo 1", "text/plain")})
+
+    assert response.status_code == 500
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,72 @@
+import sys
+import os
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_cache_avoids_recomputing_vectors(tmp_path):
+    base = CountingEmbeddings()
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), "test-model")
+    embeddings = CachedEmbeddings(base, cache)
+
+    first = embeddings.embed_documents(["alface", "tomate", "alface"])
+    second = embeddings.embed_documents(["tomate", "alface"])
+    embeddings.embed_query("alface")
+
+    assert base.calls == [["alface", "tomate"]]
+    assert first[0] == second[1]
+    stats = cache.stats()
+    assert stats["documents"]["misses"] == 3
+    assert stats["documents"]["memory_hits"] == 2
+    assert stats["query"]["memory_hits"] == 1
+
+
+def test_disk_tier_survives_restart_and_memory_is_bounded(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, "test-model", max_memory_items=1)
+    CachedEmbeddings(CountingEmbeddings(), cache).embed_documents(["alface", "tomate"])
+    assert cache.stats()["memory_items"] == 1
+    cache.close()
+
+    base = CountingEmbeddings()
+    reopened = EmbeddingCache(path, "test-model")
+    CachedEmbeddings(base, reopened).embed_documents(["alface", "tomate"])
+
+    assert base.calls == []
+    assert reopened.stats()["documents"]["disk_hits"] == 2
+
+
+def test_cache_key_depends_on_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    assert EmbeddingCache(path, "model-a").key("alface") != EmbeddingCache(path, "model-b").key("alface")
+
+
+def test_quantized_storage_is_namespaced_and_close(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbeddings(CountingEmbeddings(), EmbeddingCache(path, "test-model")).embed_documents(["alface"])
+
+    # Mudar o tipo de armazenamento não reaproveita blobs de outro formato.
+    base = CountingEmbeddings()
+    cache = EmbeddingCache(path, "test-model", storage_dtype="int8")
+    CachedEmbeddings(base, cache).embed_documents(["alface"])
+    assert base.calls == [["alface"]]
+
+    cache._memory.clear()
+    vector = CachedEmbeddings(base, cache).embed_documents(["alface"])[0]
+    assert len(base.calls) == 1
+    assert max(abs(a - b) for a, b in zip(vector, [6.0, 1.0, 0.5])) < 6.0 / 127
@@ -0,0 +1,107 @@
+import sys
+import os
+import numpy as np
+import pytest
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.embeddings import OnnxBackend, create_embeddings, embedding_model_key, mean_pool
+from app.quantization import QuantizedMatrix, decode, encode
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "alface": 2, "crespa": 3, "tomate": 4, "italiano": 5, "maduro": 6}
+
+
+class FakeInput:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeSession:
+    # Faz o papel do BERT exportado: um vetor fixo por token, e lixo nas
+    # posições de padding para provar que a média usa a máscara.
+    def __init__(self, dim=8):
+        self.table = np.random.default_rng(0).normal(size=(len(VOCAB), dim)).astype(np.float32)
+        self.batches = []
+
+    def get_inputs(self):
+        return [FakeInput("input_ids"), FakeInput("attention_mask"), FakeInput("token_type_ids")]
+
+    def run(self, outputs, feeds):
+        self.batches.append(feeds["input_ids"].shape)
+        hidden = self.table[feeds["input_ids"]]
+        hidden[feeds["attention_mask"] == 0] = 100.0
+        return [hidden]
+
+
+def make_backend(batch_size=32):
+    tokenizer = Tokenizer(models.WordLevel(vocab=VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    session = FakeSession()
+    return OnnxBackend(session, tokenizer, max_length=4, batch_size=batch_size), session
+
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 1.0], [3.0, 3.0], [50.0, 50.0]]])
+    mask = np.array([[1, 1, 0]])
+    assert mean_pool(hidden, mask).tolist() == [[2.0, 2.0]]
+
+
+def test_onnx_backend_matches_unbatched_vectors():
+    backend, session = make_backend(batch_size=2)
+    texts = ["tomate italiano maduro", "alface", "alface crespa"]
+
+    vectors = backend.encode(texts)
+    alone = [backend.encode([text])[0] for text in texts]
+
+    assert vectors.shape == (3, 8)
+    assert np.allclose(vectors, np.array(alone), atol=1e-6)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    # Lotes por tamanho: os dois textos curtos juntos, o longo sozinho.
+    assert session.batches[:2] == [(2, 2), (1, 3)]
+
+
+def test_onnx_backend_truncates_long_texts():
+    backend, _ = make_backend()
+    long_text = "alface crespa tomate italiano maduro alface"
+    assert np.allclose(backend.encode([long_text])[0], backend.encode(["alface crespa tomate italiano"])[0])
+    assert backend.embed_documents([]) == []
+    assert len(backend.embed_query("alface")) == 8
+
+
+def test_backend_selection():
+    with pytest.raises(ValueError):
+        create_embeddings("tensorflow", "modelo")
+    with pytest.raises(FileNotFoundError):
+        create_embeddings("onnx", "modelo", onnx_path="/caminho/inexistente")
+    assert embedding_model_key("torch", "modelo") == "modelo"
+    assert embedding_model_key("onnx", "modelo", quantized=True) == "modelo@onnx-int8"
+
+
+@pytest.mark.parametrize("dtype,tolerance", [("float32", 0.0), ("float16", 1e-3), ("int8", 1.0 / 127)])
+def test_vector_codecs_round_trip(dtype, tolerance):
+    vector = np.random.default_rng(1).uniform(-1, 1, 384).astype(np.float32)
+    decoded = decode(encode(vector, dtype), dtype)
+    assert decoded.dtype == np.float32
+    assert np.max(np.abs(decoded - vector)) <= tolerance
+
+
+def test_int8_matrix_rescoring_keeps_exact_ranking():
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(500, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = QuantizedMatrix(500, 64, "float32")
+    quantized = QuantizedMatrix(500, 64, "int8", rescore_factor=4)
+    for slot, vector in enumerate(vectors):
+        exact.set(slot, vector)
+        quantized.set(slot, vector)
+
+    query = vectors[7] + 0.1 * rng.normal(size=64).astype(np.float32)
+    query /= np.linalg.norm(query)
+    expected = [slot for slot, _ in exact.top(query, 10)]
+    assert [slot for slot, _ in quantized.top(query, 10)] == expected
+    assert quantized.top(query, 1)[0][1] == pytest.approx(exact.top(query, 1)[0][1], abs=1e-3)
+    assert quantized.nbytes < exact.nbytes
+
+    quantized.clear(7)
+    assert quantized.top(query, 1)[0][0] != 7
@@ -0,0 +1,35 @@
+import asyncio
+import sys
+import os
+import threading
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.executor import ExecutorSaturated, InferenceExecutor
+
+
+def test_run_returns_result_off_the_event_loop():
+    executor = InferenceExecutor(max_workers=2, max_queue=2)
+    loop_thread = threading.get_ident()
+
+    result = asyncio.run(executor.run(lambda: threading.get_ident()))
+
+    assert result != loop_thread
+    executor.shutdown()
+
+
+def test_submit_rejects_when_queue_is_full():
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = executor.submit(release.wait)
+    queued = executor.submit(release.wait)
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(release.wait)
+    assert executor.stats()["rejected"] == 1
+
+    release.set()
+    executor.shutdown()
+    assert running.done() and queued.done()
+    assert executor.stats()["in_flight"] == 0
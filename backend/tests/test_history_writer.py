@@ -0,0 +1,131 @@
+import sys
+import os
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import Base
+from app.history_writer import HistoryWriter
+from app.models import Query
+
+
+def _session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _count_rows(factory):
+    db = factory()
+    try:
+        return db.query(Query).count()
+    finally:
+        db.close()
+
+
+def test_flushes_full_batches_as_one_insert():
+    engine, factory = _session_factory()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    writer = HistoryWriter(factory, batch_size=5, flush_interval=60.0)
+    for i in range(5):
+        assert writer.record(f"pergunta {i}", f"resposta {i}")
+
+    assert _wait_for(lambda: writer.stats()["written"] == 5)
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+    assert _count_rows(factory) == 5
+    writer.stop()
+
+
+def test_flushes_partial_batch_after_interval():
+    _, factory = _session_factory()
+    writer = HistoryWriter(factory, batch_size=100, flush_interval=0.05)
+    writer.record("pergunta", "resposta")
+
+    assert _wait_for(lambda: writer.stats()["written"] == 1)
+    assert writer.stats()["batches"] == 1
+    writer.stop()
+
+
+def test_buffers_during_outage_and_retries():
+    _, factory = _session_factory()
+    state = {"down": True}
+
+    def flaky_factory():
+        if state["down"]:
+            raise RuntimeError("MySQL server has gone away")
+        return factory()
+
+    writer = HistoryWriter(flaky_factory, batch_size=2, flush_interval=0.02, retry_max_seconds=0.05)
+    writer.record("a", "1")
+    writer.record("b", "2")
+    writer.record("c", "3")
+
+    assert _wait_for(lambda: writer.stats()["failed_flushes"] >= 2)
+    assert writer.stats()["backlog"] == 3
+
+    state["down"] = False
+    assert _wait_for(lambda: writer.stats()["backlog"] == 0)
+    assert _count_rows(factory) == 3
+    writer.stop()
+
+
+def test_drops_when_backlog_is_full():
+    def failing_factory():
+        raise RuntimeError("banco fora do ar")
+
+    writer = HistoryWriter(failing_factory, batch_size=10, flush_interval=60.0, max_backlog=2)
+    assert writer.record("a", "1")
+    assert writer.record("b", "2")
+    assert not writer.record("c", "3")
+
+    stats = writer.stats()
+    assert stats["dropped"] == 1
+    assert stats["backlog"] == 2
+
+
+def test_stop_drains_pending_rows():
+    _, factory = _session_factory()
+    writer = HistoryWriter(factory, batch_size=100, flush_interval=60.0)
+    for i in range(7):
+        writer.record(f"pergunta {i}", "resposta")
+
+    writer.stop()
+
+    assert _count_rows(factory) == 7
+    assert writer.stats() == {"written": 7, "dropped": 0, "batches": 1, "failed_flushes": 0, "backlog": 0}
+    assert not writer.record("depois", "do stop")
+
+
+def test_record_many_is_all_or_nothing():
+    engine, factory = _session_factory()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    writer = HistoryWriter(factory, batch_size=3, flush_interval=60.0, max_backlog=4)
+    assert writer.record_many([("a", "1"), ("b", "2"), ("c", "3")])
+    assert _wait_for(lambda: writer.stats()["written"] == 3)
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+
+    writer.record("d", "4")
+    assert not writer.record_many([("e", "5"), ("f", "6"), ("g", "7"), ("h", "8")])
+    assert writer.stats()["dropped"] == 4
+    writer.stop()
+    assert _count_rows(factory) == 4
@@ -0,0 +1,57 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ingestion import BulkIngestor, batched
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.calls = []
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.calls.append((ids, metadatas, embeddings))
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+
+def test_batched_streams_fixed_size_chunks():
+    chunks = list(batched(iter(range(7)), 3))
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_ingest_embeds_and_writes_in_bounded_batches():
+    collection = RecordingCollection()
+    embeddings = FakeEmbeddings()
+    ingestor = BulkIngestor(collection, embeddings, None, batch_size=4, workers=1, write_batch_size=3)
+
+    documents = ((f"doc_{i}", f"texto {i}", None) for i in range(10))
+    report = ingestor.ingest(documents)
+
+    assert report["documents"] == 10
+    assert report["batches"] == 3
+    assert embeddings.batches == [4, 4, 2]
+    assert max(len(ids) for ids, _, _ in collection.calls) == 3
+    assert all(metadata == {"source": "documento"} for _, metadatas, _ in collection.calls for metadata in metadatas)
+
+
+def test_ingest_pauses_before_each_batch():
+    embeddings = FakeEmbeddings()
+    pauses = []
+    ingestor = BulkIngestor(
+        RecordingCollection(), embeddings, None, batch_size=4, workers=1,
+        pause=lambda: pauses.append(len(embeddings.batches))
+    )
+
+    ingestor.ingest((f"doc_{i}", f"texto {i}", None) for i in range(10))
+
+    # O agendador pode segurar o trabalho antes de cada lote ir ao modelo.
+    assert pauses == [0, 1, 2]
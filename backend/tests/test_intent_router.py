@@ -0,0 +1,84 @@
+import json
+import pytest
+import sys
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import Base
+from app.models import Estoque
+from app.intent_router import IntentRouter, detect_intent, normalize, retrieval_filter
+
+
+@pytest.fixture
+def router():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = Session(bind=engine)
+    db.add_all([
+        Estoque(produto="Alface", quantidade=50, unidade="unidade", preco=2.50, categoria="Verdura"),
+        Estoque(produto="Feijão", quantidade=150, unidade="kg", preco=7.00, categoria="Grão"),
+        Estoque(produto="Feijão Preto", quantidade=80, unidade="kg", preco=8.50, categoria="Grão"),
+        Estoque(produto="Couve", quantidade=30, unidade="maço", preco=None, categoria="Verdura"),
+    ])
+    db.commit()
+    router = IntentRouter()
+    router.refresh(db)
+    db.close()
+    return router
+
+
+def test_normalize_ignores_accents_and_plurals():
+    assert normalize("Feijões") == normalize("feijão")
+    assert normalize("ALFACES") == "alface"
+
+
+def test_price_question_is_answered_without_retrieval(router):
+    result = router.route("Quanto custa as alfaces?")
+
+    assert "R$ 2.50" in result["answer"]
+    assert result["metadata"][0]["produto"] == "Alface"
+
+
+def test_longest_product_name_wins(router):
+    result = router.route("qual o preço do feijao preto")
+
+    assert result["metadata"][0]["produto"] == "Feijão Preto"
+
+
+def test_open_ended_and_sales_questions_fall_through(router):
+    assert router.route("Mostre as vendas recentes de alface") is None
+    assert router.route("Como conservar verduras?") is None
+    assert router.route("Como conservar alface na geladeira?") is None
+
+
+def test_product_without_price_is_answered_as_sem_preco(router):
+    result = router.route("Qual o preço da couve?")
+
+    assert "sem preço" in result["answer"]
+    assert "nan" not in result["answer"]
+    assert result["metadata"][0]["preco"] is None
+    json.dumps(result, allow_nan=False)
+
+
+def test_retrieval_filter_pushes_intent_and_product_down(router):
+    question = "Quais clientes compraram feijão preto?"
+    products = [row.produto for row in router.index.match(question)]
+
+    assert retrieval_filter(detect_intent(question), products) == {
+        "$and": [{"source": "vendas"}, {"produto": "Feijão Preto"}]
+    }
+    assert retrieval_filter(detect_intent("Qual o preço do alface?"), ["Alface"]) == {
+        "$and": [{"source": "estoque"}, {"produto": "Alface"}]
+    }
+    assert retrieval_filter(detect_intent("Fale sobre alface e feijão"), ["Feijão", "Alface"]) == {
+        "produto": {"$in": ["Alface", "Feijão"]}
+    }
+    assert retrieval_filter(detect_intent("Como funciona o sistema?"), []) is None
+
+
+def test_intent_words_alone_do_not_hide_knowledge_base():
+    assert retrieval_filter(detect_intent("Quais são os benefícios do Python?"), []) is None
+    assert retrieval_filter(detect_intent("Qual o valor de um bom atendimento?"), []) is None
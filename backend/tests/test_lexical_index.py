@@ -0,0 +1,125 @@
+import sys
+import os
+import uuid
+import chromadb
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import Estoque
+from app.lexical_index import IndexedCollection, LexicalIndex, matches_where
+from langchain_core.documents import Document
+from tests.conftest import KeywordEmbeddings
+
+DOCS = [
+    ("estoque_1", "Produto: Alface. Temos 50 unidade em estoque.", {"source": "estoque", "produto": "Alface", "id": 1}),
+    ("estoque_2", "Produto: Feijão Preto. Temos 80 kg em estoque.", {"source": "estoque", "produto": "Feijão Preto", "id": 2}),
+    ("estoque_3", "Produto: Tomate. Temos 30 kg em estoque.", {"source": "estoque", "produto": "Tomate", "id": 3}),
+    ("vendas_1", "Venda: 5 unidades de Alface para João Silva.", {"source": "vendas", "produto": "Alface", "id": 1}),
+    ("vendas_2", "Venda: 3 unidades de Tomate para Maria Santos.", {"source": "vendas", "produto": "Tomate", "id": 2}),
+    ("doc_1", "Manual de uso do sistema de consulta.", {"source": "documento"}),
+]
+
+
+def make_index():
+    index = LexicalIndex()
+    index.upsert(*zip(*DOCS))
+    return index
+
+
+def test_bm25_ranks_exact_names_first():
+    index = make_index()
+
+    assert index.search("feijões pretos", k=3)[0][0] == "estoque_2"
+    assert index.search("o que a Maria Santos comprou?", k=3)[0][0] == "vendas_2"
+
+
+def test_search_respects_where_filter():
+    index = make_index()
+
+    hits = index.search("alface", k=5, where={"source": "vendas"})
+    assert [doc_id for doc_id, _ in hits] == ["vendas_1"]
+
+    hits = index.search("alface tomate", k=5, where={"$and": [{"source": "estoque"}, {"produto": {"$in": ["Tomate"]}}]})
+    assert [doc_id for doc_id, _ in hits] == ["estoque_3"]
+
+
+def test_upsert_replaces_and_delete_removes():
+    index = make_index()
+    index.upsert(["estoque_1"], ["Produto: Rúcula."], [{"source": "estoque", "produto": "Rúcula", "id": 1}])
+
+    assert [doc_id for doc_id, _ in index.search("alface", k=5)] == ["vendas_1"]
+    assert index.search("rúcula", k=5)[0][0] == "estoque_1"
+
+    index.delete(["vendas_1"])
+    assert index.search("alface", k=5) == []
+    assert len(index) == len(DOCS) - 1
+
+
+def test_matches_where_operators():
+    metadata = {"source": "vendas", "produto": "Alface"}
+    assert matches_where(metadata, None)
+    assert matches_where(metadata, {"$or": [{"source": "estoque"}, {"produto": {"$eq": "Alface"}}]})
+    assert not matches_where(metadata, {"produto": {"$nin": ["Alface"]}})
+    assert not matches_where(metadata, {"$and": [{"source": "vendas"}, {"produto": "Tomate"}]})
+
+
+def test_indexed_collection_keeps_index_in_sync():
+    raw = chromadb.EphemeralClient().create_collection(f"test_{uuid.uuid4().hex}")
+    index = LexicalIndex()
+    collection = IndexedCollection(raw, index)
+
+    ids, documents, metadatas = zip(*DOCS)
+    collection.upsert(ids=list(ids), documents=list(documents), metadatas=list(metadatas), embeddings=[[1.0, 0.0]] * len(DOCS))
+    assert collection.count() == len(DOCS)
+
+    collection.delete(where={"source": "vendas"})
+    assert collection.count() == len(DOCS) - 2
+    assert index.search("joão silva", k=5) == []
+
+    rebuilt = LexicalIndex()
+    rebuilt.rebuild(raw, page_size=2)
+    assert len(rebuilt) == len(index)
+
+
+@pytest.fixture
+def service(make_service):
+    # Embedding sem informação: toda a precisão tem que vir do BM25.
+    embeddings = KeywordEmbeddings()
+    service = make_service(embeddings, rows=[
+        Estoque(id=1, produto="Alface", quantidade=50, unidade="unidade", preco=2.50, categoria="Verdura"),
+        Estoque(id=2, produto="Feijão Preto", quantidade=80, unidade="kg", preco=8.50, categoria="Grão"),
+        Estoque(id=3, produto="Tomate", quantidade=30, unidade="kg", preco=4.00, categoria="Legume"),
+    ], HYBRID_SEARCH_ENABLED=True)
+    ids, documents, metadatas = zip(*DOCS)
+    service.collection.add(
+        ids=list(ids), documents=list(documents), metadatas=list(metadatas),
+        embeddings=embeddings.embed_documents(documents)
+    )
+    return service
+
+
+def test_hybrid_retrieval_finds_client_by_name(service):
+
+    docs = service._retrieve("vendas para João Silva", k=2)
+    assert {"source": "vendas", "produto": "Alface", "id": 1} in [d.metadata for d in docs]
+
+    docs = service._retrieve("quanto tem de tomate", k=2, where={"$and": [{"source": "estoque"}, {"produto": "Tomate"}]})
+    assert [d.metadata["produto"] for d in docs] == ["Tomate"]
+    # Quantidade e preço vêm do ProductIndex, não do ChromaDB.
+    assert docs[0].metadata["preco"] == 4.00
+
+    # Filtro sem resultados cai para a busca aberta.
+    assert service._retrieve("tomate", k=1, where={"produto": "Inexistente"})
+
+
+def test_hits_collapse_to_distinct_products(service):
+    views = [
+        ("estoque_3", "Produto: Tomate.", {"source": "estoque", "produto": "Tomate", "id": 3}),
+        ("estoque_3_preco", "Preço do Tomate: R$ 4.00", {"source": "estoque", "produto": "Tomate", "id": 3}),
+        ("estoque_1", "Produto: Alface.", {"source": "estoque", "produto": "Alface", "id": 1}),
+    ]
+    hits = [(doc_id, Document(page_content=text, metadata=metadata)) for doc_id, text, metadata in views]
+
+    docs = service._collapse(hits, k=2)
+    assert [d.metadata["produto"] for d in docs] == ["Tomate", "Alface"]
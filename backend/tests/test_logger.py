@@ -0,0 +1,31 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import logger as logger_module
+from app.logger import get_logger
+
+
+def test_forked_child_drains_its_own_log_queue():
+    log = get_logger("test")
+    log.info("antes do fork")
+
+    pid = os.fork()
+    if pid == 0:
+        # Filho: precisa de uma thread de listener viva consumindo a fila.
+        code = 1
+        try:
+            log.info("no filho")
+            deadline = time.monotonic() + 5
+            listener = logger_module._listener
+            while listener.queue.qsize() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            if listener._thread is not None and listener._thread.is_alive() and listener.queue.qsize() == 0:
+                code = 0
+        finally:
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
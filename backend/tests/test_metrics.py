@@ -0,0 +1,69 @@
+import sys
+import os
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.metrics import MetricsRegistry
+
+
+def test_counter_renders_per_label():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_queries_total", "Consultas", labelnames=("route",))
+    counter.inc(route="structured")
+    counter.inc(route="structured")
+    counter.inc(route="retrieval")
+
+    output = registry.render()
+    assert "# TYPE test_queries_total counter" in output
+    assert 'test_queries_total{route="structured"} 2.0' in output
+    assert 'test_queries_total{route="retrieval"} 1.0' in output
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Duração", labelnames=("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="embedding")
+    histogram.observe(0.5, stage="embedding")
+    histogram.observe(5.0, stage="embedding")
+
+    output = registry.render()
+    assert 'test_seconds_bucket{stage="embedding",le="0.1"} 1.0' in output
+    assert 'test_seconds_bucket{stage="embedding",le="1.0"} 2.0' in output
+    assert 'test_seconds_bucket{stage="embedding",le="+Inf"} 3.0' in output
+    assert 'test_seconds_count{stage="embedding"} 3.0' in output
+    assert 'test_seconds_sum{stage="embedding"} 5.55' in output
+
+
+def test_histogram_time_records_even_on_error():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Duração", labelnames=("stage",))
+
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage="vector_search"):
+            raise RuntimeError("falhou")
+
+    assert 'test_seconds_count{stage="vector_search"} 1.0' in registry.render()
+
+
+def test_gauge_collects_at_scrape_time_and_ignores_errors():
+    registry = MetricsRegistry()
+    state = {"size": 3}
+    registry.gauge("test_documents", "Documentos", lambda: state["size"])
+    registry.gauge("test_pool", "Pool", lambda: {("checked_out",): 2, ("idle",): None}, labelnames=("state",))
+    registry.gauge("test_broken", "Quebrado", lambda: 1 / 0)
+
+    state["size"] = 7
+    output = registry.render()
+    assert "test_documents 7.0" in output
+    assert 'test_pool{state="checked_out"} 2.0' in output
+    assert 'state="idle"' not in output
+    assert "# TYPE test_broken gauge" in output
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Teste", labelnames=("route",))
+    counter.inc(route='a"b\\c')
+
+    assert 'test_total{route="a\\"b\\\\c"} 1.0' in registry.render()
@@ -0,0 +1,102 @@
+import sys
+import os
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import Estoque
+from tests.conftest import KeywordEmbeddings
+
+PRODUCTS = [
+    (1, "Alface", "Verdura", "folha"),
+    (2, "Tomate", "Legume", "vermelho"),
+    (3, "Cenoura", "Legume", "raiz"),
+]
+
+
+@pytest.fixture
+def make_catalog(make_service, monkeypatch):
+    def build(**overrides):
+        embeddings = KeywordEmbeddings("folha", "vermelho", "raiz")
+        service = make_service(embeddings, rows=[
+            Estoque(id=id, produto=produto, quantidade=10, unidade="kg", preco=3.0, categoria=categoria)
+            for id, produto, categoria, _ in PRODUCTS
+        ], **overrides)
+        service.collection.add(
+            ids=[f"estoque_{id}" for id, *_ in PRODUCTS],
+            documents=[f"Produto: {produto}." for _, produto, _, _ in PRODUCTS],
+            metadatas=[{"source": "estoque", "produto": produto, "id": id} for id, produto, _, _ in PRODUCTS],
+            embeddings=[embeddings.vector(keyword) for *_, keyword in PRODUCTS]
+        )
+        # Conta as consultas ao ChromaDB.
+        searches = []
+        query = service.collection.query
+
+        def counted(**kwargs):
+            searches.append(kwargs)
+            return query(**kwargs)
+
+        monkeypatch.setattr(service.collection, "query", counted)
+        return service, searches
+
+    return build
+
+
+def test_batch_embeds_once_and_searches_once(make_catalog):
+    service, searches = make_catalog()
+    questions = [
+        "Qual o preço do tomate?",
+        "Tem alguma verdura de folha?",
+        "Procuro algo vermelho",
+        "Tem alguma verdura de folha?",
+    ]
+
+    items = service.query_many(questions, k=1)
+
+    assert [item["question"] for item in items] == questions
+    # O produto citado é respondido pelo índice, sem passar pelo modelo.
+    assert "Tomate" in items[0]["sources"][0]
+    assert service.embeddings.calls == [["Tem alguma verdura de folha?", "Procuro algo vermelho"]]
+    assert len(searches) == 1
+    assert len(searches[0]["query_embeddings"]) == 2
+    assert items[1]["metadata"][0]["produto"] == "Alface"
+    assert items[2]["metadata"][0]["produto"] == "Tomate"
+    assert items[3] == items[1]
+
+
+def test_item_errors_do_not_fail_the_batch(make_catalog):
+    service, _ = make_catalog()
+    generate = service._generate_answer
+
+    def failing(question, docs, sales=None):
+        if "vermelho" in question:
+            raise RuntimeError("falhou")
+        return generate(question, docs, sales)
+
+    service._generate_answer = failing
+    items = service.query_many(["Tem alguma verdura de folha?", "Procuro algo vermelho"], k=1)
+
+    assert "answer" in items[0] and "error" not in items[0]
+    assert items[1] == {"question": "Procuro algo vermelho", "error": "falhou"}
+
+
+def test_embedding_failure_keeps_structured_answers(make_catalog):
+    service, _ = make_catalog()
+
+    def broken(texts):
+        raise RuntimeError("modelo indisponível")
+
+    service.embeddings.embed_documents = broken
+    items = service.query_many(["Qual o preço da cenoura?", "Procuro algo vermelho"], k=1)
+
+    assert "Cenoura" in items[0]["sources"][0]
+    assert items[1] == {"question": "Procuro algo vermelho", "error": "modelo indisponível"}
+
+
+def test_answer_cache_vector_is_reused_for_search(make_catalog):
+    service, searches = make_catalog(ANSWER_CACHE_ENABLED=True)
+
+    service.query("Tem alguma verdura de folha?", k=1)
+
+    assert service.embeddings.queries == ["Tem alguma verdura de folha?"]
+    assert searches[0]["query_embeddings"] == [[1.0, 0.0, 0.0, 0.1]]
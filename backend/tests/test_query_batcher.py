@@ -0,0 +1,56 @@
+import sys
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import chromadb
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.query_batcher import QueryBatcher
+from tests.conftest import KeywordEmbeddings
+
+
+def make_collection():
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(f"test_{uuid.uuid4().hex}")
+    collection.add(
+        ids=["estoque_1_1", "estoque_2_1"],
+        documents=["Preço do alface", "Preço do tomate"],
+        metadatas=[{"source": "estoque", "produto": "Alface"}, {"source": "estoque", "produto": "Tomate"}],
+        embeddings=[[1.0, 0.0, 0.1], [0.0, 1.0, 0.1]]
+    )
+    return collection
+
+
+def test_concurrent_questions_share_one_forward_pass():
+    embeddings = KeywordEmbeddings("alface", "tomate")
+    batcher = QueryBatcher(embeddings, make_collection(), window_ms=200, max_batch_size=8)
+
+    questions = ["preço alface", "preço tomate"] * 3
+    with ThreadPoolExecutor(max_workers=len(questions)) as pool:
+        results = list(pool.map(lambda q: batcher.search(q, k=1), questions))
+    batcher.stop()
+
+    assert [docs[0].metadata["produto"] for docs in results] == ["Alface", "Tomate"] * 3
+    assert embeddings.texts == len(questions)
+    assert len(embeddings.calls) < len(questions)
+    assert batcher.stats()["questions"] == len(questions)
+
+
+def test_each_request_gets_its_own_k():
+    batcher = QueryBatcher(KeywordEmbeddings("alface", "tomate"), make_collection(), window_ms=1)
+
+    assert len(batcher.search("alface", k=1)) == 1
+    assert len(batcher.search("alface", k=2)) == 2
+    batcher.stop()
+
+
+def test_precomputed_vector_skips_the_model():
+    embeddings = KeywordEmbeddings("alface", "tomate")
+    batcher = QueryBatcher(embeddings, make_collection(), window_ms=1)
+
+    docs = batcher.search("qualquer coisa", k=1, vector=[0.0, 1.0, 0.1])
+    batcher.stop()
+
+    assert docs[0].metadata["produto"] == "Tomate"
+    assert embeddings.calls == []
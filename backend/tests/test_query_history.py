@@ -0,0 +1,137 @@
+import json
+import sys
+import os
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import Base, get_db
+from app.models import Query
+from app.query_history import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    history_page,
+    history_statement,
+    iter_history_ndjson,
+)
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    # Dois registros por segundo para exercitar o desempate por id.
+    db.add_all([
+        Query(
+            query_text=f"Quanto custa o produto {i}?" if i % 2 else f"Estoque do item {i}",
+            response=f"resposta {i}",
+            created_at=START + timedelta(seconds=i // 2)
+        )
+        for i in range(25)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_cursor_roundtrip_and_validation():
+    cursor = encode_cursor(START, 42)
+    assert decode_cursor(cursor) == (START, 42)
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor("nao-e-um-cursor")
+
+
+def test_keyset_pages_cover_every_row_once(factory):
+    db = factory()
+    seen = []
+    cursor = None
+    while True:
+        items, cursor = history_page(db, 10, cursor)
+        seen.extend(items)
+        if cursor is None:
+            break
+    db.close()
+
+    ids = [item["id"] for item in seen]
+    assert len(ids) == 25 and len(set(ids)) == 25
+    keys = [(item["created_at"], item["id"]) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_statement_uses_keyset_not_offset():
+    sql = str(history_statement(10, encode_cursor(START, 5)))
+    assert "OFFSET" not in sql.upper()
+    assert "ORDER BY queries.created_at DESC, queries.id DESC" in sql
+
+
+def test_filters_by_time_range_and_text(factory):
+    db = factory()
+    items, _ = history_page(
+        db, 50,
+        since=START + timedelta(seconds=2),
+        until=START + timedelta(seconds=5),
+        text="custa"
+    )
+    db.close()
+
+    assert items
+    for item in items:
+        created_at = datetime.fromisoformat(item["created_at"])
+        assert START + timedelta(seconds=2) <= created_at < START + timedelta(seconds=5)
+        assert "custa" in item["query_text"]
+
+
+def test_text_filter_escapes_wildcards(factory):
+    db = factory()
+    items, _ = history_page(db, 50, text="%")
+    db.close()
+    assert items == []
+
+
+def test_ndjson_export_streams_all_rows(factory):
+    lines = list(iter_history_ndjson(factory, batch_size=4))
+    assert len(lines) == 25
+    assert all(line.endswith("\n") for line in lines)
+    assert json.loads(lines[0])["id"] == 25
+
+
+def test_route_returns_list_with_next_cursor_header(factory):
+    from app.main import app
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.get("/api/v1/queries", params={"limit": 10})
+        assert response.status_code == 200
+        assert len(response.json()) == 10
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = client.get("/api/v1/queries", params={"limit": 10, "cursor": cursor})
+        assert response.json()[0]["id"] == 15
+
+        response = client.get("/api/v1/queries", params={"cursor": "invalido"})
+        assert response.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
@@ -1,27 +1,51 @@
+import json
 import pytest
 import sys
 import os
+import time
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.main import app
 
-client = TestClient(app)
+STARTUP_TIMEOUT = 300
 
-def test_health_check():
+
+@pytest.fixture(scope="module")
+def client():
+    # O startup só roda dentro do ``with``, e o RAG sobe em segundo plano:
+    # espera as etapas do /ready terminarem (ou uma falhar, que trava as
+    # seguintes) antes dos testes.
+    with TestClient(app) as client:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            statuses = [stage["status"] for stage in client.get("/ready").json()["stages"].values()]
+            if "failed" in statuses or all(status == "done" for status in statuses):
+                break
+            time.sleep(0.5)
+        yield client
+
+def test_health_check(client):
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
-def test_root():
+def test_ready(client):
+    response = client.get("/ready")
+    assert response.status_code in (200, 503)
+    data = response.json()
+    assert "status" in data
+    assert set(data["stages"]) == {"database", "model", "vectorstore", "sync"}
+
+def test_root(client):
     response = client.get("/")
     assert response.status_code == 200
     data = response.json()
     assert "message" in data
     assert "status" in data
 
-def test_create_query():
+def test_create_query(client):
     response = client.post(
         "/api/v1/query",
         json={"question": "Quantos produtos tem no estoque?"}
@@ -33,12 +57,35 @@ def test_create_query():
     assert isinstance(data["answer"], str)
     assert isinstance(data["sources"], list)
 
-def test_get_queries():
+def test_stream_query(client):
+    response = client.post(
+        "/api/v1/query/stream?format=ndjson",
+        json={"question": "Quanto custa o tomate?"}
+    )
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["sources", "answer"]
+    assert isinstance(events[0]["sources"], list)
+    assert isinstance(events[1]["answer"], str)
+
+def test_batch_query(client):
+    response = client.post(
+        "/api/v1/query/batch",
+        json={"questions": ["Quanto custa o tomate?", "Quantos produtos tem no estoque?"]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["question"] for item in data["results"]] == ["Quanto custa o tomate?", "Quantos produtos tem no estoque?"]
+    assert all("answer" in item or "error" in item for item in data["results"])
+
+    assert client.post("/api/v1/query/batch", json={"questions": []}).status_code == 422
+
+def test_get_queries(client):
     response = client.get("/api/v1/queries")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_add_documents():
+def test_add_documents(client):
     response = client.post(
         "/api/v1/add-documents",
         json={
@@ -52,10 +99,24 @@ def test_add_documents():
     assert "count" in data
     assert data["count"] == 2
 
-def test_document_count():
+def test_document_count(client):
     response = client.get("/api/v1/documents/count")
     assert response.status_code == 200
     data = response.json()
     assert "count" in data
     assert isinstance(data["count"], int)
-    assert data["count"] > 0
\ No newline at end of file
+    assert data["count"] > 0
+
+def test_index_info(client):
+    response = client.get("/api/v1/index")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["configured"]["hnsw:space"] == data["documents"]["hnsw:space"]
+    assert data["outdated"] == []
+
+def test_workload_stats(client):
+    response = client.get("/api/v1/workload")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["background"]) == {"sync", "ingest", "maintenance"}
+    assert "in_flight" in data["query"]
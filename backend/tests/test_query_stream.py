@@ -0,0 +1,108 @@
+import asyncio
+import json
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.query_stream import QueryStream, encode_event
+from tests.conftest import LengthEmbeddings
+
+
+def parse_sse(chunks):
+    events = []
+    for chunk in chunks:
+        event, data = chunk.strip().split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def collect(query, format="sse"):
+    async def run():
+        stream = QueryStream(format)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(query, stream.on_sources)
+            chunks = [chunk async for chunk in stream.events(future)]
+        return stream, chunks
+
+    return asyncio.run(run())
+
+
+def test_sources_are_sent_before_the_answer_is_ready():
+    answered = threading.Event()
+    received_sources = threading.Event()
+    received = []
+
+    def query(on_sources):
+        on_sources(["Alface: R$ 2.50"], [{"id": 1}])
+        # A resposta só sai depois que o cliente já tem as fontes.
+        assert received_sources.wait(5)
+        answered.set()
+        return {"answer": "💰 R$ 2.50", "sources": ["Alface: R$ 2.50"], "metadata": [{"id": 1}]}
+
+    async def run():
+        stream = QueryStream()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(query, stream.on_sources)
+            async for chunk in stream.events(future):
+                received.append((chunk, answered.is_set()))
+                received_sources.set()
+        return stream
+
+    stream = asyncio.run(run())
+
+    events = parse_sse(chunk for chunk, _ in received)
+    assert [name for name, _ in events] == ["sources", "answer"]
+    assert events[0][1] == {"sources": ["Alface: R$ 2.50"], "metadata": [{"id": 1}]}
+    assert received[0][1] is False
+    assert events[1][1] == {"answer": "💰 R$ 2.50"}
+    assert stream.result["answer"] == "💰 R$ 2.50"
+
+
+def test_routes_without_retrieval_send_sources_from_the_result():
+    stream, chunks = collect(
+        lambda on_sources: {"answer": "📦 10 unidades", "sources": ["Tomate"], "metadata": [{"id": 2}]},
+        format="ndjson"
+    )
+
+    assert [json.loads(chunk) for chunk in chunks] == [
+        {"event": "sources", "sources": ["Tomate"], "metadata": [{"id": 2}]},
+        {"event": "answer", "answer": "📦 10 unidades"},
+    ]
+    assert stream.result is not None
+
+
+def test_failure_ends_the_stream_with_an_error_event():
+    def query(on_sources):
+        on_sources([], [])
+        raise RuntimeError("banco fora do ar")
+
+    stream, chunks = collect(query)
+
+    assert parse_sse(chunks) == [
+        ("sources", {"sources": [], "metadata": []}),
+        ("error", {"detail": "banco fora do ar"}),
+    ]
+    assert stream.result is None
+
+
+def test_rag_failure_reaches_the_stream_as_an_error(make_service, monkeypatch):
+    service = make_service(LengthEmbeddings())
+
+    def failing(question, k, on_sources=None):
+        raise RuntimeError("modelo indisponível")
+
+    monkeypatch.setattr(service, "_query", failing)
+    stream, chunks = collect(lambda on_sources: service.query_or_raise("Quanto custa o tomate?", on_sources=on_sources))
+
+    assert parse_sse(chunks) == [("error", {"detail": "modelo indisponível"})]
+    assert stream.result is None
+    # Fora do streaming a falha continua virando uma resposta de erro.
+    assert service.query("Quanto custa o tomate?")["answer"].startswith("Desculpe")
+
+
+def test_encode_event_formats():
+    assert encode_event("answer", {"answer": "ok"}) == 'event: answer\ndata: {"answer": "ok"}\n\n'
+    assert encode_event("answer", {"answer": "ok"}, "ndjson") == '{"answer": "ok", "event": "answer"}\n'
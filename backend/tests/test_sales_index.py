@@ -0,0 +1,91 @@
+import sys
+import os
+import uuid
+from datetime import datetime
+import chromadb
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import Estoque, Vendas
+from app.sales_index import SalesPartitions
+from app.sync import venda_documents
+from tests.conftest import KeywordEmbeddings
+
+VENDAS = [
+    dict(id=1, produto="Alface", quantidade=5, valor_total=12.50, cliente="João Silva", data_venda=datetime(2024, 1, 10)),
+    dict(id=2, produto="Tomate", quantidade=3, valor_total=12.00, cliente="Maria Santos", data_venda=datetime(2024, 1, 20)),
+    dict(id=3, produto="Alface", quantidade=2, valor_total=5.00, cliente="Maria Santos", data_venda=datetime(2024, 2, 5)),
+    dict(id=4, produto="Alface", quantidade=1, valor_total=2.50, cliente="João Silva", data_venda=datetime(2023, 6, 1)),
+]
+
+
+def make_partitions():
+    partitions = SalesPartitions(chromadb.EphemeralClient(), prefix=f"t{uuid.uuid4().hex[:8]}_")
+    documents = [doc for venda in VENDAS for doc in venda_documents(Vendas(**venda))]
+    ids, texts, metadatas = zip(*documents)
+    partitions.upsert(list(ids), list(texts), list(metadatas), [[1.0, 0.0]] * len(documents))
+    return partitions
+
+
+@pytest.fixture
+def service(make_service):
+    # Com embeddings constantes toda pergunta seria um acerto semântico no
+    # cache de respostas, que fica desligado.
+    service = make_service(KeywordEmbeddings(), rows=[Vendas(**venda) for venda in VENDAS] + [
+        Estoque(id=1, produto="Alface", quantidade=50, unidade="unidade", preco=2.50, categoria="Verdura"),
+        Estoque(id=2, produto="Tomate", quantidade=30, unidade="kg", preco=4.00, categoria="Legume"),
+    ])
+    assert service._sync_database_to_rag(full=True)["mode"] == "full"
+    return service
+
+
+def test_documents_are_routed_to_monthly_partitions():
+    partitions = make_partitions()
+
+    assert partitions.months() == ["2023-06", "2024-01", "2024-02"]
+    assert partitions.count() == 4
+    assert partitions.months_for((datetime(2024, 1, 15), datetime(2024, 3, 1))) == ["2024-01", "2024-02"]
+    assert partitions.months_for(None, recent=2) == ["2024-01", "2024-02"]
+    # Meses sem vendas do filtro (segundo os agregados) ficam de fora.
+    assert partitions.months_for(None, recent=2, allowed={"2023-06", "2024-01"}) == ["2023-06", "2024-01"]
+
+    # Reabrir o cliente enxerga as partições que já existem.
+    assert SalesPartitions(partitions.client, partitions.prefix).months() == partitions.months()
+
+
+def test_search_only_reads_selected_months():
+    partitions = make_partitions()
+
+    hits = partitions.search([1.0, 0.0], 5, ["2024-01"])
+    assert sorted(doc_id for doc_id, _ in hits) == ["vendas_1", "vendas_2"]
+
+    hits = partitions.search([1.0, 0.0], 5, partitions.months(), where={"cliente": "João Silva"})
+    assert sorted(doc_id for doc_id, _ in hits) == ["vendas_1", "vendas_4"]
+
+    partitions.drop("2024-01")
+    assert partitions.months() == ["2023-06", "2024-02"]
+
+
+def test_sales_answer_uses_aggregates_for_the_period(service):
+
+    streamed = []
+    result, route = service._query(
+        "Quanto a Maria Santos comprou em janeiro de 2024?", k=5,
+        on_sources=lambda sources, metadata: streamed.append(metadata)
+    )
+    assert route == "retrieval"
+    assert streamed == [result["metadata"]]
+    assert [m["id"] for m in result["metadata"]] == [2]
+    assert "(01/01/2024 a 31/01/2024)" in result["answer"]
+    assert "1 venda(s), 3 unidades" in result["answer"]
+    assert "R$ 12.00" in result["answer"]
+
+    # Sem período, os totais cobrem o histórico todo, não só os trechos achados.
+    result, _ = service._query("Total de vendas de alface", k=1)
+    assert len(result["metadata"]) == 1
+    assert "3 venda(s), 8 unidades" in result["answer"]
+    assert "R$ 20.00" in result["answer"]
+
+    result, _ = service._query("vendas de março de 2020", k=5)
+    assert result["answer"].startswith("📊 Nenhuma venda encontrada (01/03/2020 a 31/03/2020)")
@@ -0,0 +1,134 @@
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.scheduler import WorkloadScheduler
+
+
+class Load:
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+def wait_running(scheduler, workload):
+    deadline = time.monotonic() + 5
+    while scheduler.depth()[(workload, "running")] == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_sync_jobs_leave_the_queue_before_ingestion_and_maintenance():
+    scheduler = WorkloadScheduler(workers=1, nice=0)
+    gate = threading.Event()
+    order = []
+
+    blocker = scheduler.submit("maintenance", gate.wait)
+    wait_running(scheduler, "maintenance")
+    futures = [
+        scheduler.submit("maintenance", order.append, "maintenance"),
+        scheduler.submit("ingest", order.append, "ingest"),
+        scheduler.submit("sync", order.append, "sync"),
+    ]
+    assert scheduler.depth()[("maintenance", "queued")] == 1
+    gate.set()
+    for future in [blocker] + futures:
+        future.result(timeout=5)
+
+    assert order == ["sync", "ingest", "maintenance"]
+    stats = scheduler.stats()["background"]
+    assert stats["maintenance"]["done"] == 2
+    assert stats["maintenance"]["max_wait_seconds"] > 0
+    scheduler.shutdown()
+
+
+def test_checkpoint_waits_for_queries_then_limits_cpu_share():
+    load = Load()
+    scheduler = WorkloadScheduler(workers=1, cpu_share=0.5, max_defer=5.0, nice=0, interactive_load=load)
+
+    def job():
+        time.sleep(0.05)  # um "lote"
+        load.value = 1
+        threading.Timer(0.1, setattr, (load, "value", 0)).start()
+        started = time.perf_counter()
+        scheduler.checkpoint()
+        return time.perf_counter() - started
+
+    paused = scheduler.run("sync", job)
+
+    # 0.1s esperando as consultas + ~0.05s de descanso pela fatia de 50%.
+    assert paused >= 0.14
+    stats = scheduler.stats()["background"]["sync"]
+    assert stats["yields"] == 1
+    assert stats["yield_seconds"] >= 0.14
+    scheduler.shutdown()
+
+
+def test_checkpoint_gives_up_waiting_after_max_defer():
+    load = Load()
+    load.value = 1
+    scheduler = WorkloadScheduler(workers=1, cpu_share=1.0, max_defer=0.1, nice=0, interactive_load=load)
+
+    def job():
+        started = time.perf_counter()
+        scheduler.checkpoint()
+        return time.perf_counter() - started
+
+    # Com consultas sem parar o fundo ainda avança, um lote por vez.
+    assert 0.1 <= scheduler.run("ingest", job) < 1.0
+    scheduler.shutdown()
+
+
+def test_checkpoint_outside_background_threads_is_a_no_op():
+    load = Load()
+    load.value = 1
+    scheduler = WorkloadScheduler(max_defer=5.0, interactive_load=load)
+
+    started = time.perf_counter()
+    scheduler.checkpoint()
+
+    assert time.perf_counter() - started < 0.05
+
+
+def test_nested_run_does_not_deadlock_the_pool():
+    scheduler = WorkloadScheduler(workers=1, nice=0)
+
+    result = scheduler.run("sync", lambda: scheduler.run("maintenance", lambda: threading.current_thread().name))
+
+    assert result.startswith("background-")
+    scheduler.shutdown()
+
+
+def test_failures_reach_the_caller_and_are_counted():
+    scheduler = WorkloadScheduler(workers=1, nice=0)
+
+    def boom():
+        raise ValueError("falhou")
+
+    with pytest.raises(ValueError):
+        scheduler.run("ingest", boom)
+    with pytest.raises(ValueError):
+        scheduler.submit("query", boom)
+    assert scheduler.stats()["background"]["ingest"]["failed"] == 1
+    scheduler.shutdown()
+
+
+def test_shutdown_cancels_queued_jobs():
+    scheduler = WorkloadScheduler(workers=1, nice=0)
+    gate = threading.Event()
+    running = scheduler.submit("sync", gate.wait)
+    wait_running(scheduler, "sync")
+    queued = scheduler.submit("ingest", time.sleep, 0)
+
+    scheduler.shutdown()
+    gate.set()
+
+    assert queued.cancelled()
+    assert running.result(timeout=5)
+    with pytest.raises(RuntimeError):
+        scheduler.submit("sync", time.sleep, 0)
@@ -0,0 +1,111 @@
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+import chromadb
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import settings
+from app.models import Estoque, Vendas
+from app.snapshots import export_snapshot, latest_snapshot, list_snapshots, load_rows, prune_snapshots
+from app.sync import CHECKPOINT_VERSION
+from tests.conftest import LengthEmbeddings
+
+
+def make_collection(rows):
+    collection = chromadb.EphemeralClient().create_collection(f"test_{uuid.uuid4().hex}")
+    ids, documents, metadatas, vectors = zip(*rows)
+    collection.add(ids=list(ids), documents=list(documents), metadatas=list(metadatas), embeddings=list(vectors))
+    return collection
+
+
+def test_snapshot_round_trip(tmp_path):
+    collection = make_collection([
+        ("estoque_1", "Alface", {"source": "estoque", "id": 1, "preco": 2.5}, [0.1, 0.2]),
+        ("doc_1", "Manual", {"source": "upload"}, [0.3, 0.4]),
+    ])
+    checkpoint = {"version": CHECKPOINT_VERSION, "last_sync": "2024-05-01T00:00:00", "estoque": {}, "vendas": {}}
+
+    manifest = export_snapshot(str(tmp_path), {"documents": [collection]}, checkpoint, "modelo")
+    assert manifest["collections"]["documents"] == {"count": 2, "dim": 2}
+
+    [(ids, documents, metadatas, vectors)] = list(load_rows(manifest["path"], "documents"))
+    assert ids == ["estoque_1", "doc_1"] or ids == ["doc_1", "estoque_1"]
+    rows = dict(zip(ids, zip(documents, metadatas, vectors)))
+    # Chaves ausentes não viram None no metadado restaurado.
+    assert rows["doc_1"][1] == {"source": "upload"}
+    assert rows["estoque_1"][1] == {"source": "estoque", "id": 1, "preco": 2.5}
+    assert rows["estoque_1"][2] == pytest.approx([0.1, 0.2])
+
+    assert latest_snapshot(str(tmp_path), "modelo", CHECKPOINT_VERSION)["path"] == manifest["path"]
+    assert latest_snapshot(str(tmp_path), "outro-modelo", CHECKPOINT_VERSION) is None
+    assert latest_snapshot(str(tmp_path), "modelo", CHECKPOINT_VERSION + 1) is None
+
+
+def test_prune_keeps_newest(tmp_path):
+    collection = make_collection([("a", "A", {"source": "x"}, [1.0, 0.0])])
+    paths = [
+        export_snapshot(str(tmp_path), {"documents": [collection]}, {"version": CHECKPOINT_VERSION}, "modelo")["path"]
+        for _ in range(3)
+    ]
+
+    prune_snapshots(str(tmp_path), keep=2)
+    assert [m["path"] for m in list_snapshots(str(tmp_path))] == paths[:0:-1]
+
+
+@pytest.fixture
+def seeded(session_factory):
+    db = session_factory()
+    db.add_all([Estoque(produto=f"Produto {i}", quantidade=i, unidade="kg", preco=1.0 + i, categoria="Teste") for i in range(20)])
+    db.add_all([Vendas(produto="Produto 1", quantidade=1, valor_total=2.0, cliente="Ana", data_venda=datetime(2024, 5, 3))])
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def test_new_volume_restores_snapshot_and_syncs_only_the_delta(make_service, seeded):
+    first = make_service(LengthEmbeddings(), volume="chroma_a")
+    assert first._sync_database_to_rag()["mode"] == "full"
+    exported = first.export_snapshot()
+    assert exported["collections"]["documents"]["count"] == 20
+    assert exported["collections"]["vendas"]["count"] == 1
+    first.shutdown()
+
+    db = seeded()
+    row = db.query(Estoque).filter(Estoque.produto == "Produto 3").one()
+    row.preco = 99.0
+    row.ultima_atualizacao = datetime.utcnow() + timedelta(seconds=1)
+    db.commit()
+    db.close()
+
+    # Réplica nova: volume vazio, mesmo diretório de snapshots.
+    embeddings = LengthEmbeddings()
+    replica = make_service(embeddings, volume="chroma_b")
+    assert replica._restore_snapshot() is not None
+    assert replica.collection.count() == 20
+    assert replica.sales_partitions.count() == 1
+    assert embeddings.texts == 0
+
+    report = replica._sync_database_to_rag()
+    assert report["mode"] == "incremental"
+    assert report["updated"] == 1
+    # Só as visões da linha alterada passam pelo modelo.
+    assert 0 < embeddings.texts < 20
+    docs = replica._retrieve("Produto 3", k=20)
+    assert any("99" in doc.page_content for doc in docs)
+    replica.shutdown()
+
+
+def test_snapshot_of_another_model_is_ignored(make_service, seeded, monkeypatch):
+    first = make_service(LengthEmbeddings(), volume="chroma_a")
+    first._sync_database_to_rag()
+    first.export_snapshot()
+    first.shutdown()
+
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", "outro-modelo")
+    replica = make_service(LengthEmbeddings(), volume="chroma_b")
+    assert replica._restore_snapshot() is None
+    assert replica._sync_database_to_rag()["mode"] == "full"
+    replica.shutdown()
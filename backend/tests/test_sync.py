@@ -0,0 +1,197 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import Base
+from app.models import Estoque, Vendas, VendasAgregado
+from app.ingestion import BulkIngestor
+from app.sales_aggregates import sales_totals
+from app.sales_index import SalesPartitions
+from app.sync import SyncCheckpoint, run_sync
+
+
+class FakeCollection:
+    def __init__(self, name="documents"):
+        self.name = name
+        self.items = {}
+
+    def count(self):
+        return len(self.items)
+
+    def get(self, where=None, include=None, limit=None, offset=0):
+        ids = [
+            doc_id for doc_id, (_, metadata) in self.items.items()
+            if not where or all(metadata.get(k) == v for k, v in where.items())
+        ][offset:None if limit is None else offset + limit]
+        return {"ids": ids, "metadatas": [self.items[doc_id][1] for doc_id in ids]}
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.items.pop(doc_id, None)
+
+    def upsert(self, ids, documents, metadatas, embeddings=None):
+        for doc_id, doc, metadata in zip(ids, documents, metadatas):
+            self.items[doc_id] = (doc, metadata)
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def list_collections(self):
+        return list(self.collections.values())
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.setdefault(name, FakeCollection(name))
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def sync(db, collection, checkpoint, sales=None, **kwargs):
+    ingestor = BulkIngestor(collection, FakeEmbeddings(), None, batch_size=2, workers=1)
+    sales = sales or SalesPartitions(collection.client)
+    return run_sync(db, collection, sales, checkpoint, ingestor, **kwargs)
+
+
+def make_collection():
+    collection = FakeCollection()
+    collection.client = FakeClient()
+    return collection
+
+
+def sales_items(collection):
+    items = {}
+    for partition in collection.client.collections.values():
+        items.update(partition.items)
+    return items
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = Session(bind=engine)
+    session.add_all([
+        Estoque(produto="Alface", quantidade=50, unidade="unidade", preco=2.50, categoria="Verdura"),
+        Estoque(produto="Tomate", quantidade=30, unidade="kg", preco=4.00, categoria="Legume"),
+        Vendas(produto="Alface", quantidade=5, valor_total=12.50, cliente="João Silva", data_venda=datetime(2024, 5, 3, 10)),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_first_sync_is_full(db, tmp_path):
+    collection = make_collection()
+    checkpoint = SyncCheckpoint(str(tmp_path / "checkpoint.json"))
+
+    report = sync(db, collection, checkpoint)
+
+    assert report["mode"] == "full"
+    assert report["inserted"] == 3
+    # Um documento por produto; a venda vai para a partição do mês.
+    assert collection.count() == 2
+    assert collection.items["estoque_1"][1] == {"source": "estoque", "produto": "Alface", "id": 1}
+    assert list(collection.client.collections) == ["vendas_2024_05"]
+    assert sales_items(collection)["vendas_1"][1]["data"] == "2024-05-03"
+    assert os.path.exists(tmp_path / "checkpoint.json")
+
+
+def test_incremental_sync_only_touches_changed_rows(db, tmp_path):
+    collection = make_collection()
+    path = str(tmp_path / "checkpoint.json")
+    sync(db, collection, SyncCheckpoint(path))
+
+    alface = db.query(Estoque).filter_by(produto="Alface").one()
+    alface.preco = 3.00
+    alface.ultima_atualizacao = datetime.utcnow() + timedelta(seconds=1)
+    db.query(Estoque).filter_by(produto="Tomate").delete()
+    db.add(Vendas(produto="Tomate", quantidade=2, valor_total=8.00, cliente="Maria Santos", data_venda=datetime(2024, 6, 1)))
+    db.commit()
+
+    report = sync(db, collection, SyncCheckpoint(path))
+
+    assert report["mode"] == "incremental"
+    assert report["updated"] == 1
+    assert report["deleted"] == 1
+    assert report["inserted"] == 1
+    assert report["skipped"] == 1
+    assert "estoque_2" not in collection.items
+    assert "R$ 3.00" in collection.items["estoque_1"][0]
+
+
+def test_incremental_sync_without_changes_skips_everything(db, tmp_path):
+    collection = make_collection()
+    path = str(tmp_path / "checkpoint.json")
+    sync(db, collection, SyncCheckpoint(path))
+
+    report = sync(db, collection, SyncCheckpoint(path))
+
+    assert report["inserted"] == report["updated"] == report["deleted"] == 0
+    assert report["skipped"] == 3
+
+
+def test_changing_views_forces_full_resync(db, tmp_path):
+    collection = make_collection()
+    path = str(tmp_path / "checkpoint.json")
+    sync(db, collection, SyncCheckpoint(path))
+
+    report = sync(db, collection, SyncCheckpoint(path), estoque_views=("resumo", "preco"))
+
+    assert report["mode"] == "full"
+    assert set(collection.items) == {"estoque_1", "estoque_1_preco", "estoque_2", "estoque_2_preco"}
+    assert set(sales_items(collection)) == {"vendas_1"}
+
+
+def test_only_changed_months_are_reindexed(db, tmp_path):
+    db.add_all([
+        Vendas(produto="Tomate", quantidade=2, valor_total=8.00, cliente="Maria Santos", data_venda=datetime(2024, 6, 1)),
+        Vendas(produto="Tomate", quantidade=1, valor_total=4.00, cliente="João Silva", data_venda=datetime(2024, 6, 20)),
+    ])
+    db.commit()
+    collection = make_collection()
+    path = str(tmp_path / "checkpoint.json")
+    sync(db, collection, SyncCheckpoint(path))
+    assert set(collection.client.collections) == {"vendas_2024_05", "vendas_2024_06"}
+
+    # Muda o valor de uma venda de junho e move a outra para julho.
+    venda = db.get(Vendas, 2)
+    venda.valor_total = 9.00
+    db.get(Vendas, 3).data_venda = datetime(2024, 7, 2)
+    db.commit()
+
+    report = sync(db, collection, SyncCheckpoint(path))
+
+    assert report["vendas_months_changed"] == 2
+    assert report["updated"] == 1
+    assert report["inserted"] == report["deleted"] == 1
+    # Maio não mudou e nem foi relido.
+    assert report["skipped"] == 2 + 1
+    partitions = collection.client.collections
+    assert set(partitions["vendas_2024_06"].items) == {"vendas_2"}
+    assert set(partitions["vendas_2024_07"].items) == {"vendas_3"}
+    assert "R$ 9.00" in partitions["vendas_2024_06"].items["vendas_2"][0]
+
+    june = (datetime(2024, 6, 1), datetime(2024, 7, 1))
+    assert sales_totals(db, date_range=june) == {"vendas": 1, "quantidade": 2, "valor": 9.0}
+    assert sales_totals(db, produtos=["Tomate"]) == {"vendas": 2, "quantidade": 3, "valor": 13.0}
+    assert sales_totals(db, clientes=["João Silva"])["vendas"] == 2
+
+    # Mês que ficou sem vendas perde a partição.
+    db.query(Vendas).filter(Vendas.id == 3).delete()
+    db.commit()
+    report = sync(db, collection, SyncCheckpoint(path))
+    assert report["deleted"] == 1
+    assert "vendas_2024_07" not in partitions
+    assert db.query(VendasAgregado).filter(VendasAgregado.dia >= datetime(2024, 7, 1).date()).count() == 0
@@ -1,6 +1,6 @@
 import React, { useState } from "react";
 import "./App.css";
-import { sendQuery } from "./services/api";
+import { sendQueryStream } from "./services/api";
 
 function App() {
   const [messages, setMessages] = useState([]);
@@ -16,21 +16,25 @@ function App() {
     setInput("");
     setLoading(true);
 
+    // A mensagem do bot aparece com as fontes e recebe a resposta depois.
+    const botId = Date.now();
+    const updateBot = (changes) =>
+      setMessages((prev) =>
+        prev.some((msg) => msg.id === botId)
+          ? prev.map((msg) => (msg.id === botId ? { ...msg, ...changes } : msg))
+          : [...prev, { id: botId, type: "bot", text: "", sources: [], ...changes }]
+      );
+
     try {
-      const data = await sendQuery(input);
-      const botMessage = {
-        type: "bot",
-        text: data.answer,
-        sources: data.sources || [],
-      };
-      setMessages((prev) => [...prev, botMessage]);
+      await sendQueryStream(input, {
+        onSources: (sources) => updateBot({ sources }),
+        onAnswer: (answer) => updateBot({ text: answer }),
+      });
     } catch (error) {
-      const errorMessage = {
-        type: "bot",
+      updateBot({
         text: "Desculpe, ocorreu um erro ao processar sua mensagem.",
         error: true,
-      };
-      setMessages((prev) => [...prev, errorMessage]);
+      });
     } finally {
       setLoading(false);
     }
@@ -16,7 +16,65 @@ export const sendQuery = async (question) => {
   return response.json();
 };
 
+// Mesma consulta via /query/stream (SSE): as fontes chegam assim que a busca
+// termina e a resposta depois. Resolve com { answer, sources, metadata }.
+export const sendQueryStream = async (question, { onSources, onAnswer } = {}) => {
+  const response = await fetch(`${API_URL}/query/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+    },
+    body: JSON.stringify({ question }),
+  });
 
+  if (!response.ok || !response.body) {
+    throw new Error("Erro ao consultar a API");
+  }
+
+  const result = { answer: null, sources: [], metadata: [] };
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  const handle = (block) => {
+    let event = "message";
+    let data = "";
+    for (const line of block.split("\n")) {
+      if (line.startsWith("event:")) event = line.slice(6).trim();
+      else if (line.startsWith("data:")) data += line.slice(5).trim();
+    }
+    if (!data) return;
+    const payload = JSON.parse(data);
+    if (event === "sources") {
+      result.sources = payload.sources || [];
+      result.metadata = payload.metadata || [];
+      if (onSources) onSources(result.sources, result.metadata);
+    } else if (event === "answer") {
+      result.answer = payload.answer;
+      if (onAnswer) onAnswer(result.answer);
+    } else if (event === "error") {
+      throw new Error(payload.detail || "Erro ao consultar a API");
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      handle(buffer.slice(0, end));
+      buffer = buffer.slice(end + 2);
+    }
+  }
+  if (buffer.trim()) handle(buffer);
+
+  if (result.answer === null) {
+    throw new Error("Resposta incompleta da API");
+  }
+  return result;
+};
 
 export const addDocument = async (texts) => {
   const response = await fetch(`${API_URL}/add-documents`, {